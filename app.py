@@ -1,18 +1,38 @@
-from flask import Flask, request, jsonify, g, render_template
+from flask import Flask, request, jsonify, g, render_template, Response, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import hashlib
 import datetime
 import os
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from google.oauth2 import id_token
-from google.auth.transport import requests as grequests
+import email.header
+import binascii
+from google.auth import jwt as google_jwt
+import requests as http_requests
+import cachetools
+import rsa
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 import traceback
 from dotenv import load_dotenv
 import threading
 import time
+import bisect
+import queue
+import json
+import zlib
+import base64
+import math
+import random
+import socket
+import csv
+import gzip
+import collections
+import contextlib
+import heapq
+import array
+import io
+import hmac
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
@@ -20,32 +40,448 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Email configuration
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'true').lower() == 'true'
 EMAIL_USER = os.getenv('EMAIL_USER', 'lnmiit.hostel@gmail.com')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', 'your_app_password')
 EMAIL_FROM = 'LNMIIT Girls Hostel <lnmiit.hostel@gmail.com>'
+EMAIL_MIME_BOUNDARY = '=_washing_machine_booking_alt'  # '=_' never occurs in quoted-printable text
+EMAIL_SUBJECTS = {
+    'booking_confirmation': 'Washing Machine Booking Confirmation - LNMIIT Girls Hostel',
+    'booking_cancellation': 'Washing Machine Booking Cancelled - LNMIIT Girls Hostel',
+    'bulk_cancellation': 'Washing Machine Bookings Cancelled - LNMIIT Girls Hostel',
+    'booking_reassignment': 'Washing Machine Booking Moved - LNMIIT Girls Hostel',
+    'booking_reminder': 'Washing Machine Booking Reminder - LNMIIT Girls Hostel'
+}
+
+# Session token configuration
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    # The key signs the bearer session tokens; a well-known default would let anyone forge them
+    raise RuntimeError('SECRET_KEY is not set. Set it (or add it to .env) to a long random string, '
+                       'e.g. the output of: python -c "import secrets; print(secrets.token_hex(32))"')
+SESSION_TOKEN_MAX_AGE = 7 * 24 * 3600  # One week
+
+# Google Sign-In configuration
+GOOGLE_CLIENT_ID = "624690583385-s3cnmv6iro5kjjror5oq6t4iulerrcde.apps.googleusercontent.com"
+GOOGLE_CERTS_URL = os.getenv('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+GOOGLE_CERTS_DEFAULT_MAX_AGE = 300  # Used when the certs response has no max-age
+GOOGLE_CERTS_MIN_REFRESH = 60  # Seconds between fetches forced by tokens with an unknown key id
+GOOGLE_TOKEN_CACHE_SIZE = 4096
+GOOGLE_TOKEN_CACHE_TTL = 600
+
+# Email outbox configuration
+EMAIL_SENDER_THREADS = int(os.getenv('EMAIL_SENDER_THREADS', '1'))
+EMAIL_BATCH_SIZE = 20
+EMAIL_MAX_ATTEMPTS = 6
+EMAIL_POLL_INTERVAL = 30  # Seconds between outbox checks when nothing wakes the sender
+EMAIL_CLAIM_LEASE = 300  # Seconds before a claimed but unsent message is retried
 
 # Database configuration
-DATABASE = 'washing_machine_booking.db'
+DATABASE = os.getenv('DATABASE', 'washing_machine_booking.db')
+
+# Live update stream configuration
+STREAM_HEARTBEAT = 15  # Seconds between keep-alives (and machine status re-checks)
+STREAM_QUEUE_SIZE = 256  # Events buffered per client before it is asked to resync
+# Request threads in this worker; gunicorn.conf.py sets it from gunicorn's --threads
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', '16'))
+STREAM_RESERVED_THREADS = int(os.getenv('STREAM_RESERVED_THREADS', '8'))  # Always left for ordinary API requests
+# Each open stream holds a worker thread for its whole life, so streams get the
+# threads left after the reserve; clients past the cap fall back to polling
+STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', str(max(WORKER_THREADS - STREAM_RESERVED_THREADS, 1))))
+STREAM_FULL_RETRY_AFTER = 300  # Seconds a refused client polls before trying to stream again
+
+# Admin booking history pagination
+ADMIN_BOOKINGS_PAGE_SIZE = 200
+ADMIN_BOOKINGS_MAX_PAGE_SIZE = 1000
+
+# Largest batch accepted by the bulk admin endpoints
+BULK_MAX_ITEMS = 500
+
+# How far a booking on a broken machine may move when no machine is free in its own slot
+REASSIGN_MAX_SHIFT_HOURS = 24
+
+# Availability grid configuration
+AVAILABILITY_DAYS = 14
+AVAILABILITY_SLOT_MINUTES = 15
+
+# Booking retention configuration
+RETENTION_DAYS = 60
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', '')  # Empty disables the CSV.gz archive
+RETENTION_BATCH_SIZE = 1000  # First batch; later ones are sized to the budget
+RETENTION_MIN_BATCH = 100
+RETENTION_MAX_BATCH = 20000
+RETENTION_BATCH_BUDGET = 0.05  # Target seconds of write lock per batch
+RETENTION_BATCH_PAUSE = 0.1  # Seconds between batches; at least the busy handler's 100 ms poll, so waiting writers get in
+RETENTION_VACUUM_PAGES = 500  # Pages returned to the filesystem per incremental vacuum step
+BOOKING_ARCHIVE_COLUMNS = ('id', 'user_id', 'machine_id', 'start_time', 'end_time', 'status', 'created_at')
+
+# Usage analytics configuration
+ANALYTICS_ROLLUP_INTERVAL = 300  # Seconds between rollups of ended bookings
+ANALYTICS_ROLLUP_BATCH = 5000
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 366
+ANALYTICS_EXPORT_CHUNK_ROWS = 1000  # CSV rows per streamed chunk
+USAGE_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Background job configuration (seconds)
+CLEANUP_INTERVAL = 300
+CLEANUP_JITTER = 30  # Random delay added to each interval so workers do not wake in lockstep
+JOB_LEASE_GRACE = 60  # Extra lease time before another worker may take over a job
+
+# Longest gap between status reconciler runs; bounds how late the leader sees other workers' bookings
+RECONCILE_MAX_SLEEP = 60
+
+# Request metrics configuration
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_N_PLUS_ONE_THRESHOLD = 10  # Runs of one statement in a single request
+METRICS_STATEMENT_LABEL_LENGTH = 200
+
+# Password hashing configuration; cost tuned with benchmarks/bench_password_hash.py
+PASSWORD_SCRYPT_LOG_N = 14  # N = 2**14 with r = 8 uses 16 MB and takes about 75 ms per hash
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_BACKLOG = 32  # Calls that may wait for a hashing thread
+PASSWORD_HASH_WAIT = 2  # Seconds to wait for a slot before answering 503
+PASSWORD_HASH_RETRY_AFTER = 1
+
+# Booking reminder configuration
+REMINDER_LEAD_MINUTES = 15
+REMINDER_BATCH_SIZE = 200  # Reminders claimed and queued per transaction
+REMINDER_RETRY_INTERVAL = 5  # Seconds before retrying a failed load or batch
+
+# Booking admission queue configuration (per worker)
+BOOKING_ADMISSION_CONCURRENCY = int(os.getenv('BOOKING_ADMISSION_CONCURRENCY', '2'))  # In the booking transaction at once; SQLite has one writer anyway
+BOOKING_ADMISSION_QUEUE = int(os.getenv('BOOKING_ADMISSION_QUEUE', '200'))
+BOOKING_ADMISSION_WAIT = 5  # Seconds a request may wait in the queue, well under the client timeout
+BOOKING_ADMISSION_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Response cache configuration
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+RESPONSE_CACHE_SHARED_PATH = os.getenv('RESPONSE_CACHE_SHARED_PATH', '')  # SQLite file shared by workers; empty keeps the cache per worker
+
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = 10  # Seconds to wait for a free connection
+DB_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',  # Readers no longer block on the writer
+    'PRAGMA synchronous = NORMAL',  # Safe with WAL, avoids an fsync per commit
+    'PRAGMA cache_size = -16000',  # 16 MB page cache per connection
+    'PRAGMA mmap_size = 268435456',  # Map up to 256 MB of the file
+    'PRAGMA busy_timeout = 5000'
+]
+
+def connect_db():
+    """Open a connection with the tuned pragmas and a prepared-statement cache"""
+    db = sqlite3.connect(DATABASE, timeout=5, check_same_thread=False, cached_statements=256)
+    db.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        db.execute(pragma)
+    return db
+
+class ConnectionPool:
+    """Thread-safe pool of warm SQLite connections.
+
+    Connections keep their prepared-statement cache between requests. The pool
+    is rebuilt after a fork so gunicorn workers never share a connection.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.in_use = 0
+        self.max_in_use = 0
+
+    def acquire(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset()
+            self.checkouts += 1
+            try:
+                db = self.idle.get_nowait()
+            except queue.Empty:
+                db = None
+                if self.created < self.size:
+                    self.created += 1
+                    create = True
+                else:
+                    create = False
+        if db is None:
+            if create:
+                try:
+                    db = connect_db()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    db = self.idle.get(timeout=DB_POOL_TIMEOUT)
+                except queue.Empty:
+                    raise RuntimeError('Database connection pool exhausted')
+                with self.lock:
+                    self.waits += 1
+                    self.wait_time += time.perf_counter() - started
+        with self.lock:
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+        return db
+
+    def release(self, db):
+        if db.in_transaction:
+            db.rollback()
+        with self.lock:
+            self.in_use -= 1
+        self.idle.put(db)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'created': self.created,
+                'idle': self.idle.qsize(),
+                'in_use': self.in_use,
+                'max_in_use': self.max_in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time_ms': round(self.wait_time * 1000, 3)
+            }
+
+db_pool = ConnectionPool(DB_POOL_SIZE)
+
+class ProfiledConnection:
+    """Connection proxy that times every statement a request runs.
+
+    Timings cover execute() up to the first row, which is where SQLite does
+    the work for the short queries the routes issue.
+    """
+
+    __slots__ = ('conn', 'statements')
+
+    def __init__(self, conn, statements):
+        self.conn = conn
+        self.statements = statements
+
+    def _record(self, sql, started):
+        elapsed = time.perf_counter() - started
+        entry = self.statements.get(sql)
+        if entry is None:
+            self.statements[sql] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return self.conn.execute(sql, parameters)
+        finally:
+            self._record(sql, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return self.conn.executemany(sql, seq_of_parameters)
+        finally:
+            self._record(sql, started)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+class RequestMetrics:
+    """Per-worker latency histograms and SQL statistics, rendered for Prometheus.
+
+    A statement run METRICS_N_PLUS_ONE_THRESHOLD or more times by one request
+    is counted as an N+1 pattern against that endpoint.
+    """
+
+    def __init__(self, buckets):
+        self.lock = threading.Lock()
+        self.buckets = buckets
+        self.latency = {}  # (endpoint, method) -> per-bucket counts, then +Inf, sum and count
+        self.responses = {}  # (endpoint, method, status) -> count
+        self.queries = {}  # endpoint -> [statements run, seconds]
+        self.statements = {}  # normalized SQL -> [executions, seconds]
+        self.n_plus_one = {}  # (endpoint, normalized SQL) -> requests
+        self.normalized = {}
+
+    def _normalize(self, sql):
+        normalized = self.normalized.get(sql)
+        if normalized is None:
+            normalized = ' '.join(sql.split())[:METRICS_STATEMENT_LABEL_LENGTH]
+            self.normalized[sql] = normalized
+        return normalized
+
+    def observe(self, endpoint, method, status, seconds, statements):
+        with self.lock:
+            histogram = self.latency.get((endpoint, method))
+            if histogram is None:
+                histogram = self.latency[(endpoint, method)] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            key = (endpoint, method, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+            queries = self.queries.setdefault(endpoint, [0, 0.0])
+            for sql, (count, elapsed) in statements.items():
+                normalized = self._normalize(sql)
+                totals = self.statements.setdefault(normalized, [0, 0.0])
+                totals[0] += count
+                totals[1] += elapsed
+                queries[0] += count
+                queries[1] += elapsed
+                if count >= METRICS_N_PLUS_ONE_THRESHOLD:
+                    key = (endpoint, normalized)
+                    if key not in self.n_plus_one:
+                        print(f"[WARN] Possible N+1 in {method} {endpoint}: {count} runs of {normalized}")
+                    self.n_plus_one[key] = self.n_plus_one.get(key, 0) + 1
+
+    def render(self):
+        def label(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = [
+            '# HELP http_request_duration_seconds Time to produce the response, per endpoint.',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        with self.lock:
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                labels = f'endpoint="{label(endpoint)}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), histogram):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {histogram[-2]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {histogram[-1]}')
+
+            lines += ['# HELP http_responses_total Responses by endpoint and status.',
+                      '# TYPE http_responses_total counter']
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                lines.append(f'http_responses_total{{endpoint="{label(endpoint)}",method="{method}",status="{status}"}} {count}')
+
+            lines += ['# HELP sql_queries_total Statements run by requests, per endpoint.',
+                      '# TYPE sql_queries_total counter']
+            for endpoint, (count, _) in sorted(self.queries.items()):
+                lines.append(f'sql_queries_total{{endpoint="{label(endpoint)}"}} {count}')
+            lines += ['# HELP sql_query_seconds_total Time spent in statements, per endpoint.',
+                      '# TYPE sql_query_seconds_total counter']
+            for endpoint, (_, elapsed) in sorted(self.queries.items()):
+                lines.append(f'sql_query_seconds_total{{endpoint="{label(endpoint)}"}} {elapsed:.6f}')
+
+            lines += ['# HELP sql_statement_executions_total Executions per statement.',
+                      '# TYPE sql_statement_executions_total counter']
+            for statement, (count, _) in sorted(self.statements.items()):
+                lines.append(f'sql_statement_executions_total{{statement="{label(statement)}"}} {count}')
+            lines += ['# HELP sql_statement_seconds_total Time spent per statement.',
+                      '# TYPE sql_statement_seconds_total counter']
+            for statement, (_, elapsed) in sorted(self.statements.items()):
+                lines.append(f'sql_statement_seconds_total{{statement="{label(statement)}"}} {elapsed:.6f}')
+
+            lines += ['# HELP sql_n_plus_one_total Requests that ran one statement repeatedly.',
+                      '# TYPE sql_n_plus_one_total counter']
+            for (endpoint, statement), count in sorted(self.n_plus_one.items()):
+                lines.append(f'sql_n_plus_one_total{{endpoint="{label(endpoint)}",statement="{label(statement)}"}} {count}')
+
+        pool = db_pool.metrics()
+        lines += ['# HELP db_pool_connections Connection pool state.',
+                  '# TYPE db_pool_connections gauge']
+        for state in ('size', 'created', 'idle', 'in_use', 'max_in_use'):
+            lines.append(f'db_pool_connections{{state="{state}"}} {pool[state]}')
+        lines += ['# HELP db_pool_wait_seconds_total Time requests waited for a connection.',
+                  '# TYPE db_pool_wait_seconds_total counter',
+                  f'db_pool_wait_seconds_total {pool["wait_time_ms"] / 1000:.6f}']
+
+        admission = booking_admission.metrics()
+        lines += ['# HELP booking_admission_queue_depth Booking requests waiting for admission.',
+                  '# TYPE booking_admission_queue_depth gauge',
+                  f'booking_admission_queue_depth {admission["depth"]}',
+                  '# HELP booking_admission_active Booking requests admitted and running.',
+                  '# TYPE booking_admission_active gauge',
+                  f'booking_admission_active {admission["active"]}',
+                  '# HELP booking_admission_rejected_total Booking requests turned away, by reason.',
+                  '# TYPE booking_admission_rejected_total counter']
+        for reason, count in sorted(admission['rejected'].items()):
+            lines.append(f'booking_admission_rejected_total{{reason="{reason}"}} {count}')
+        lines += ['# HELP booking_admission_wait_seconds Time booking requests waited for admission.',
+                  '# TYPE booking_admission_wait_seconds histogram']
+        cumulative = 0
+        for bound, count in zip(admission['wait_buckets'] + [float('inf')], admission['wait_counts']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'booking_admission_wait_seconds_bucket{{le="{le}"}} {cumulative}')
+        lines += [f'booking_admission_wait_seconds_sum {admission["wait_seconds_total"]:.6f}',
+                  f'booking_admission_wait_seconds_count {admission["admitted"]}']
+
+        cache = response_cache.metrics()
+        lines += ['# HELP response_cache_lookups_total Booking view cache lookups by result.',
+                  '# TYPE response_cache_lookups_total counter']
+        for result in ('hits', 'shared_hits', 'misses'):
+            lines.append(f'response_cache_lookups_total{{result="{result[:-1]}"}} {cache[result]}')
+        lines += ['# HELP response_cache_evictions_total Entries evicted to stay under the size cap.',
+                  '# TYPE response_cache_evictions_total counter',
+                  f'response_cache_evictions_total {cache["evictions"]}',
+                  '# HELP response_cache_entries Cached response bodies.',
+                  '# TYPE response_cache_entries gauge',
+                  f'response_cache_entries {cache["entries"]}',
+                  '# HELP response_cache_bytes Size of the cached response bodies.',
+                  '# TYPE response_cache_bytes gauge',
+                  f'response_cache_bytes {cache["bytes"]}']
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics(METRICS_LATENCY_BUCKETS)
 
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
-    return db
+        db = g._database = db_pool.acquire()
+        statements = getattr(g, '_sql_statements', None)
+        if statements is not None:
+            g._profiled_database = ProfiledConnection(db, statements)
+    return getattr(g, '_profiled_database', db)
 
 @app.teardown_appcontext
 def close_connection(exception):
     db = getattr(g, '_database', None)
     if db is not None:
-        db.close()
+        db_pool.release(db)
 
-def init_db():
-    with app.app_context():
-        db = get_db()
-        db.execute('''
+@app.before_request
+def start_request_metrics():
+    if METRICS_ENABLED:
+        g._request_started = time.perf_counter()
+        g._sql_statements = {}
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('_request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        # Streamed bodies are timed to their first byte; statements they run later are not counted
+        request_metrics.observe(endpoint, request.method, response.status_code,
+                                time.perf_counter() - started, g.pop('_sql_statements', {}))
+    return response
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    (1, 'Base schema', [
+        '''
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 student_id TEXT UNIQUE NOT NULL,
@@ -55,8 +491,8 @@ def init_db():
                 role TEXT NOT NULL DEFAULT 'user',
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        db.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS washing_machines (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 machine_name TEXT NOT NULL,
@@ -66,8 +502,8 @@ def init_db():
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (last_used_by) REFERENCES users (id)
             )
-        ''')
-        db.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS bookings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
@@ -79,163 +515,2373 @@ def init_db():
                 FOREIGN KEY (user_id) REFERENCES users (id),
                 FOREIGN KEY (machine_id) REFERENCES washing_machines (id)
             )
-        ''')
-        admin_password = hash_password('admin123')
-        db.execute('''
-            INSERT OR IGNORE INTO users (student_id, username, password, role)
-            VALUES (?, ?, ?, ?)
-        ''', ('admin', 'Administrator', admin_password, 'admin'))
-        machines = [
-            ('Machine 1', 'available'),
-            ('Machine 2', 'available'),
-            ('Machine 3', 'available'),
-            ('Machine 4', 'available'),
-            ('Machine 5', 'available'),
-            ('Machine 6', 'available'),
-            ('Machine 7', 'available'),
-            ('Machine 8', 'available')
-        ]
-        for machine_name, status in machines:
+        '''
+    ]),
+    (2, 'Booking indexes for conflict, 10-day rule and listing queries', [
+        # Conflict check and per-machine listings; covers SELECT id via the rowid
+        '''
+            CREATE INDEX IF NOT EXISTS idx_bookings_machine_active
+            ON bookings (machine_id, start_time, end_time)
+            WHERE status IN ('pending', 'confirmed')
+        ''',
+        # 10-day rule and a user's own bookings
+        '''
+            CREATE INDEX IF NOT EXISTS idx_bookings_user_status_start
+            ON bookings (user_id, status, start_time)
+        ''',
+        # Bookings for a date
+        '''
+            CREATE INDEX IF NOT EXISTS idx_bookings_status_start
+            ON bookings (status, start_time)
+        ''',
+        # Upcoming bookings (admin view, status store) and retention cleanup
+        '''
+            CREATE INDEX IF NOT EXISTS idx_bookings_end
+            ON bookings (end_time)
+        '''
+    ]),
+    (3, 'Email outbox', [
+        '''
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at DATETIME NOT NULL,
+                last_error TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                sent_at DATETIME
+            )
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+            ON email_outbox (next_attempt_at)
+            WHERE status IN ('queued', 'sending')
+        '''
+    ]),
+    (4, 'Per-resource data versions for ETags', [
+        '''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                resource TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        '''
+    ]),
+    (5, 'Keyset index for admin booking history', [
+        # (start_time, id) order via the implicit rowid suffix
+        '''
+            CREATE INDEX IF NOT EXISTS idx_bookings_start
+            ON bookings (start_time)
+        '''
+    ]),
+    (6, 'Job leases for the background scheduler', [
+        '''
+            CREATE TABLE IF NOT EXISTS job_leases (
+                job TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+        '''
+    ]),
+    (7, 'Plain-text alternative for outbox emails', [
+        'ALTER TABLE email_outbox ADD COLUMN text_body TEXT'
+    ]),
+    (8, 'Reminder claim marker on bookings', [
+        'ALTER TABLE bookings ADD COLUMN reminder_sent_at TEXT'
+    ]),
+    (9, 'Hourly usage aggregates for analytics', [
+        '''
+            CREATE TABLE IF NOT EXISTS usage_hourly (
+                hour INTEGER NOT NULL,
+                machine_id INTEGER NOT NULL,
+                bookings INTEGER NOT NULL,
+                booked_minutes REAL NOT NULL,
+                PRIMARY KEY (hour, machine_id)
+            ) WITHOUT ROWID
+        ''',
+        'ALTER TABLE bookings ADD COLUMN rolled_up INTEGER NOT NULL DEFAULT 0',
+        # Ended bookings still waiting for the rollup
+        '''
+            CREATE INDEX IF NOT EXISTS idx_bookings_rollup
+            ON bookings (end_time)
+            WHERE rolled_up = 0
+        '''
+    ]),
+]
+
+def migrate(db):
+    """Apply pending schema migrations, each in its own transaction"""
+    for version, description, statements in MIGRATIONS:
+        if version <= db.execute('PRAGMA user_version').fetchone()[0]:
+            continue
+        # Every worker migrates on import; the write lock lets only one of them apply each step
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= db.execute('PRAGMA user_version').fetchone()[0]:
+                db.rollback()
+                continue
+            for statement in statements:
+                db.execute(statement)
+            db.execute(f'PRAGMA user_version = {version}')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"[INFO] Applied migration {version}: {description}")
+
+session_serializer = URLSafeTimedSerializer(SECRET_KEY, salt='session')
+
+def issue_session_token(user_id, role, username, email):
+    """Signed, stateless token carrying what request handlers need about the user"""
+    return session_serializer.dumps({'id': user_id, 'role': role, 'username': username, 'email': email})
+
+def current_session():
+    """The verified session from 'Authorization: Bearer <token>', or None"""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return None
+    try:
+        return session_serializer.loads(token, max_age=SESSION_TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
+
+def init_db():
+    with app.app_context():
+        db = get_db()
+        migrate(db)
+        # auto_vacuum only takes effect after a full VACUUM, which needs no open transaction
+        if db.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            try:
+                db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                db.execute('VACUUM')
+                print("[INFO] Enabled incremental vacuum")
+            except sqlite3.OperationalError as e:
+                # Another worker is starting up too; the next start retries
+                print(f"[WARN] Incremental vacuum not enabled: {str(e)}")
+        # Hashing costs a KDF run, so only do it when the admin is missing
+        db.execute('BEGIN IMMEDIATE')
+        if db.execute("SELECT 1 FROM users WHERE student_id = 'admin'").fetchone() is None:
             db.execute('''
-                INSERT OR IGNORE INTO washing_machines (machine_name, status)
+                INSERT OR IGNORE INTO users (student_id, username, password, role)
+                VALUES (?, ?, ?, ?)
+            ''', ('admin', 'Administrator', hash_password('admin123'), 'admin'))
+        # Seed the default machines only on a fresh database
+        if db.execute('SELECT COUNT(*) FROM washing_machines').fetchone()[0] == 0:
+            machines = [
+                ('Machine 1', 'available'),
+                ('Machine 2', 'available'),
+                ('Machine 3', 'available'),
+                ('Machine 4', 'available'),
+                ('Machine 5', 'available'),
+                ('Machine 6', 'available'),
+                ('Machine 7', 'available'),
+                ('Machine 8', 'available')
+            ]
+            db.executemany('''
+                INSERT INTO washing_machines (machine_name, status)
                 VALUES (?, ?)
-            ''', (machine_name, status))
+            ''', machines)
         db.commit()
 
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the password hashing pool has no free slot"""
+
+class PasswordHasher:
+    """Bounded thread pool for scrypt work.
+
+    hashlib.scrypt releases the GIL, so the KDF runs on a few dedicated
+    threads and only that many cores are ever spent on it, however many
+    logins arrive at once. At most workers + backlog calls are admitted;
+    past that a caller waits PASSWORD_HASH_WAIT seconds and then gets
+    PasswordHasherBusy instead of queueing without bound.
+    """
+
+    def __init__(self, workers, backlog):
+        self.workers = workers
+        self.backlog = backlog
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Threads do not survive a fork, so each gunicorn worker builds its own pool
+        self.pid = os.getpid()
+        self.executor = None
+        self.slots = threading.BoundedSemaphore(self.workers + self.backlog)
+        self.calls = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queue_time = 0.0
+        self.kdf_time = 0.0
+
+    def _timed(self, fn, args, submitted):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self.lock:
+                self.queue_time += started - submitted
+                self.kdf_time += time.perf_counter() - started
+
+    def run(self, fn, *args):
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset()
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            executor = self.executor
+            slots = self.slots
+        if not slots.acquire(timeout=PASSWORD_HASH_WAIT):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('Password hashing is at capacity')
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return executor.submit(self._timed, fn, args, time.perf_counter()).result()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            slots.release()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'backlog': self.backlog,
+                'calls': self.calls,
+                'rejected': self.rejected,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'queue_time_ms': round(self.queue_time * 1000, 3),
+                'kdf_time_ms': round(self.kdf_time * 1000, 3)
+            }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_BACKLOG)
+
+def scrypt_key(password, salt, log_n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=1 << log_n, r=r, p=p,
+                          maxmem=256 * r * (1 << log_n), dklen=32)
+
+def encode_hash_part(raw):
+    return base64.b64encode(raw).decode().rstrip('=')
+
+def decode_hash_part(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+def parse_password_hash(hashed):
+    """(log_n, r, p, salt, key) for a $scrypt$ hash, or None for anything else"""
+    try:
+        scheme, params, salt, key = hashed.split('$')[1:]
+        if scheme != 'scrypt':
+            return None
+        params = dict(param.split('=') for param in params.split(','))
+        return int(params['ln']), int(params['r']), int(params['p']), decode_hash_part(salt), decode_hash_part(key)
+    except (ValueError, KeyError):
+        return None
+
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Salted scrypt hash in the versioned form $scrypt$ln=..,r=..,p=..$salt$key"""
+    salt = os.urandom(16)
+    key = password_hasher.run(scrypt_key, password, salt, PASSWORD_SCRYPT_LOG_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return (f'$scrypt$ln={PASSWORD_SCRYPT_LOG_N},r={PASSWORD_SCRYPT_R},p={PASSWORD_SCRYPT_P}'
+            f'${encode_hash_part(salt)}${encode_hash_part(key)}')
 
 def verify_password(password, hashed):
-    return hash_password(password) == hashed
+    if hashed.startswith('$scrypt$'):
+        parsed = parse_password_hash(hashed)
+        if parsed is None:
+            return False
+        log_n, r, p, salt, key = parsed
+        return hmac.compare_digest(password_hasher.run(scrypt_key, password, salt, log_n, r, p), key)
+    # Unsalted SHA-256 from before the scrypt format; rehashed on the next login
+    if len(hashed) == 64:
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+    return False
+
+def password_needs_rehash(hashed):
+    """True for legacy hashes and scrypt hashes made with other cost settings"""
+    parsed = parse_password_hash(hashed)
+    return parsed is None or parsed[:3] != (PASSWORD_SCRYPT_LOG_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
 
-def send_email(to_email, subject, body):
+def rehash_password(db, user_id, password, old_hash):
+    """Store the current hash format after a successful login; never fails the login"""
     try:
-        if EMAIL_PASSWORD == 'your_app_password':
-            print(f"Email notification skipped (not configured): {subject} to {to_email}")
-            return True
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_FROM
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'html'))
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(EMAIL_USER, to_email, text)
-        server.quit()
-        print(f"Email sent successfully: {subject} to {to_email}")
-        return True
-    except Exception as e:
-        print(f"Email sending failed: {str(e)}")
-        return False
+        db.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                   (hash_password(password), user_id, old_hash))
+        db.commit()
+    except (sqlite3.Error, PasswordHasherBusy) as e:
+        print(f"[WARN] Password rehash for user {user_id} deferred: {str(e)}")
+
+def password_hasher_busy():
+    return retry_later(503, 'Too many sign-ins in progress, please retry shortly', PASSWORD_HASH_RETRY_AFTER)
+
+class EmailRenderer:
+    """Precompiled email templates and a reusable MIME envelope.
+
+    Each template pair in templates/email is compiled by Jinja2 once and
+    kept. Messages are assembled from header blocks built at startup plus
+    quoted-printable parts, rather than a MIMEMultipart tree and as_string()
+    per message; the boundary contains '=_', which quoted-printable output
+    can never contain.
+    """
+
+    def __init__(self, subjects):
+        self.subjects = subjects
+        self.lock = threading.Lock()
+        self.compiled = {}
+        self.envelope = (f'From: {EMAIL_FROM}\nMIME-Version: 1.0\n'
+                         f'Content-Type: multipart/alternative; boundary="{EMAIL_MIME_BOUNDARY}"\n')
+        self.part_headers = {
+            subtype: (f'--{EMAIL_MIME_BOUNDARY}\nContent-Type: text/{subtype}; charset="utf-8"\n'
+                      f'Content-Transfer-Encoding: quoted-printable\n\n')
+            for subtype in ('plain', 'html')
+        }
+        self.closing = f'--{EMAIL_MIME_BOUNDARY}--\n'
+
+    def templates(self, name):
+        templates = self.compiled.get(name)
+        if templates is None:
+            with self.lock:
+                templates = self.compiled.get(name)
+                if templates is None:
+                    templates = (app.jinja_env.get_template(f'email/{name}.html'),
+                                 app.jinja_env.get_template(f'email/{name}.txt'))
+                    self.compiled[name] = templates
+        return templates
+
+    def render(self, name, **context):
+        """(subject, html, text) for one message"""
+        html, text = self.templates(name)
+        return self.subjects[name], html.render(context), text.render(context)
+
+    def render_batch(self, name, contexts):
+        """(subject, html, text) for each context, compiling the templates once"""
+        html, text = self.templates(name)
+        subject = self.subjects[name]
+        return [(subject, html.render(context), text.render(context)) for context in contexts]
+
+    def _part(self, subtype, content):
+        encoded = binascii.b2a_qp(content.encode('utf-8')).decode('ascii')
+        return self.part_headers[subtype] + encoded + '\n'
+
+    def mime(self, to_email, subject, html, text=None):
+        """The full message for smtplib.sendmail; text is None for messages queued before plain-text parts"""
+        if not subject.isascii():
+            subject = email.header.Header(subject, 'utf-8').encode()
+        parts = [f'To: {to_email}\nSubject: {subject}\n', self.envelope, '\n']
+        if text is not None:
+            parts.append(self._part('plain', text))
+        parts.append(self._part('html', html))
+        parts.append(self.closing)
+        return ''.join(parts)
+
+email_renderer = EmailRenderer(EMAIL_SUBJECTS)
+
+def queue_email(db, to_email, subject, body, text_body=None):
+    """Add a message to the outbox in the caller's transaction.
+
+    Call email_outbox.notify() after committing to wake the sender.
+    """
+    db.execute('''
+        INSERT INTO email_outbox (to_email, subject, body, text_body, next_attempt_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (to_email, subject, body, text_body, utc_now().isoformat()))
+
+def queue_template_emails(db, name, messages):
+    """Render one template for many (to_email, context) pairs and queue them in one statement"""
+    messages = list(messages)
+    rendered = email_renderer.render_batch(name, [context for _, context in messages])
+    now = utc_now().isoformat()
+    db.executemany('''
+        INSERT INTO email_outbox (to_email, subject, body, text_body, next_attempt_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(to_email, subject, html, text, now)
+          for (to_email, _), (subject, html, text) in zip(messages, rendered)])
+
+def queue_booking_confirmation_email(db, user_email, username, machine_name, start_time, end_time, booking_id):
+    queue_email(db, user_email, *email_renderer.render(
+        'booking_confirmation', username=username, machine_name=machine_name,
+        start_time=start_time, end_time=end_time, booking_id=booking_id))
+
+def queue_booking_cancellation_email(db, user_email, username, machine_name, start_time, end_time, booking_id):
+    queue_email(db, user_email, *email_renderer.render(
+        'booking_cancellation', username=username, machine_name=machine_name,
+        start_time=start_time, end_time=end_time, booking_id=booking_id))
+
+def queue_bulk_cancellation_emails(db, notices):
+    """One notice per (user_email, username, bookings), listing every booking of that user cancelled by an admin"""
+    queue_template_emails(db, 'bulk_cancellation', [
+        (user_email, {'username': username, 'bookings': bookings})
+        for user_email, username, bookings in notices
+    ])
+
+
+class EmailOutbox:
+    """Background sender pool for the email_outbox table.
+
+    Each sender thread keeps one authenticated SMTP session open, claims due
+    messages in batches and retries failures with exponential backoff.
+    Claims are leased, so messages held by a crashed worker are retried.
+    """
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.wakeup = threading.Event()
+
+    def notify(self):
+        self.wakeup.set()
+
+    def start(self):
+        for _ in range(self.threads):
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        db = None
+        server = None
+        while True:
+            try:
+                if db is None:
+                    db = connect_db()
+                batch = self.claim(db)
+                if batch:
+                    server = self.send_batch(db, server, batch)
+                    continue
+            except Exception as e:
+                print(f"[ERROR] Email outbox failed: {str(e)}")
+            server = self.close_session(server)
+            self.wakeup.wait(EMAIL_POLL_INTERVAL)
+            self.wakeup.clear()
+
+    def claim(self, db):
+        now = utc_now()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            batch = db.execute('''
+                SELECT id, to_email, subject, body, text_body, attempts FROM email_outbox
+                WHERE status IN ('queued', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            ''', (now.isoformat(), EMAIL_BATCH_SIZE)).fetchall()
+            lease = (now + datetime.timedelta(seconds=EMAIL_CLAIM_LEASE)).isoformat()
+            db.executemany('''
+                UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?
+            ''', [(lease, message['id']) for message in batch])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return batch
+
+    def open_session(self):
+        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=30)
+        server.ehlo()
+        if EMAIL_USE_TLS:
+            server.starttls()
+            # The extension list from before STARTTLS no longer applies
+            server.ehlo()
+        # Leave EMAIL_USER or EMAIL_PASSWORD empty for relays without AUTH
+        if EMAIL_USER and EMAIL_PASSWORD:
+            server.login(EMAIL_USER, EMAIL_PASSWORD)
+        return server
+
+    def close_session(self, server):
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return None
+
+    def send_batch(self, db, server, batch):
+        results = []
+        for message in batch:
+            if EMAIL_PASSWORD == 'your_app_password':
+                print(f"Email notification skipped (not configured): {message['subject']} to {message['to_email']}")
+                results.append(('skipped', None, message))
+                continue
+            try:
+                if server is None:
+                    server = self.open_session()
+                msg = email_renderer.mime(message['to_email'], message['subject'],
+                                          message['body'], message['text_body'])
+                server.sendmail(EMAIL_USER, message['to_email'], msg)
+                print(f"Email sent successfully: {message['subject']} to {message['to_email']}")
+                results.append(('sent', None, message))
+            except Exception as e:
+                print(f"Email sending failed: {str(e)}")
+                results.append(('retry', str(e), message))
+                if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                    server = self.close_session(server)
+        self.record(db, results)
+        return server
+
+    def record(self, db, results):
+        now = utc_now()
+        updates = []
+        for outcome, error, message in results:
+            attempts = message['attempts'] + 1
+            if outcome == 'retry':
+                if attempts >= EMAIL_MAX_ATTEMPTS:
+                    outcome = 'failed'
+                else:
+                    outcome = 'queued'
+                backoff = datetime.timedelta(seconds=min(30 * 2 ** attempts, 3600))
+                updates.append((outcome, attempts, (now + backoff).isoformat(), error, None, message['id']))
+            else:
+                updates.append((outcome, attempts, now.isoformat(), None, now.isoformat(), message['id']))
+        db.executemany('''
+            UPDATE email_outbox
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, sent_at = ?
+            WHERE id = ?
+        ''', updates)
+        db.commit()
+
+email_outbox = EmailOutbox(EMAIL_SENDER_THREADS)
+
+def archive_bookings(rows):
+    """Append booking rows to gzipped CSV files, one per month of start_time"""
+    os.makedirs(RETENTION_ARCHIVE_DIR, exist_ok=True)
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['start_time'][:7], []).append(row)
+    for month, month_rows in by_month.items():
+        path = os.path.join(RETENTION_ARCHIVE_DIR, f'bookings-{month}.csv.gz')
+        new_file = not os.path.exists(path)
+        # Appending adds a gzip member; readers see one continuous CSV
+        with gzip.open(path, 'at', newline='') as archive:
+            writer = csv.writer(archive)
+            if new_file:
+                writer.writerow(BOOKING_ARCHIVE_COLUMNS)
+            writer.writerows(tuple(row) for row in month_rows)
+
+def usage_hour(moment):
+    """Hours since the Unix epoch for a naive UTC datetime"""
+    return int((moment - USAGE_EPOCH).total_seconds() // 3600)
+
+def usage_increments(rows):
+    """(hour, machine_id) -> [bookings started, minutes booked] for the bookings that took place"""
+    increments = {}
+    for row in rows:
+        if row['status'] not in ('confirmed', 'completed'):
+            continue
+        start = parse_booking_time(row['start_time'])
+        end = parse_booking_time(row['end_time'])
+        cursor = start
+        while cursor < end:
+            hour = usage_hour(cursor)
+            segment_end = min(end, USAGE_EPOCH + datetime.timedelta(hours=hour + 1))
+            entry = increments.setdefault((hour, row['machine_id']), [0, 0.0])
+            if cursor == start:
+                entry[0] += 1
+            entry[1] += (segment_end - cursor).total_seconds() / 60
+            cursor = segment_end
+    return increments
+
+def rollup_usage():
+    """Fold ended bookings into the usage_hourly aggregates, one batch per transaction.
 
-def send_booking_confirmation_email(user_email, username, machine_name, start_time, end_time, booking_id):
-    subject = "Washing Machine Booking Confirmation - LNMIIT Girls Hostel"
-    body = f"""
-    <html>
-    <body>
-        <h2>Booking Confirmation</h2>
-        <p>Dear {username},</p>
-        <p>Your washing machine booking has been confirmed successfully!</p>
-        <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-            <h3>Booking Details:</h3>
-            <p><strong>Booking ID:</strong> #{booking_id}</p>
-            <p><strong>Machine:</strong> {machine_name}</p>
-            <p><strong>Start Time:</strong> {start_time}</p>
-            <p><strong>End Time:</strong> {end_time}</p>
-        </div>
-        <p><strong>Important Notes:</strong></p>
-        <ul>
-            <li>Please arrive on time for your slot</li>
-            <li>Ensure you complete your laundry within the allocated time</li>
-            <li>If you need to cancel, please do so at least 30 minutes before your slot</li>
-        </ul>
-        <p>Thank you for using the LNMIIT Girls Hostel Washing Machine Booking System!</p>
-        <p>Best regards,<br>
-        LNMIIT Girls Hostel Management</p>
-    </body>
-    </html>
+    Runs as a scheduled job and again before retention deletes anything, so
+    no booking leaves the table without being counted.
     """
-    return send_email(user_email, subject, body)
-
-def send_booking_cancellation_email(user_email, username, machine_name, start_time, end_time, booking_id):
-    subject = "Washing Machine Booking Cancelled - LNMIIT Girls Hostel"
-    body = f"""
-    <html>
-    <body>
-        <h2>Booking Cancellation</h2>
-        <p>Dear {username},</p>
-        <p>Your washing machine booking has been cancelled successfully.</p>
-        <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 20px 0; border-left: 4px solid #ffc107;">
-            <h3>Cancelled Booking Details:</h3>
-            <p><strong>Booking ID:</strong> #{booking_id}</p>
-            <p><strong>Machine:</strong> {machine_name}</p>
-            <p><strong>Start Time:</strong> {start_time}</p>
-            <p><strong>End Time:</strong> {end_time}</p>
-        </div>
-        <p>You can now book a new slot if needed through the booking system.</p>
-        <p>Thank you for using the LNMIIT Girls Hostel Washing Machine Booking System!</p>
-        <p>Best regards,<br>
-        LNMIIT Girls Hostel Management</p>
-    </body>
-    </html>
+    try:
+        db = get_db()
+        rolled = 0
+        while True:
+            db.execute('BEGIN IMMEDIATE')
+            rows = db.execute('''
+                SELECT id, machine_id, start_time, end_time, status FROM bookings
+                WHERE rolled_up = 0 AND end_time < ?
+                ORDER BY end_time LIMIT ?
+            ''', (utc_now().isoformat(), ANALYTICS_ROLLUP_BATCH)).fetchall()
+            if not rows:
+                db.rollback()
+                break
+            db.executemany('''
+                INSERT INTO usage_hourly (hour, machine_id, bookings, booked_minutes) VALUES (?, ?, ?, ?)
+                ON CONFLICT (hour, machine_id) DO UPDATE SET
+                    bookings = bookings + excluded.bookings,
+                    booked_minutes = booked_minutes + excluded.booked_minutes
+            ''', [(hour, machine_id, count, minutes)
+                  for (hour, machine_id), (count, minutes) in usage_increments(rows).items()])
+            # Cancelled rows are marked too so they drop out of the partial index
+            db.executemany('UPDATE bookings SET rolled_up = 1 WHERE id = ?', [(row['id'],) for row in rows])
+            bump_versions(db, 'usage')
+            db.commit()
+            rolled += len(rows)
+            if len(rows) < ANALYTICS_ROLLUP_BATCH:
+                break
+            # Let waiting writers in between batches
+            time.sleep(RETENTION_BATCH_PAUSE)
+        if rolled:
+            print(f"[INFO] Rolled {rolled} bookings into usage aggregates")
+        return rolled
+    except Exception as e:
+        print(f"[ERROR] Usage rollup failed: {str(e)}")
+
+class UsageAnalytics:
+    """Columnar in-memory copy of usage_hourly for the analytics endpoints.
+
+    Rows are held as parallel arrays sorted by hour, so a date range is two
+    bisects and each figure is one pass over flat arrays. The copy is
+    reloaded when a rollup (in any worker) bumps the 'usage' data version.
     """
-    return send_email(user_email, subject, body)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.hours = array.array('q')
+        self.machines = array.array('l')
+        self.bookings = array.array('l')
+        self.minutes = array.array('d')
+
+    def _ensure_fresh(self):
+        version = data_versions.get('usage')[0]
+        if version == self.version:
+            return
+        db = connect_db()
+        try:
+            hours = array.array('q')
+            machines = array.array('l')
+            bookings = array.array('l')
+            minutes = array.array('d')
+            for hour, machine_id, count, booked in db.execute('''
+                SELECT hour, machine_id, bookings, booked_minutes FROM usage_hourly ORDER BY hour, machine_id
+            '''):
+                hours.append(hour)
+                machines.append(machine_id)
+                bookings.append(count)
+                minutes.append(booked)
+        finally:
+            db.close()
+        self.hours, self.machines, self.bookings, self.minutes = hours, machines, bookings, minutes
+        self.version = version
+
+    def summarize(self, first_day, last_day, machine_ids):
+        """Per-machine totals and a weekday x hour utilization heatmap for [first_day, last_day]"""
+        start = usage_hour(datetime.datetime.combine(first_day, datetime.time()))
+        end = usage_hour(datetime.datetime.combine(last_day, datetime.time())) + 24
+        slot = {machine_id: index for index, machine_id in enumerate(machine_ids)}
+        machine_minutes = array.array('d', [0.0]) * len(machine_ids)
+        machine_bookings = array.array('l', [0]) * len(machine_ids)
+        heat = array.array('d', [0.0]) * (7 * 24)
+        with self.lock:
+            self._ensure_fresh()
+            hours, machines, bookings, minutes = self.hours, self.machines, self.bookings, self.minutes
+            low = bisect.bisect_left(hours, start)
+            high = bisect.bisect_left(hours, end)
+            for i in range(low, high):
+                index = slot.get(machines[i])
+                if index is None:
+                    continue
+                hour = hours[i]
+                machine_minutes[index] += minutes[i]
+                machine_bookings[index] += bookings[i]
+                # Epoch day 0 was a Thursday; weekday 0 is Monday
+                heat[((hour // 24 + 3) % 7) * 24 + hour % 24] += minutes[i]
+
+        # Minutes available in each heatmap cell over the range, across all machines
+        occurrences = [0] * 7
+        for day in range((last_day - first_day).days + 1):
+            occurrences[(first_day + datetime.timedelta(days=day)).weekday()] += 1
+        capacity = [count * len(machine_ids) * 60 for count in occurrences]
+        span_minutes = (end - start) * 60
+        return {
+            'machine_minutes': machine_minutes,
+            'machine_bookings': machine_bookings,
+            'machine_utilization': [booked / span_minutes * 100 for booked in machine_minutes],
+            'heatmap': [[heat[weekday * 24 + hour] / capacity[weekday] * 100 if capacity[weekday] else 0.0
+                         for hour in range(24)] for weekday in range(7)],
+            'hours': end - start
+        }
+
+usage_analytics = UsageAnalytics()
 
 def cleanup_old_bookings():
-    """Delete bookings older than 2 months"""
+    """Delete bookings older than 2 months in small batches.
+
+    Each batch holds the write lock for about RETENTION_BATCH_BUDGET seconds;
+    the batch size is rescaled after every batch to stay near it. Rows are
+    archived first when RETENTION_ARCHIVE_DIR is set, and the freed pages are
+    returned to the filesystem with incremental vacuum afterwards.
+    """
     try:
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now() - timedelta(days=60)
+        # Count everything that is about to go in the usage aggregates first
+        if rollup_usage() is None:
+            print("[WARN] Skipping cleanup until the usage rollup succeeds")
+            return None
+        cutoff_date = (utc_now() - datetime.timedelta(days=RETENTION_DAYS)).isoformat()
         db = get_db()
-        db.execute('''
-            DELETE FROM bookings WHERE end_time < ?
-        ''', (cutoff_date.isoformat(),))
-        db.commit()
-        print(f"[INFO] Old bookings deleted before {cutoff_date.isoformat()}")
+        batch_size = RETENTION_BATCH_SIZE
+        deleted = 0
+        batches = 0
+        max_hold = 0
+        columns = ', '.join(BOOKING_ARCHIVE_COLUMNS)
+        while True:
+            rows = db.execute(f'''
+                SELECT {columns} FROM bookings
+                WHERE end_time < ?
+                ORDER BY end_time LIMIT ?
+            ''', (cutoff_date, batch_size)).fetchall()
+            if not rows:
+                break
+            if RETENTION_ARCHIVE_DIR:
+                archive_bookings(rows)
+
+            began = time.perf_counter()
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany('DELETE FROM bookings WHERE id = ?', [(row['id'],) for row in rows])
+            bump_versions(db, 'bookings', 'bookings:retention')
+            db.commit()
+            hold = time.perf_counter() - began
+            # Checkpoint here, or the next request to commit pays for this batch's WAL pages
+            db.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+
+            deleted += len(rows)
+            batches += 1
+            max_hold = max(max_hold, hold)
+            scale = RETENTION_BATCH_BUDGET / max(hold, 1e-6)
+            batch_size = int(min(max(batch_size * min(scale, 2), RETENTION_MIN_BATCH), RETENTION_MAX_BATCH))
+            # Let waiting writers in between batches
+            time.sleep(RETENTION_BATCH_PAUSE)
+
+        vacuumed = 0
+        free_pages = db.execute('PRAGMA freelist_count').fetchone()[0]
+        while free_pages:
+            # execute() would step the pragma once and free a single page
+            db.executescript(f'PRAGMA incremental_vacuum({RETENTION_VACUUM_PAGES});')
+            remaining = db.execute('PRAGMA freelist_count').fetchone()[0]
+            # Stays put when auto_vacuum is off
+            if remaining >= free_pages:
+                break
+            vacuumed += free_pages - remaining
+            db.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+            free_pages = remaining
+            time.sleep(RETENTION_BATCH_PAUSE)
+
+        print(f"[INFO] Old bookings deleted before {cutoff_date}: {deleted} rows in {batches} batches, "
+              f"max lock hold {max_hold * 1000:.1f} ms, {vacuumed} pages vacuumed")
+        return {'deleted': deleted, 'batches': batches, 'max_lock_hold_ms': round(max_hold * 1000, 3),
+                'pages_vacuumed': vacuumed}
     except Exception as e:
         print(f"[ERROR] Cleanup old bookings failed: {str(e)}")
 
-def update_machine_status_automatically():
-    try:
-        from datetime import datetime, timezone
-        current_time = datetime.now(timezone.utc)
-        with app.app_context():
-            db = get_db()
-            machines = db.execute('''
-                SELECT id, status FROM washing_machines WHERE status != 'broken'
+def utc_now():
+    """Current UTC time as a naive datetime, comparable with stored booking times"""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def parse_booking_time(value):
+    """Parse a stored booking timestamp ('...Z', '...+00:00' or naive) as naive UTC"""
+    return datetime.datetime.fromisoformat(value.replace('Z', '').replace('+00:00', ''))
+
+class EventBus:
+    """In-process pub/sub feeding the /api/stream Server-Sent Events endpoint.
+
+    Every subscriber gets a bounded queue. A client that falls behind has its
+    backlog replaced by a single resync event instead of blocking publishers.
+    At most max_subscribers streams are open at once in this worker.
+    """
+
+    def __init__(self, max_subscribers):
+        self.lock = threading.Lock()
+        self.max_subscribers = max_subscribers
+        self.subscribers = set()
+
+    def subscribe(self):
+        """A new subscription queue, or None if this worker already serves max_subscribers streams"""
+        subscription = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait((event, data))
+            except queue.Full:
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(('resync', {}))
+
+event_bus = EventBus(STREAM_MAX_CLIENTS)
+
+def bump_versions(db, *resources):
+    """Bump data versions in the caller's transaction so ETags change with the commit"""
+    db.executemany('''
+        INSERT INTO data_versions (resource, version) VALUES (?, 1)
+        ON CONFLICT (resource) DO UPDATE SET version = version + 1
+    ''', [(resource,) for resource in resources])
+
+def booking_resources(machine_id, start_time):
+    """Data version keys touched by a booking write"""
+    return ('bookings', f'bookings:machine:{machine_id}', f'bookings:date:{start_time[:10]}')
+
+class DataVersions:
+    """Cached view of the data_versions table used to answer conditional GETs.
+
+    The table is re-read only when PRAGMA data_version reports a commit, so a
+    matching If-None-Match is answered without querying any table.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = None
+        self.data_version = None
+        self.versions = {}
+
+    def _refresh(self):
+        if self.conn is None:
+            self.conn = connect_db()
+        version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != self.data_version:
+            self.versions = dict(self.conn.execute('SELECT resource, version FROM data_versions').fetchall())
+            self.data_version = version
+
+    def get(self, *resources):
+        with self.lock:
+            self._refresh()
+            return [self.versions.get(resource, 0) for resource in resources]
+
+    def prefixed(self, prefix):
+        """{rest of the key: version} for every resource whose key starts with prefix"""
+        with self.lock:
+            self._refresh()
+            return {resource[len(prefix):]: version for resource, version in self.versions.items()
+                    if resource.startswith(prefix)}
+
+    def etag(self, *resources, suffix=None):
+        parts = [str(version) for version in self.get(*resources)]
+        if suffix is not None:
+            parts.append(str(suffix))
+        return '-'.join(parts)
+
+data_versions = DataVersions()
+
+def not_modified(etag):
+    """A 304 response if the request's If-None-Match already has etag, else None"""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def with_etag(result, etag):
+    response, status = result
+    response.set_etag(etag)
+    return response, status
+
+def retry_later(status, message, retry_after):
+    """A 429/503 response telling the client when to try again"""
+    response = jsonify({'message': message})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status
+
+class SharedResponseStore:
+    """Response bodies in a SQLite file that every worker on the host can read.
+
+    Stands in for a shared cache service; entries carry their ETag, so a
+    stale body is never served, only overwritten.
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = None
+        self.conn_pid = None
+        self.writes = 0
+
+    def _connection(self):
+        if self.conn is None or self.conn_pid != os.getpid():
+            self.conn = sqlite3.connect(self.path, timeout=1, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = OFF')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            ''')
+            self.conn.commit()
+            self.conn_pid = os.getpid()
+        return self.conn
+
+    def get(self, key, etag):
+        with self.lock:
+            row = self._connection().execute(
+                'SELECT body FROM responses WHERE key = ? AND etag = ?', (key, etag)
+            ).fetchone()
+            return row[0] if row else None
+
+    def put(self, key, etag, body):
+        with self.lock:
+            conn = self._connection()
+            conn.execute('''
+                INSERT INTO responses (key, etag, body, stored_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET etag = excluded.etag, body = excluded.body,
+                                                stored_at = excluded.stored_at
+            ''', (key, etag, body, time.time()))
+            self.writes += 1
+            # Trim the oldest entries now and then rather than on every write
+            if self.writes % 100 == 0:
+                conn.execute('''
+                    DELETE FROM responses WHERE key NOT IN (
+                        SELECT key FROM responses ORDER BY stored_at DESC LIMIT ?
+                    )
+                ''', (self.max_entries,))
+            conn.commit()
+
+    def invalidate(self, keys):
+        with self.lock:
+            conn = self._connection()
+            conn.executemany('DELETE FROM responses WHERE key = ?', [(key,) for key in keys])
+            conn.commit()
+
+class ResponseCache:
+    """LRU of serialized JSON response bodies for the booking views.
+
+    Keys are the data version resources a view depends on, and every entry
+    is stored with the ETag it was rendered for. A lookup only hits when the
+    current ETag matches, so a write in any worker (which bumps the
+    resource's version) retires exactly the entries it affects. Local writes
+    also drop their keys right away to free the memory.
+    """
+
+    def __init__(self, max_entries, max_bytes, shared=None):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def get(self, key, etag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._drop(key)
+        if self.shared is not None:
+            try:
+                body = self.shared.get(key, etag)
+            except sqlite3.Error as e:
+                print(f"[ERROR] Shared response cache read failed: {str(e)}")
+                body = None
+            if body is not None:
+                self._store(key, etag, body)
+                with self.lock:
+                    self.shared_hits += 1
+                return body
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key, etag, body):
+        with self.lock:
+            self._drop(key)
+            if len(body) > self.max_bytes:
+                return
+            self.entries[key] = (etag, body)
+            self.size += len(body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def put(self, key, etag, body):
+        self._store(key, etag, body)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, etag, body)
+            except sqlite3.Error as e:
+                print(f"[ERROR] Shared response cache write failed: {str(e)}")
+
+    def invalidate(self, *keys):
+        with self.lock:
+            for key in keys:
+                self._drop(key)
+        if self.shared is not None:
+            try:
+                self.shared.invalidate(keys)
+            except sqlite3.Error as e:
+                print(f"[ERROR] Shared response cache invalidation failed: {str(e)}")
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES,
+    SharedResponseStore(RESPONSE_CACHE_SHARED_PATH, RESPONSE_CACHE_MAX_ENTRIES) if RESPONSE_CACHE_SHARED_PATH else None
+)
+
+def cached_json(body, etag):
+    """A 200 JSON response for cached body bytes"""
+    response = app.response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+class MachineStateStore:
+    """In-process machine status, derived from booking start/end times.
+
+    Reading the store never writes to SQLite. It reloads itself whenever
+    PRAGMA data_version reports a commit from another connection, which also
+    covers bookings made by other gunicorn workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.conn = None
+        self.data_version = None
+        self.machines = {}
+        self.intervals = {}
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = connect_db()
+        return self.conn
+
+    def refresh(self):
+        """Reload machines and active/upcoming bookings if the database changed"""
+        with self.lock:
+            conn = self._connection()
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if version == self.data_version:
+                return
+            machines = conn.execute('''
+                SELECT id, machine_name, status, last_used_by, last_used_time
+                FROM washing_machines
+                ORDER BY id
             ''').fetchall()
-            for machine in machines:
-                active_booking = db.execute('''
-                    SELECT COUNT(*) as count FROM bookings 
-                    WHERE machine_id = ? AND status IN ('pending', 'confirmed')
-                    AND start_time <= ? AND end_time > ?
-                ''', (machine['id'], current_time.isoformat(), current_time.isoformat())).fetchone()
-                if active_booking["count"] > 0:
-                    if machine["status"] != "in_use":
-                        db.execute('''
-                            UPDATE washing_machines SET status = 'in_use' WHERE id = ?
-                        ''', (machine["id"],))
-                else:
-                    if machine['status'] != 'available':
-                        db.execute('''
-                            UPDATE washing_machines SET status = 'available' WHERE id = ?
-                        ''', (machine['id'],))
+            bookings = conn.execute('''
+                SELECT id, user_id, machine_id, start_time, end_time FROM bookings
+                WHERE status IN ('pending', 'confirmed') AND end_time > ?
+            ''', (utc_now().isoformat(),)).fetchall()
+            self.machines = {machine['id']: dict(machine) for machine in machines}
+            self.intervals = {}
+            for booking in bookings:
+                self.intervals.setdefault(booking['machine_id'], []).append((
+                    parse_booking_time(booking['start_time']),
+                    parse_booking_time(booking['end_time']),
+                    booking['id'],
+                    booking['user_id']
+                ))
+            for intervals in self.intervals.values():
+                intervals.sort()
+            self.data_version = version
+
+    def active_interval(self, machine_id, now):
+        """The (start, end, booking_id, user_id) running on the machine at now, or None"""
+        for interval in self.intervals.get(machine_id, ()):
+            if interval[0] > now:
+                break
+            if interval[1] > now:
+                return interval
+        return None
+
+    def derived_status(self, machine_id, now):
+        if self.machines[machine_id]['status'] == 'broken':
+            return 'broken'
+        return 'in_use' if self.active_interval(machine_id, now) else 'available'
+
+    def snapshot(self):
+        """Machine rows with their status as of now"""
+        self.refresh()
+        now = utc_now()
+        with self.lock:
+            machines_list = []
+            for machine_id, machine in self.machines.items():
+                machines_list.append(dict(machine, status=self.derived_status(machine_id, now)))
+            return machines_list
+
+    def next_boundary(self, now):
+        """Earliest booking start or end after now, or None"""
+        boundary = None
+        with self.lock:
+            for intervals in self.intervals.values():
+                for start, end, _, _ in intervals:
+                    edge = start if start > now else end
+                    if edge > now and (boundary is None or edge < boundary):
+                        boundary = edge
+                    if start > now:
+                        break
+        return boundary
+
+    def reconcile(self):
+        """Persist machines whose derived status flipped; returns the next boundary.
+
+        This is the only writer of washing_machines.status apart from admins
+        marking machines broken or repaired; a machine starting a booking also
+        records who is using it.
+        """
+        self.refresh()
+        now = utc_now()
+        with self.lock:
+            flips = []
+            for machine_id, machine in self.machines.items():
+                status = self.derived_status(machine_id, now)
+                if status != machine['status']:
+                    active = self.active_interval(machine_id, now) if status == 'in_use' else None
+                    user_id = active[3] if active else None
+                    used_at = now.isoformat() + 'Z' if active else None
+                    flips.append((status, user_id, used_at, machine_id))
+            if flips:
+                conn = self._connection()
+                conn.executemany('''
+                    UPDATE washing_machines
+                    SET status = ?, last_used_by = COALESCE(?, last_used_by),
+                        last_used_time = COALESCE(?, last_used_time)
+                    WHERE id = ? AND status != 'broken'
+                ''', flips)
+                bump_versions(conn, 'machines')
+                conn.commit()
+                for status, user_id, used_at, machine_id in flips:
+                    machine = self.machines[machine_id]
+                    machine['status'] = status
+                    if user_id is not None:
+                        machine['last_used_by'] = user_id
+                        machine['last_used_time'] = used_at
+        for status, _, _, machine_id in flips:
+            event_bus.publish('machine', {'id': machine_id, 'status': status})
+        return self.next_boundary(now)
+
+    def notify(self):
+        """Wake the reconciler after a write that may move the next boundary.
+
+        Only the worker leading the reconcile job runs it; the leader reloads
+        from the database on every run, so other workers' writes are picked up
+        within RECONCILE_MAX_SLEEP.
+        """
+        if scheduler.leads('reconcile_machine_status'):
+            scheduler.trigger('reconcile_machine_status')
+
+machine_state = MachineStateStore()
+
+class IntervalIndex:
+    """Booking intervals of one machine kept sorted by start time.
+
+    Bookings last at most a couple of hours, so only entries starting within
+    max_duration before a probe can overlap it; a bisect narrows each overlap
+    check to that window.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.entries = []
+        self.max_duration = datetime.timedelta(0)
+
+    def add(self, start, end, booking_id):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.entries.insert(i, (start, end, booking_id))
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, start, booking_id):
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.entries[i][2] == booking_id:
+                del self.starts[i]
+                del self.entries[i]
+                return True
+            i += 1
+        return False
+
+    def overlapping(self, start, end):
+        """(start, end, booking_id) entries that overlap [start, end)"""
+        lo = bisect.bisect_right(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        return [entry for entry in self.entries[lo:hi] if entry[1] > start]
+
+    def drop_ended(self, moment):
+        """Forget entries that ended at or before moment"""
+        kept = [entry for entry in self.entries if entry[1] > moment]
+        self.entries = kept
+        self.starts = [entry[0] for entry in kept]
+
+class BookingConflictIndex:
+    """Per-machine interval indexes of pending/confirmed bookings that have not ended.
+
+    Loaded at startup and patched on insert and cancel. Each machine's index
+    carries the bookings:machine:<id> data version it reflects; a machine
+    written by another worker is reloaded before it is checked, so a hit
+    needs no confirming query. Ended bookings are dropped at each UTC day
+    rollover.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.machines = {}
+        self.versions = {}
+        self.day = None
+        self.loaded = False
+
+    ACTIVE = '''
+        SELECT id, machine_id, start_time, end_time FROM bookings
+        WHERE status IN ('pending', 'confirmed') AND end_time > ?
+    '''
+
+    def _index(self, bookings):
+        machines = {}
+        for booking in bookings:
+            machines.setdefault(booking['machine_id'], IntervalIndex()).add(
+                parse_booking_time(booking['start_time']),
+                parse_booking_time(booking['end_time']),
+                booking['id']
+            )
+        return machines
+
+    def load(self):
+        """Index every booking that has not ended yet"""
+        db = connect_db()
+        try:
+            now = utc_now()
+            # Versions first: a write landing in between only makes them look stale
+            versions = {int(machine_id): version
+                        for machine_id, version in data_versions.prefixed('bookings:machine:').items()}
+            bookings = db.execute(self.ACTIVE, (now.isoformat(),)).fetchall()
+        finally:
+            db.close()
+        with self.lock:
+            self.machines = self._index(bookings)
+            self.versions = versions
+            self.day = now.date()
+            self.loaded = True
+        print(f"[INFO] Booking conflict index loaded {len(bookings)} active bookings")
+
+    def start(self):
+        def warm():
+            try:
+                self.load()
+            except Exception as e:
+                # Booking falls back to the SQL conflict check until a restart
+                print(f"[WARN] Booking conflict index load failed: {str(e)}")
+        threading.Thread(target=warm, daemon=True).start()
+
+    def _ensure_fresh(self, db, machine_id, now):
+        if now.date() != self.day:
+            for index in self.machines.values():
+                index.drop_ended(now)
+            self.day = now.date()
+        version = data_versions.get(f'bookings:machine:{machine_id}')[0]
+        if self.versions.get(machine_id, 0) != version:
+            rows = db.execute(self.ACTIVE + ' AND machine_id = ?', (now.isoformat(), machine_id)).fetchall()
+            self.machines[machine_id] = self._index(rows).get(machine_id, IntervalIndex())
+            self.versions[machine_id] = version
+
+    def add(self, machine_id, start, end, booking_id):
+        with self.lock:
+            if self.loaded:
+                self.machines.setdefault(machine_id, IntervalIndex()).add(start, end, booking_id)
+                # Our own commit bumped the machine's version once
+                self.versions[machine_id] = self.versions.get(machine_id, 0) + 1
+
+    def remove(self, machine_id, start, booking_id):
+        with self.lock:
+            index = self.machines.get(machine_id)
+            if index is not None and index.remove(start, booking_id):
+                # A version that overshoots only costs a reload of the machine
+                self.versions[machine_id] = self.versions.get(machine_id, 0) + 1
+
+    def has_conflict(self, db, machine_id, start, end):
+        """True if an indexed booking overlaps; False also while the index is still loading"""
+        with self.lock:
+            if not self.loaded:
+                return False
+            self._ensure_fresh(db, machine_id, utc_now())
+            index = self.machines.get(machine_id)
+            return bool(index.overlapping(start, end)) if index is not None else False
+
+booking_index = BookingConflictIndex()
+
+class AvailabilityGrid:
+    """Busy/free bitmaps per machine over the next AVAILABILITY_DAYS days (UTC).
+
+    Bit i of a machine's bitmap covers slot i after the grid's origin, today's
+    UTC midnight; a set bit means a pending or confirmed booking overlaps it.
+    A per-slot booking count makes cancellations exact. Local writes patch the
+    grid, and every booking write bumps the 'bookings' data version once, so a
+    version that moved further means another worker wrote and the grid is
+    reloaded.
+    """
+
+    def __init__(self, days, slot_minutes):
+        self.lock = threading.Lock()
+        self.slot = datetime.timedelta(minutes=slot_minutes)
+        self.slots_per_day = 24 * 60 // slot_minutes
+        self.size = days * self.slots_per_day
+        self.full_mask = (1 << self.size) - 1
+        self.conn = None
+        self.origin = None
+        self.version = None
+        self.local_patches = 0
+        self.counts = {}
+        self.busy = {}
+
+    def _slot_range(self, start, end):
+        first = max(int((start - self.origin) / self.slot), 0)
+        last = min(math.ceil((end - self.origin) / self.slot), self.size)
+        return range(first, last)
+
+    def _apply(self, machine_id, start, end, delta):
+        counts = self.counts.setdefault(machine_id, [0] * self.size)
+        busy = self.busy.get(machine_id, 0)
+        for i in self._slot_range(start, end):
+            counts[i] = max(counts[i] + delta, 0)
+            if counts[i]:
+                busy |= 1 << i
+            else:
+                busy &= ~(1 << i)
+        self.busy[machine_id] = busy
+
+    def _ensure_fresh(self):
+        origin = utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        version = data_versions.get('bookings')[0]
+        if origin == self.origin and self.version is not None and version == self.version + self.local_patches:
+            return
+        if self.conn is None:
+            self.conn = connect_db()
+        horizon = origin + self.size * self.slot
+        bookings = self.conn.execute('''
+            SELECT machine_id, start_time, end_time FROM bookings
+            WHERE status IN ('pending', 'confirmed') AND end_time > ? AND start_time < ?
+        ''', (origin.isoformat(), horizon.isoformat())).fetchall()
+        self.origin = origin
+        self.version = version
+        self.local_patches = 0
+        self.counts = {}
+        self.busy = {}
+        for booking in bookings:
+            self._apply(booking['machine_id'], parse_booking_time(booking['start_time']),
+                        parse_booking_time(booking['end_time']), 1)
+
+    def booking_added(self, machine_id, start, end):
+        with self.lock:
+            if self.origin is not None:
+                self._apply(machine_id, start, end, 1)
+                self.local_patches += 1
+
+    def booking_removed(self, machine_id, start, end):
+        self.bookings_removed([(machine_id, start, end)])
+
+    def bookings_removed(self, bookings):
+        """Patch (machine_id, start, end) removals committed as one write"""
+        self.bookings_changed(bookings, [])
+
+    def bookings_changed(self, removed, added):
+        """Patch removals and additions committed as one write"""
+        with self.lock:
+            if self.origin is not None:
+                for machine_id, start, end in removed:
+                    self._apply(machine_id, start, end, -1)
+                for machine_id, start, end in added:
+                    self._apply(machine_id, start, end, 1)
+                self.local_patches += 1
+
+    def day_bitmaps(self, machine_ids, days):
+        """Origin and, per machine, one hex bitmap per day"""
+        day_mask = (1 << self.slots_per_day) - 1
+        width = self.slots_per_day // 4
+        with self.lock:
+            self._ensure_fresh()
+            bitmaps = {}
+            for machine_id in machine_ids:
+                busy = self.busy.get(machine_id, 0)
+                bitmaps[machine_id] = [
+                    format((busy >> (day * self.slots_per_day)) & day_mask, f'0{width}x')
+                    for day in range(days)
+                ]
+            return self.origin, bitmaps
+
+    def next_free(self, machine_ids, after, duration):
+        """Earliest (start, machine_id) with duration free from a slot boundary at or after 'after'"""
+        needed = math.ceil(duration / self.slot)
+        with self.lock:
+            self._ensure_fresh()
+            first = max(math.ceil((after - self.origin) / self.slot), 0)
+            best = None
+            for machine_id in machine_ids:
+                free = ~self.busy.get(machine_id, 0) & self.full_mask
+                # Bit i survives only if slots i .. i + needed - 1 are all free
+                runs = free
+                for shift in range(1, needed):
+                    runs &= free >> shift
+                runs >>= first
+                if runs:
+                    index = (runs & -runs).bit_length() - 1 + first
+                    if best is None or index < best[0]:
+                        best = (index, machine_id)
+            if best is None:
+                return None
+            return self.origin + best[0] * self.slot, best[1]
+
+availability_grid = AvailabilityGrid(AVAILABILITY_DAYS, AVAILABILITY_SLOT_MINUTES)
+
+def booking_seconds(value):
+    """Seconds since the Unix epoch for a stored booking timestamp"""
+    return int((parse_booking_time(value) - USAGE_EPOCH).total_seconds())
+
+class BookingRecord:
+    """One pending or confirmed booking as the read endpoints return it"""
+
+    __slots__ = ('id', 'user_id', 'machine_id', 'start_time', 'end_time', 'status', 'created_at',
+                 'username', 'student_id', 'machine_name')
+
+    def __init__(self, id, user_id, machine_id, start_time, end_time, status, created_at,
+                 username, student_id, machine_name):
+        self.id = id
+        self.user_id = user_id
+        self.machine_id = machine_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status = status
+        self.created_at = created_at
+        self.username = username
+        self.student_id = student_id
+        self.machine_name = machine_name
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row['id'], row['user_id'], row['machine_id'], row['start_time'], row['end_time'],
+                   row['status'], row['created_at'], row['username'], row['student_id'], row['machine_name'])
+
+class MachineTimeline:
+    """Bookings of one machine ordered by start, with start/end seconds in flat arrays.
+
+    Bookings last at most a couple of hours, so a lookup by end time only
+    has to look max_duration back from a bisect on the starts.
+    """
+
+    __slots__ = ('starts', 'ends', 'records', 'max_duration')
+
+    def __init__(self, records=()):
+        spans = sorted(((booking_seconds(record.start_time), booking_seconds(record.end_time), record)
+                        for record in records), key=lambda span: span[0])
+        self.starts = array.array('q', [span[0] for span in spans])
+        self.ends = array.array('q', [span[1] for span in spans])
+        self.records = [span[2] for span in spans]
+        self.max_duration = max((end - start for start, end, _ in spans), default=0)
+
+    def add(self, record):
+        start = booking_seconds(record.start_time)
+        end = booking_seconds(record.end_time)
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.records.insert(i, record)
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, start_time, booking_id):
+        """Drop a booking; returns its record, or None if it was not here"""
+        start = booking_seconds(start_time)
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            record = self.records[i]
+            if record.id == booking_id:
+                del self.starts[i]
+                del self.ends[i]
+                del self.records[i]
+                return record
+            i += 1
+        return None
+
+    def drop_ended(self, moment):
+        """Drop bookings that ended at or before moment (seconds); returns their records"""
+        cut = bisect.bisect_left(self.starts, moment)
+        keep = [i for i in range(cut) if self.ends[i] > moment]
+        dropped = [self.records[i] for i in range(cut) if self.ends[i] <= moment]
+        if dropped:
+            self.starts[:cut] = array.array('q', [self.starts[i] for i in keep])
+            self.ends[:cut] = array.array('q', [self.ends[i] for i in keep])
+            self.records[:cut] = [self.records[i] for i in keep]
+        return dropped
+
+    def starting(self, low, high):
+        """(start seconds, record) for bookings starting in [low, high)"""
+        lo = bisect.bisect_left(self.starts, low)
+        hi = bisect.bisect_left(self.starts, high)
+        return zip(self.starts[lo:hi], self.records[lo:hi])
+
+    def next_end(self, moment):
+        """Earliest end at or after moment (seconds), or None"""
+        best = None
+        for i in range(bisect.bisect_left(self.starts, moment - self.max_duration), len(self.starts)):
+            if self.ends[i] >= moment and (best is None or self.ends[i] < best):
+                best = self.ends[i]
+            # Anything starting later also ends later than this one
+            if self.starts[i] > moment:
+                break
+        return best
+
+    def ending_from(self, moment):
+        """Records that end at or after moment (seconds), in start order"""
+        ends = self.ends
+        lo = bisect.bisect_left(self.starts, moment - self.max_duration)
+        return [self.records[i] for i in range(lo, len(ends)) if ends[i] >= moment]
+
+class BookingStore:
+    """Read model of pending/confirmed bookings ending after today's UTC midnight.
+
+    Serves the user, date and machine views from __slots__ records and
+    per-machine timelines instead of a query and a dict per row. Local
+    writes patch the store and count as one bump of each machine's
+    bookings:machine:N version; a machine whose version moved further was
+    written by another worker and only that machine is reloaded.
+    """
+
+    COLUMNS = '''
+        SELECT b.id, b.user_id, b.machine_id, b.start_time, b.end_time, b.status, b.created_at,
+               u.username, u.student_id, m.machine_name
+        FROM bookings b
+        JOIN users u ON b.user_id = u.id
+        JOIN washing_machines m ON b.machine_id = m.id
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origin = None
+        self.versions = {}  # machine_id -> bookings:machine:N version its timeline reflects
+        self.timelines = {}
+        self.users = {}  # user_id -> records
+        self.names = {}
+        self.full_loads = 0
+        self.machine_reloads = 0
+
+    def _record(self, row):
+        # Names and statuses repeat across thousands of bookings; keep one string object each
+        names = self.names
+        return BookingRecord(row['id'], row['user_id'], row['machine_id'], row['start_time'], row['end_time'],
+                             names.setdefault(row['status'], row['status']), row['created_at'],
+                             names.setdefault(row['username'], row['username']),
+                             names.setdefault(row['student_id'], row['student_id']),
+                             names.setdefault(row['machine_name'], row['machine_name']))
+
+    def _load_all(self, db, origin):
+        versions = data_versions.prefixed('bookings:machine:')
+        rows = db.execute(self.COLUMNS + '''
+            WHERE b.status IN ('pending', 'confirmed') AND b.end_time > ?
+        ''', (origin.isoformat(),)).fetchall()
+        self.names = {}
+        by_machine = {}
+        self.users = {}
+        for row in rows:
+            record = self._record(row)
+            by_machine.setdefault(record.machine_id, []).append(record)
+            self.users.setdefault(record.user_id, []).append(record)
+        self.timelines = {machine_id: MachineTimeline(records) for machine_id, records in by_machine.items()}
+        self.versions = {int(machine_id): version for machine_id, version in versions.items()}
+        self.origin = origin
+        self.full_loads += 1
+
+    def _load_machine(self, db, machine_id, version):
+        rows = db.execute(self.COLUMNS + '''
+            WHERE b.machine_id = ? AND b.status IN ('pending', 'confirmed') AND b.end_time > ?
+        ''', (machine_id, self.origin.isoformat())).fetchall()
+        old = self.timelines.pop(machine_id, None)
+        for record in old.records if old is not None else ():
+            self._unlink_user(record)
+        records = [self._record(row) for row in rows]
+        for record in records:
+            self.users.setdefault(record.user_id, []).append(record)
+        self.timelines[machine_id] = MachineTimeline(records)
+        self.versions[machine_id] = version
+        self.machine_reloads += 1
+
+    def _ensure_fresh(self, db):
+        origin = utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.origin is None:
+            self._load_all(db, origin)
+            return
+        if origin != self.origin:
+            # New UTC day: let bookings that ended before midnight drop out
+            moment = int((origin - USAGE_EPOCH).total_seconds())
+            for timeline in self.timelines.values():
+                for record in timeline.drop_ended(moment):
+                    self._unlink_user(record)
+            self.origin = origin
+        for machine_id, version in data_versions.prefixed('bookings:machine:').items():
+            if self.versions.get(int(machine_id), 0) != version:
+                self._load_machine(db, int(machine_id), version)
+
+    def _unlink_user(self, record):
+        records = self.users.get(record.user_id)
+        if records is None:
+            return
+        for i, candidate in enumerate(records):
+            if candidate.id == record.id:
+                del records[i]
+                break
+        if not records:
+            del self.users[record.user_id]
+
+    def _add(self, record):
+        timeline = self.timelines.setdefault(record.machine_id, MachineTimeline())
+        # A reload may already have picked the booking up
+        if timeline.remove(record.start_time, record.id) is not None:
+            self._unlink_user(record)
+        self.users.setdefault(record.user_id, []).append(record)
+        timeline.add(record)
+
+    def _remove(self, machine_id, start_time, booking_id):
+        timeline = self.timelines.get(machine_id)
+        record = timeline.remove(start_time, booking_id) if timeline is not None else None
+        if record is not None:
+            self._unlink_user(record)
+        return record
+
+    def _patched(self, machine_ids):
+        for machine_id in set(machine_ids):
+            self.versions[machine_id] = self.versions.get(machine_id, 0) + 1
+
+    def load(self):
+        """Load the store up front so the first read does not pay for it"""
+        db = connect_db()
+        try:
+            with self.lock:
+                self._ensure_fresh(db)
+                count = sum(len(timeline.records) for timeline in self.timelines.values())
+        finally:
+            db.close()
+        print(f"[INFO] Booking store loaded {count} active bookings")
+
+    def start(self):
+        def warm():
+            try:
+                self.load()
+            except Exception as e:
+                # The first read loads it instead
+                print(f"[WARN] Booking store warm-up failed: {str(e)}")
+        threading.Thread(target=warm, daemon=True).start()
+
+    def booking_added(self, db, booking_id):
+        """Patch in a booking committed by this worker"""
+        row = db.execute(self.COLUMNS + ' WHERE b.id = ?', (booking_id,)).fetchone()
+        with self.lock:
+            if self.origin is None or row is None:
+                return
+            record = self._record(row)
+            self._add(record)
+            self._patched([record.machine_id])
+
+    def bookings_removed(self, bookings):
+        """Patch out (machine_id, start_time, booking_id) cancelled in one write"""
+        with self.lock:
+            if self.origin is None:
+                return
+            for machine_id, start_time, booking_id in bookings:
+                self._remove(machine_id, start_time, booking_id)
+            self._patched(machine_id for machine_id, _, _ in bookings)
+
+    def bookings_moved(self, moves, unplaced):
+        """Patch a committed reassignment plan"""
+        with self.lock:
+            if self.origin is None:
+                return
+            touched = []
+            for move in moves:
+                booking = move['booking']
+                record = self._remove(booking['machine_id'], booking['start_time'], booking['id'])
+                touched.extend((booking['machine_id'], move['machine_id']))
+                if record is None:
+                    continue
+                self._add(BookingRecord(record.id, record.user_id, move['machine_id'], move['start_time'],
+                                        move['end_time'], record.status, record.created_at, record.username,
+                                        record.student_id, self.names.setdefault(move['machine_name'],
+                                                                                 move['machine_name'])))
+            for booking in unplaced:
+                self._remove(booking['machine_id'], booking['start_time'], booking['id'])
+                touched.append(booking['machine_id'])
+            self._patched(touched)
+
+    def user_bookings(self, db, user_id, now):
+        """A user's bookings that have not ended, latest start first"""
+        with self.lock:
+            self._ensure_fresh(db)
+            records = [record for record in self.users.get(user_id, ())
+                       if parse_booking_time(record.end_time) >= now]
+        records.sort(key=lambda record: parse_booking_time(record.start_time), reverse=True)
+        return records
+
+    def day_bookings(self, db, day_start, day_end):
+        """Bookings starting in [day_start, day_end) in start order, or None before the store's window"""
+        with self.lock:
+            self._ensure_fresh(db)
+            if day_start < self.origin:
+                return None
+            low = int((day_start - USAGE_EPOCH).total_seconds())
+            high = int((day_end - USAGE_EPOCH).total_seconds())
+            spans = []
+            for timeline in self.timelines.values():
+                spans.extend(timeline.starting(low, high))
+        spans.sort(key=lambda span: span[0])
+        return [record for _, record in spans]
+
+    def machine_bookings(self, db, machine_id, now):
+        """A machine's bookings that have not ended, in start order"""
+        with self.lock:
+            self._ensure_fresh(db)
+            timeline = self.timelines.get(machine_id)
+            if timeline is None:
+                return []
+            return timeline.ending_from(int((now - USAGE_EPOCH).total_seconds()))
+
+    def machine_next_end(self, db, machine_id, now):
+        """When machine_bookings() next drops a booking, as epoch seconds, or None"""
+        with self.lock:
+            self._ensure_fresh(db)
+            timeline = self.timelines.get(machine_id)
+            if timeline is None:
+                return None
+            return timeline.next_end(int((now - USAGE_EPOCH).total_seconds()))
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'origin': self.origin.isoformat() + 'Z' if self.origin else None,
+                'bookings': sum(len(timeline.records) for timeline in self.timelines.values()),
+                'machines': len(self.timelines),
+                'users': len(self.users),
+                'full_loads': self.full_loads,
+                'machine_reloads': self.machine_reloads
+            }
+
+booking_store = BookingStore()
+
+def plan_reassignments(db, broken_machine_ids):
+    """Re-home upcoming bookings on broken machines; call inside a write transaction.
+
+    Builds an interval timeline per working machine from one query, then
+    places each booking in start order: the same slot on another machine if
+    one is free, otherwise the nearest free slot within REASSIGN_MAX_SHIFT_HOURS.
+    Placed bookings join the timelines, so later ones cannot collide with them.
+    """
+    now = utc_now()
+    broken_machine_ids = set(broken_machine_ids)
+    machines = {row['id']: row for row in db.execute(
+        'SELECT id, machine_name, status FROM washing_machines'
+    ).fetchall()}
+    working_ids = [machine_id for machine_id, machine in machines.items()
+                   if machine['status'] != 'broken' and machine_id not in broken_machine_ids]
+
+    timelines = {machine_id: IntervalIndex() for machine_id in working_ids}
+    affected = []
+    for booking in db.execute('''
+        SELECT b.id, b.user_id, b.machine_id, b.start_time, b.end_time, u.username, u.email
+        FROM bookings b
+        JOIN users u ON b.user_id = u.id
+        WHERE b.status IN ('pending', 'confirmed') AND b.end_time > ?
+        ORDER BY b.start_time
+    ''', (now.isoformat(),)).fetchall():
+        start = parse_booking_time(booking['start_time'])
+        end = parse_booking_time(booking['end_time'])
+        if booking['machine_id'] in timelines:
+            timelines[booking['machine_id']].add(start, end, booking['id'])
+        elif booking['machine_id'] in broken_machine_ids and start > now:
+            affected.append((dict(booking, machine_name=machines[booking['machine_id']]['machine_name']), start, end))
+
+    step = datetime.timedelta(minutes=AVAILABILITY_SLOT_MINUTES)
+    offsets = [datetime.timedelta(0)]
+    for k in range(1, int(datetime.timedelta(hours=REASSIGN_MAX_SHIFT_HOURS) / step) + 1):
+        # At equal distance prefer later, so nobody is asked to come early first
+        offsets.extend([k * step, -k * step])
+
+    moves = []
+    unplaced = []
+    for booking, start, end in affected:
+        placement = None
+        for offset in offsets:
+            if start + offset <= now:
+                continue
+            for machine_id in working_ids:
+                if not timelines[machine_id].overlapping(start + offset, end + offset):
+                    placement = (machine_id, offset)
+                    break
+            if placement:
+                break
+        if placement is None:
+            unplaced.append(booking)
+            continue
+        machine_id, offset = placement
+        timelines[machine_id].add(start + offset, end + offset, booking['id'])
+        moves.append({
+            'booking': booking,
+            'machine_id': machine_id,
+            'machine_name': machines[machine_id]['machine_name'],
+            'start_time': (start + offset).isoformat(timespec='milliseconds') + 'Z',
+            'end_time': (end + offset).isoformat(timespec='milliseconds') + 'Z',
+            'shift_minutes': int(offset.total_seconds() // 60)
+        })
+    return moves, unplaced
+
+def reassignment_resources(moves, unplaced):
+    """Data version keys touched by a reassignment plan, both old and new slots"""
+    resources = set()
+    for move in moves:
+        resources.update(booking_resources(move['booking']['machine_id'], move['booking']['start_time']))
+        resources.update(booking_resources(move['machine_id'], move['start_time']))
+    for booking in unplaced:
+        resources.update(booking_resources(booking['machine_id'], booking['start_time']))
+    return sorted(resources)
+
+def apply_reassignments(db, moves, unplaced):
+    """Write a reassignment plan and queue its notices in the caller's transaction"""
+    db.executemany('''
+        UPDATE bookings SET machine_id = ?, start_time = ?, end_time = ?, reminder_sent_at = NULL WHERE id = ?
+    ''', [(move['machine_id'], move['start_time'], move['end_time'], move['booking']['id']) for move in moves])
+    db.executemany('''
+        UPDATE bookings SET status = 'cancelled' WHERE id = ?
+    ''', [(booking['id'],) for booking in unplaced])
+
+    resources = reassignment_resources(moves, unplaced)
+    if resources:
+        bump_versions(db, *resources)
+
+    queue_template_emails(db, 'booking_reassignment', [
+        (move['booking']['email'], {
+            'username': move['booking']['username'],
+            'booking': move['booking'],
+            'machine_name': move['machine_name'],
+            'start_time': move['start_time'],
+            'end_time': move['end_time']
+        })
+        for move in moves if move['booking']['email']
+    ])
+    queue_bulk_cancellation_emails(db, [
+        (booking['email'], booking['username'], [booking]) for booking in unplaced if booking['email']
+    ])
+
+def publish_reassignments(moves, unplaced):
+    """Patch the in-memory indexes once the plan has committed; returns the report"""
+    removed = []
+    added = []
+    for move in moves:
+        booking = move['booking']
+        start = parse_booking_time(booking['start_time'])
+        booking_index.remove(booking['machine_id'], start, booking['id'])
+        booking_index.add(move['machine_id'], parse_booking_time(move['start_time']),
+                          parse_booking_time(move['end_time']), booking['id'])
+        removed.append((booking['machine_id'], start, parse_booking_time(booking['end_time'])))
+        added.append((move['machine_id'], parse_booking_time(move['start_time']),
+                      parse_booking_time(move['end_time'])))
+    for booking in unplaced:
+        start = parse_booking_time(booking['start_time'])
+        booking_index.remove(booking['machine_id'], start, booking['id'])
+        removed.append((booking['machine_id'], start, parse_booking_time(booking['end_time'])))
+    if removed:
+        availability_grid.bookings_changed(removed, added)
+        booking_store.bookings_moved(moves, unplaced)
+        email_outbox.notify()
+
+    response_cache.invalidate(*reassignment_resources(moves, unplaced))
+    for move in moves:
+        reminder_scheduler.booking_added(move['booking']['id'], move['start_time'])
+    for booking in unplaced:
+        reminder_scheduler.booking_removed(booking['id'])
+
+    for move in moves:
+        event_bus.publish('booking', {
+            'action': 'moved',
+            'id': move['booking']['id'],
+            'machine_id': move['machine_id'],
+            'user_id': move['booking']['user_id'],
+            'start_time': move['start_time'],
+            'end_time': move['end_time']
+        })
+    for booking in unplaced:
+        event_bus.publish('booking', {
+            'action': 'cancelled',
+            'id': booking['id'],
+            'machine_id': booking['machine_id'],
+            'user_id': booking['user_id'],
+            'start_time': booking['start_time'],
+            'end_time': booking['end_time']
+        })
+
+    return {
+        'reassigned': [{
+            'booking_id': move['booking']['id'],
+            'from_machine_id': move['booking']['machine_id'],
+            'machine_id': move['machine_id'],
+            'start_time': move['start_time'],
+            'end_time': move['end_time'],
+            'shift_minutes': move['shift_minutes']
+        } for move in moves],
+        'cancelled': [booking['id'] for booking in unplaced]
+    }
+
+def reconcile_machine_status():
+    """Flip machine statuses at booking start/end boundaries; returns seconds until the next one"""
+    next_boundary = machine_state.reconcile()
+    if next_boundary is not None:
+        return (next_boundary - utc_now()).total_seconds()
+    return None
+
+class ReminderScheduler:
+    """Sends "your slot starts soon" reminders from a min-heap of fire times.
+
+    Upcoming confirmed bookings are loaded once at startup and the heap is
+    then patched by booking writes in this worker. The sender thread sleeps
+    until the earliest fire time (or until a new, earlier entry arrives)
+    and claims due bookings in batches through reminder_sent_at, so with
+    several workers each reminder is still queued once. Cancelled or moved
+    entries are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, lead, batch_size):
+        self.lead = lead
+        self.batch_size = batch_size
+        self.condition = threading.Condition()
+        self.heap = []  # (fire_at, booking_id, start_time)
+        self.pending = {}  # booking_id -> start_time of its live heap entry
+        self.loaded = False
+        self.fired = 0
+        self.skipped = 0
+        self.batches = 0
+
+    def _push(self, booking_id, start_time):
+        fire_at = parse_booking_time(start_time) - self.lead
+        self.pending[booking_id] = start_time
+        heapq.heappush(self.heap, (fire_at, booking_id, start_time))
+        if self.heap[0][1] == booking_id:
+            # New earliest deadline; wake the sender so it sleeps less
+            self.condition.notify()
+
+    def booking_added(self, booking_id, start_time):
+        """Schedule (or reschedule) a booking's reminder; too-late reminders are skipped"""
+        with self.condition:
+            if parse_booking_time(start_time) - self.lead <= utc_now():
+                self.pending.pop(booking_id, None)
+                return
+            self._push(booking_id, start_time)
+
+    def booking_removed(self, booking_id):
+        with self.condition:
+            self.pending.pop(booking_id, None)
+            # Drop dead entries once they outnumber the live ones
+            if len(self.heap) > 2 * len(self.pending) + 64:
+                self.heap = [entry for entry in self.heap if self.pending.get(entry[1]) == entry[2]]
+                heapq.heapify(self.heap)
+
+    def load(self):
+        db = connect_db()
+        try:
+            rows = db.execute('''
+                SELECT id, start_time FROM bookings
+                WHERE status = 'confirmed' AND start_time > ? AND reminder_sent_at IS NULL
+            ''', (utc_now().isoformat(),)).fetchall()
+        finally:
+            db.close()
+        with self.condition:
+            # Writes patched in before the load finished win over the snapshot
+            for row in rows:
+                if row['id'] not in self.pending:
+                    self.pending[row['id']] = row['start_time']
+            self.heap = [(parse_booking_time(start_time) - self.lead, booking_id, start_time)
+                         for booking_id, start_time in self.pending.items()]
+            heapq.heapify(self.heap)
+            self.loaded = True
+        print(f"[INFO] Reminder scheduler loaded {len(rows)} upcoming bookings")
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        while not self.loaded:
+            try:
+                self.load()
+            except Exception as e:
+                print(f"[ERROR] Reminder scheduler load failed: {str(e)}")
+                time.sleep(REMINDER_RETRY_INTERVAL)
+        db = None
+        while True:
+            due = self.wait_for_due()
+            try:
+                if db is None:
+                    db = connect_db()
+                self.send(db, due)
+            except Exception as e:
+                print(f"[ERROR] Reminder batch failed: {str(e)}")
+                # Put the batch back and retry it after a pause
+                with self.condition:
+                    for booking_id, start_time in due:
+                        if booking_id not in self.pending:
+                            self._push(booking_id, start_time)
+                time.sleep(REMINDER_RETRY_INTERVAL)
+
+    def wait_for_due(self):
+        """Block until at least one reminder is due; returns up to batch_size (booking_id, start_time)"""
+        with self.condition:
+            while True:
+                now = utc_now()
+                due = []
+                while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+                    _, booking_id, start_time = heapq.heappop(self.heap)
+                    if self.pending.get(booking_id) == start_time:
+                        del self.pending[booking_id]
+                        due.append((booking_id, start_time))
+                if due:
+                    return due
+                timeout = (self.heap[0][0] - now).total_seconds() if self.heap else None
+                self.condition.wait(timeout)
+
+    def send(self, db, due):
+        start_times = dict(due)
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            placeholders = ','.join('?' * len(due))
+            rows = db.execute(f'''
+                SELECT b.id, b.start_time, b.end_time, u.username, u.email, m.machine_name
+                FROM bookings b
+                JOIN users u ON b.user_id = u.id
+                JOIN washing_machines m ON b.machine_id = m.id
+                WHERE b.id IN ({placeholders}) AND b.status = 'confirmed' AND b.reminder_sent_at IS NULL
+            ''', list(start_times)).fetchall()
+            # A booking moved since it was scheduled is reminded from its new entry
+            rows = [row for row in rows if row['start_time'] == start_times[row['id']]]
+            db.executemany('UPDATE bookings SET reminder_sent_at = ? WHERE id = ?',
+                           [(utc_now().isoformat(), row['id']) for row in rows])
+            queue_template_emails(db, 'booking_reminder', [
+                (row['email'], {
+                    'username': row['username'],
+                    'machine_name': row['machine_name'],
+                    'start_time': row['start_time'],
+                    'end_time': row['end_time'],
+                    'booking_id': row['id'],
+                    'lead_minutes': int(self.lead.total_seconds() // 60)
+                })
+                for row in rows if row['email']
+            ])
             db.commit()
-            print(f"[INFO] Machine statuses refreshed at {current_time.isoformat()}")
-    except Exception as e:
-        print(f"[ERROR] Machine status update failed: {str(e)}")
+        except Exception:
+            db.rollback()
+            raise
+        with self.condition:
+            self.fired += len(rows)
+            self.skipped += len(due) - len(rows)
+            self.batches += 1
+        if rows:
+            email_outbox.notify()
+
+    def metrics(self):
+        with self.condition:
+            next_fire = self.heap[0][0] if self.heap else None
+            return {
+                'loaded': self.loaded,
+                'pending': len(self.pending),
+                'heap_size': len(self.heap),
+                'next_fire_at': next_fire.isoformat() + 'Z' if next_fire else None,
+                'fired': self.fired,
+                'skipped': self.skipped,
+                'batches': self.batches
+            }
+
+reminder_scheduler = ReminderScheduler(datetime.timedelta(minutes=REMINDER_LEAD_MINUTES), REMINDER_BATCH_SIZE)
+
+class JobScheduler:
+    """Runs periodic jobs in one thread per worker, with one worker leading each job.
+
+    Before a run the worker takes the job's row in job_leases, unless another
+    worker holds an unexpired lease. The leader renews the lease after every
+    run, so followers only take over once the leader stops running the job.
+    Each run is due interval plus a random jitter after the previous one, or
+    sooner when it is triggered or, for jobs added with reschedules=True,
+    when the job returns the number of seconds until it is next needed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.wakeup = threading.Event()
+        self.conn = None
+        self.conn_pid = None
+
+    def add_job(self, name, func, interval, jitter=0, reschedules=False):
+        with self.lock:
+            self.jobs[name] = {
+                'func': func,
+                'interval': interval,
+                'jitter': jitter,
+                'reschedules': reschedules,
+                'next_run': time.time() + interval + random.uniform(0, jitter),
+                'runs': 0,
+                'failures': 0,
+                'skipped': 0,
+                'leader': False,
+                'last_run_at': None,
+                'last_duration_ms': None,
+                'max_duration_ms': 0.0,
+                'total_duration_ms': 0.0,
+                'last_lag_ms': None,
+                'max_lag_ms': 0.0
+            }
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def trigger(self, name):
+        """Make a job due now"""
+        with self.lock:
+            self.jobs[name]['next_run'] = time.time()
+        self.wakeup.set()
+
+    def leads(self, name):
+        """True if this worker held the job's lease at its last run"""
+        with self.lock:
+            return self.jobs[name]['leader']
+
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _connection(self):
+        # A forked worker must not share its parent's connection
+        if self.conn is None or self.conn_pid != os.getpid():
+            self.conn = connect_db()
+            self.conn_pid = os.getpid()
+        return self.conn
+
+    def acquire(self, name, lease_seconds):
+        """Take or renew the job's lease; True if this worker now leads the job"""
+        now = utc_now()
+        conn = self._connection()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO job_leases (job, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (job) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE job_leases.owner = excluded.owner OR job_leases.expires_at <= ?
+            ''', (name, self.owner(), (now + datetime.timedelta(seconds=lease_seconds)).isoformat(), now.isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return cursor.rowcount > 0
+
+    def run(self):
+        while True:
+            with self.lock:
+                name, job = min(self.jobs.items(), key=lambda item: item[1]['next_run'])
+            delay = job['next_run'] - time.time()
+            if delay > 0:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                continue
+            self.run_job(name, job)
+
+    def run_job(self, name, job):
+        scheduled = job['next_run']
+        # Outlive the gap to the next run, so a healthy leader never loses its lease
+        lease_seconds = job['interval'] + job['jitter'] + JOB_LEASE_GRACE
+        try:
+            leader = self.acquire(name, lease_seconds)
+        except Exception as e:
+            print(f"[ERROR] Job lease for {name} failed: {str(e)}")
+            leader = False
+
+        started = time.time()
+        failed = False
+        due_in = None
+        if leader:
+            try:
+                with app.app_context():
+                    due_in = job['func']()
+            except Exception as e:
+                failed = True
+                print(f"[ERROR] Job {name} failed: {str(e)}")
+            try:
+                self.acquire(name, lease_seconds)
+            except Exception as e:
+                print(f"[ERROR] Job lease for {name} failed: {str(e)}")
+        finished = time.time()
+
+        with self.lock:
+            job['leader'] = leader
+            job['next_run'] = scheduled + job['interval'] + random.uniform(0, job['jitter'])
+            if job['next_run'] < finished:
+                # Skip runs missed while this one overran instead of running them back to back
+                job['next_run'] = finished + job['interval']
+            if job['reschedules'] and due_in is not None:
+                job['next_run'] = min(job['next_run'], finished + max(due_in, 0))
+            if not leader:
+                job['skipped'] += 1
+                return
+            duration_ms = (finished - started) * 1000
+            lag_ms = max(started - scheduled, 0) * 1000
+            job['runs'] += 1
+            job['failures'] += failed
+            job['last_run_at'] = datetime.datetime.fromtimestamp(started, datetime.timezone.utc).replace(tzinfo=None).isoformat()
+            job['last_duration_ms'] = round(duration_ms, 3)
+            job['max_duration_ms'] = round(max(job['max_duration_ms'], duration_ms), 3)
+            job['total_duration_ms'] = round(job['total_duration_ms'] + duration_ms, 3)
+            job['last_lag_ms'] = round(lag_ms, 3)
+            job['max_lag_ms'] = round(max(job['max_lag_ms'], lag_ms), 3)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                name: dict(
+                    {key: value for key, value in job.items() if key != 'func'},
+                    next_run_in=round(max(job['next_run'] - time.time(), 0), 3)
+                )
+                for name, job in self.jobs.items()
+            }
+
+# Migrate on import so every entry point (python app.py, gunicorn app:app, flask run)
+# has the current schema before the background threads start
+init_db()
+
+scheduler = JobScheduler()
+scheduler.add_job('cleanup_old_bookings', cleanup_old_bookings, CLEANUP_INTERVAL, CLEANUP_JITTER)
+scheduler.add_job('rollup_usage', rollup_usage, ANALYTICS_ROLLUP_INTERVAL, CLEANUP_JITTER)
+# Runs at least every RECONCILE_MAX_SLEEP, and at the next booking boundary if that is sooner
+scheduler.add_job('reconcile_machine_status', reconcile_machine_status, RECONCILE_MAX_SLEEP, reschedules=True)
+scheduler.start()
+scheduler.trigger('reconcile_machine_status')
+
+class BookingAdmissionRejected(Exception):
+    """A booking request turned away by the admission queue"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class BookingAdmission:
+    """FIFO admission queue in front of booking creation.
+
+    At most `concurrency` requests per worker run the booking transaction at
+    once; the rest wait in arrival order and each freed slot is handed
+    straight to the oldest waiter. A user may have one request queued or
+    running (a second gets 429), a full queue answers 503 at once, and a
+    waiter that is not admitted within `max_wait` seconds gets 503 rather
+    than sitting on SQLite's busy handler until it errors.
+    """
+
+    def __init__(self, concurrency, max_queue, max_wait):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.waiters = collections.deque()
+        self.users = set()
+        self.active = 0
+        self.service_time = 0.05  # Moving average of admitted request time, seeds Retry-After
+        self.admitted = 0
+        self.rejected = {'duplicate': 0, 'queue_full': 0, 'timeout': 0}
+        self.wait_buckets = BOOKING_ADMISSION_WAIT_BUCKETS
+        self.wait_counts = [0] * (len(self.wait_buckets) + 1)
+        self.wait_sum = 0.0
+        self.max_depth = 0
+
+    def retry_after(self, depth=None):
+        """Seconds until a request arriving now would likely be admitted"""
+        if depth is None:
+            depth = len(self.waiters)
+        return max(1, math.ceil((depth + 1) * self.service_time / self.concurrency))
+
+    def _observe_wait(self, seconds):
+        self.wait_counts[bisect.bisect_left(self.wait_buckets, seconds)] += 1
+        self.wait_sum += seconds
+
+    def acquire(self, user_id):
+        with self.lock:
+            if user_id in self.users:
+                self.rejected['duplicate'] += 1
+                raise BookingAdmissionRejected('A booking request of yours is already in progress', 429, 1)
+            if self.active < self.concurrency and not self.waiters:
+                self.active += 1
+                self.users.add(user_id)
+                self.admitted += 1
+                self._observe_wait(0.0)
+                return time.perf_counter()
+            if len(self.waiters) >= self.max_queue:
+                self.rejected['queue_full'] += 1
+                raise BookingAdmissionRejected('Booking is busy, please retry shortly', 503, self.retry_after())
+            waiter = threading.Event()
+            self.waiters.append(waiter)
+            self.users.add(user_id)
+            self.max_depth = max(self.max_depth, len(self.waiters))
+
+        started = time.perf_counter()
+        admitted = waiter.wait(self.max_wait)
+        with self.lock:
+            if not admitted and not waiter.is_set():
+                self.waiters.remove(waiter)
+                self.users.discard(user_id)
+                self.rejected['timeout'] += 1
+                raise BookingAdmissionRejected('Booking is busy, please retry shortly', 503, self.retry_after())
+            # The slot was handed over by release(), which already counted it as active
+            self.admitted += 1
+            self._observe_wait(time.perf_counter() - started)
+        return time.perf_counter()
 
-def schedule_status_updates():
-    """Schedule automatic machine status updates and cleanup"""
-    while True:
-        time.sleep(300)  # Wait 5 minutes
-        update_machine_status_automatically()
-        cleanup_old_bookings()
+    def release(self, user_id, admitted_at):
+        with self.lock:
+            self.users.discard(user_id)
+            self.service_time = 0.9 * self.service_time + 0.1 * (time.perf_counter() - admitted_at)
+            if self.waiters:
+                self.waiters.popleft().set()
+            else:
+                self.active -= 1
 
-status_update_thread = threading.Thread(target=schedule_status_updates, daemon=True)
-status_update_thread.start()
+    @contextlib.contextmanager
+    def admit(self, user_id):
+        admitted_at = self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release(user_id, admitted_at)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'concurrency': self.concurrency,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'depth': len(self.waiters),
+                'max_depth': self.max_depth,
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+                'wait_buckets': list(self.wait_buckets),
+                'wait_counts': list(self.wait_counts),
+                'wait_seconds_total': round(self.wait_sum, 6),
+                'service_time_ms': round(self.service_time * 1000, 3)
+            }
+
+booking_admission = BookingAdmission(BOOKING_ADMISSION_CONCURRENCY, BOOKING_ADMISSION_QUEUE, BOOKING_ADMISSION_WAIT)
+
+email_outbox.start()
+reminder_scheduler.start()
+booking_store.start()
+booking_index.start()
 
 # API Routes
 
@@ -275,6 +2921,8 @@ def register():
             'user_id': cursor.lastrowid
         }), 201
         
+    except PasswordHasherBusy:
+        return password_hasher_busy()
     except Exception as e:
         return jsonify({'message': f'Registration failed: {str(e)}'}), 500
 
@@ -291,12 +2939,14 @@ def login():
         
         db = get_db()
         user = db.execute('''
-            SELECT id, student_id, username, password, role
+            SELECT id, student_id, username, password, email, role
             FROM users WHERE student_id = ? AND role = 'user'
         ''', (student_id,)).fetchone()
         
         if not user or not verify_password(password, user['password']):
             return jsonify({'message': 'Invalid credentials'}), 401
+        if password_needs_rehash(user['password']):
+            rehash_password(db, user['id'], password, user['password'])
         
         return jsonify({
             'message': 'Login successful',
@@ -304,10 +2954,13 @@ def login():
                 'id': user['id'],
                 'student_id': user['student_id'],
                 'username': user['username'],
-                'role': user['role']
+                'role': user['role'],
+                'token': issue_session_token(user['id'], user['role'], user['username'], user['email'])
             }
         }), 200
         
+    except PasswordHasherBusy:
+        return password_hasher_busy()
     except Exception as e:
         return jsonify({'message': f'Login failed: {str(e)}'}), 500
 
@@ -324,12 +2977,14 @@ def admin_login():
         
         db = get_db()
         admin = db.execute('''
-            SELECT id, student_id, username, password, role
+            SELECT id, student_id, username, password, email, role
             FROM users WHERE student_id = ? AND role = 'admin'
         ''', (admin_id,)).fetchone()
         
         if not admin or not verify_password(password, admin['password']):
             return jsonify({'message': 'Invalid admin credentials'}), 401
+        if password_needs_rehash(admin['password']):
+            rehash_password(db, admin['id'], password, admin['password'])
         
         return jsonify({
             'message': 'Admin login successful',
@@ -337,10 +2992,13 @@ def admin_login():
                 'id': admin['id'],
                 'student_id': admin['student_id'],
                 'username': admin['username'],
-                'role': admin['role']
+                'role': admin['role'],
+                'token': issue_session_token(admin['id'], admin['role'], admin['username'], admin['email'])
             }
         }), 200
         
+    except PasswordHasherBusy:
+        return password_hasher_busy()
     except Exception as e:
         return jsonify({'message': f'Admin login failed: {str(e)}'}), 500
 
@@ -348,27 +3006,17 @@ def admin_login():
 def get_machines():
     """Get all washing machines with real-time status"""
     try:
-        # Update machine statuses before fetching
-        update_machine_status_automatically()
+        # Status is derived in memory from booking times; this endpoint never writes
+        machines_list = machine_state.snapshot()
 
-        db = get_db()
-        machines = db.execute('''
-            SELECT id, machine_name, status, last_used_by, last_used_time
-            FROM washing_machines
-            ORDER BY id
-        ''').fetchall()
-        
-        machines_list = []
-        for machine in machines:
-            machines_list.append({
-                'id': machine['id'],
-                'machine_name': machine['machine_name'],
-                'status': machine['status'],  # Already updated in DB
-                'last_used_by': machine['last_used_by'],
-                'last_used_time': machine['last_used_time']
-            })
+        # Derived status can flip at a booking boundary before the reconciler bumps the version
+        statuses = ''.join(machine['status'][0] for machine in machines_list)
+        etag = data_versions.etag('machines', suffix=format(zlib.crc32(statuses.encode()), 'x'))
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        return jsonify({'machines': machines_list}), 200
+        return with_etag((jsonify({'machines': machines_list}), 200), etag)
 
     except Exception as e:
         return jsonify({'message': f'Failed to get machines: {str(e)}'}), 500
@@ -376,16 +3024,30 @@ def get_machines():
 
 @app.route('/api/bookings', methods=['POST'])
 def create_booking():
-    """Create a new booking"""
+    """Create a new booking, once admitted by the booking queue"""
+    session = current_session()
+    if not session:
+        return jsonify({'message': 'Please login again'}), 401
+    try:
+        with booking_admission.admit(session['id']):
+            return book_machine(session)
+    except BookingAdmissionRejected as e:
+        return retry_later(e.status, str(e), e.retry_after)
+
+def book_machine(session):
+    """Validate and insert a booking for the signed-in user"""
     try:
         data = request.get_json()
-        user_id = request.headers.get('Authorization', '').replace('Bearer ', '')
+        user_id = session['id']
         machine_id = data.get('machine_id')
         start_time = data.get('start_time')
         end_time = data.get('end_time')
 
         if not all([user_id, machine_id, start_time, end_time]):
             return jsonify({'message': 'All fields are required'}), 400
+        if isinstance(machine_id, bool) or not str(machine_id).isdigit():
+            return jsonify({'message': 'Invalid machine_id'}), 400
+        machine_id = int(machine_id)
 
         from datetime import datetime, timedelta
         start_dt = datetime.fromisoformat(start_time.replace('Z', '').replace('+00:00', ''))
@@ -401,7 +3063,7 @@ def create_booking():
 
         # Check if machine exists
         machine = db.execute(
-            'SELECT status FROM washing_machines WHERE id = ?', (machine_id,)
+            'SELECT machine_name, status FROM washing_machines WHERE id = ?', (machine_id,)
         ).fetchone()
 
         if not machine:
@@ -409,6 +3071,15 @@ def create_booking():
         if machine['status'] == 'broken':
             return jsonify({'message': 'Machine is out of order'}), 400
 
+        # In-memory conflict check: a hit is rejected without taking the write lock,
+        # and the SQL check below stays the final authority
+        if booking_index.has_conflict(db, machine_id, start_dt, end_dt):
+            return jsonify({'message': 'Time slot conflicts with existing booking'}), 400
+
+        # Take the write lock before checking, so concurrent requests for a slot
+        # (from any worker) are admitted one at a time
+        db.execute('BEGIN IMMEDIATE')
+
         # Check for conflicting bookings
         conflicts = db.execute('''
             SELECT id FROM bookings 
@@ -421,6 +3092,7 @@ def create_booking():
         ''', (machine_id, start_time, start_time, end_time, end_time, start_time, end_time)).fetchall()
 
         if conflicts:
+            db.rollback()
             return jsonify({'message': 'Time slot conflicts with existing booking'}), 400
 
         # Check if user already has a booking in the 10-day window starting from the new booking
@@ -432,6 +3104,7 @@ def create_booking():
         ''', (user_id, start_dt.isoformat(), ten_days_from_start.isoformat())).fetchone()
 
         if existing_bookings['count'] > 0:
+            db.rollback()
             return jsonify({'message': 'You can only have one booking within any 10-day period'}), 400
 
         # Create booking
@@ -441,41 +3114,48 @@ def create_booking():
         ''', (user_id, machine_id, start_time, end_time, 'confirmed'))
         booking_id = cursor.lastrowid
 
-        # Update machine status if the booking is currently active
-        current_time_now = datetime.now()
-        if start_dt <= current_time_now < end_dt:
-            db.execute('''
-                UPDATE washing_machines 
-                SET status = 'in_use', last_used_by = ?, last_used_time = ?
-                WHERE id = ?
-            ''', (user_id, current_time_now.isoformat(), machine_id))
-
-        # Get user and machine details for email
-        user = db.execute('''
-            SELECT username, email FROM users WHERE id = ?
-        ''', (user_id,)).fetchone()
-        machine = db.execute('''
-            SELECT machine_name FROM washing_machines WHERE id = ?
-        ''', (machine_id,)).fetchone()
-
-        db.commit()
+        # Machine status follows from the booking; the reconciler persists it
+        bump_versions(db, *booking_resources(machine_id, start_time))
 
-        # Send confirmation email
-        if user and user['email'] and machine:
-            send_booking_confirmation_email(
-                user['email'],
-                user['username'],
+        # Queue confirmation email in the same transaction as the booking
+        if session['email']:
+            queue_booking_confirmation_email(
+                db,
+                session['email'],
+                session['username'],
                 machine['machine_name'],
                 start_time,
                 end_time,
                 booking_id
             )
 
+        db.commit()
+        booking_index.add(machine_id, start_dt, end_dt, booking_id)
+        availability_grid.booking_added(machine_id, start_dt, end_dt)
+        booking_store.booking_added(db, booking_id)
+        response_cache.invalidate(*booking_resources(machine_id, start_time))
+        reminder_scheduler.booking_added(booking_id, start_time)
+        machine_state.notify()
+        email_outbox.notify()
+        event_bus.publish('booking', {
+            'action': 'created',
+            'id': booking_id,
+            'machine_id': machine_id,
+            'user_id': user_id,
+            'start_time': start_time,
+            'end_time': end_time
+        })
+
         return jsonify({
             'message': 'Booking created successfully',
             'booking_id': booking_id
         }), 201
 
+    except sqlite3.OperationalError as e:
+        # Another worker held the write lock past busy_timeout
+        if 'locked' in str(e):
+            return retry_later(503, 'Booking is busy, please retry shortly', booking_admission.retry_after())
+        return jsonify({'message': f'Booking failed: {str(e)}'}), 500
     except Exception as e:
         return jsonify({'message': f'Booking failed: {str(e)}'}), 500
 
@@ -484,25 +3164,17 @@ def create_booking():
 def get_user_bookings(user_id):
     """Get bookings for a specific user"""
     try:
-        db = get_db()
-        bookings = db.execute('''
-            SELECT b.id, b.start_time, b.end_time, b.status, b.created_at,
-                   m.machine_name
-            FROM bookings b
-            JOIN washing_machines m ON b.machine_id = m.id
-            WHERE b.user_id = ? AND b.status IN ("confirmed", "pending", "in_use") AND b.end_time >= CURRENT_TIMESTAMP
-            ORDER BY b.start_time DESC
-        ''', (user_id,)).fetchall()
+        bookings = booking_store.user_bookings(get_db(), user_id, utc_now())
         
         bookings_list = []
         for booking in bookings:
             bookings_list.append({
-                'id': booking['id'],
-                'machine_name': booking['machine_name'],
-                'start_time': booking['start_time'],
-                'end_time': booking['end_time'],
-                'status': booking['status'],
-                'created_at': booking['created_at']
+                'id': booking.id,
+                'machine_name': booking.machine_name,
+                'start_time': booking.start_time,
+                'end_time': booking.end_time,
+                'status': booking.status,
+                'created_at': booking.created_at
             })
         
         return jsonify({'bookings': bookings_list}), 200
@@ -514,60 +3186,70 @@ def get_user_bookings(user_id):
 def cancel_booking(booking_id):
     """Cancel a booking"""
     try:
-        user_id = request.headers.get('Authorization', '').replace('Bearer ', '')
+        session = current_session()
+        if not session:
+            return jsonify({'message': 'Please login again'}), 401
         
         db = get_db()
         
         # Check if booking exists and belongs to user, and get booking details
         booking = db.execute('''
             SELECT b.id, b.user_id, b.status, b.start_time, b.end_time, b.machine_id,
-                   u.username, u.email, m.machine_name
+                   m.machine_name
             FROM bookings b
-            JOIN users u ON b.user_id = u.id
             JOIN washing_machines m ON b.machine_id = m.id
             WHERE b.id = ? AND b.user_id = ?
-        ''', (booking_id, user_id)).fetchone()
+        ''', (booking_id, session['id'])).fetchone()
         
         if not booking:
             return jsonify({'message': 'Booking not found'}), 404
         
         if booking['status'] == 'completed':
             return jsonify({'message': 'Cannot cancel completed booking'}), 400
+        if booking['status'] == 'cancelled':
+            return jsonify({'message': 'Booking is already cancelled'}), 400
         
-        # Update booking status to cancelled
-        db.execute('''
-            UPDATE bookings SET status = 'cancelled' WHERE id = ?
-        ''', (booking_id,))
-        
-        # Check if there are any other active bookings for this machine
-        from datetime import datetime
-        current_time = datetime.now()  # This is timezone-naive
-        
-        active_bookings = db.execute('''
-            SELECT COUNT(*) as count FROM bookings 
-            WHERE machine_id = ? AND status IN ('pending', 'confirmed')
-            AND start_time <= ? AND end_time > ?
-        ''', (booking['machine_id'], current_time.isoformat(), current_time.isoformat())).fetchone()
-        
-        # If no active bookings, set machine back to available
-        if active_bookings['count'] == 0:
-            db.execute('''
-                UPDATE washing_machines SET status = 'available' WHERE id = ?
-            ''', (booking['machine_id'],))
-        
-        db.commit()
+        # Update booking status to cancelled; a concurrent cancel may have won the race
+        cancelled = db.execute('''
+            UPDATE bookings SET status = 'cancelled' WHERE id = ? AND status IN ('pending', 'confirmed')
+        ''', (booking_id,)).rowcount
+        if cancelled != 1:
+            db.rollback()
+            return jsonify({'message': 'Booking is already cancelled'}), 400
         
-        # Send cancellation email notification if user has email
-        if booking['email']:
-            send_booking_cancellation_email(
-                booking['email'],
-                booking['username'],
+        # Machine status follows from the remaining bookings; the reconciler persists it
+        bump_versions(db, *booking_resources(booking['machine_id'], booking['start_time']))
+
+        # Queue cancellation email notification if user has email
+        if session['email']:
+            queue_booking_cancellation_email(
+                db,
+                session['email'],
+                session['username'],
                 booking['machine_name'],
                 booking['start_time'],
                 booking['end_time'],
                 booking_id
             )
         
+        db.commit()
+        booking_index.remove(booking['machine_id'], parse_booking_time(booking['start_time']), booking_id)
+        availability_grid.booking_removed(booking['machine_id'], parse_booking_time(booking['start_time']),
+                                          parse_booking_time(booking['end_time']))
+        booking_store.bookings_removed([(booking['machine_id'], booking['start_time'], booking_id)])
+        response_cache.invalidate(*booking_resources(booking['machine_id'], booking['start_time']))
+        reminder_scheduler.booking_removed(booking_id)
+        machine_state.notify()
+        email_outbox.notify()
+        event_bus.publish('booking', {
+            'action': 'cancelled',
+            'id': booking_id,
+            'machine_id': booking['machine_id'],
+            'user_id': booking['user_id'],
+            'start_time': booking['start_time'],
+            'end_time': booking['end_time']
+        })
+        
         return jsonify({'message': 'Booking cancelled successfully'}), 200
         
     except Exception as e:
@@ -577,6 +3259,11 @@ def cancel_booking(booking_id):
 def get_admin_machines():
     """Get all machines for admin"""
     try:
+        etag = data_versions.etag('machines')
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
         db = get_db()
         machines = db.execute('''
             SELECT m.id, m.machine_name, m.status, m.last_used_by, m.last_used_time,
@@ -599,7 +3286,7 @@ def get_admin_machines():
                 'last_used_time': machine['last_used_time']
             })
         
-        return jsonify({'machines': machines_list}), 200
+        return with_etag((jsonify({'machines': machines_list}), 200), etag)
         
     except Exception as e:
         return jsonify({'message': f'Failed to get machines: {str(e)}'}), 500
@@ -608,6 +3295,10 @@ def get_admin_machines():
 def update_machine_status(machine_id):
     """Update machine status"""
     try:
+        session = current_session()
+        if not session or session['role'] != 'admin':
+            return jsonify({'message': 'Admin login required'}), 403
+
         data = request.get_json()
         status = data.get('status')
         
@@ -625,13 +3316,24 @@ def update_machine_status(machine_id):
             return jsonify({'message': 'Machine not found'}), 404
         
         # Update machine status
+        db.execute('BEGIN IMMEDIATE')
         db.execute('''
             UPDATE washing_machines SET status = ? WHERE id = ?
         ''', (status, machine_id))
+        bump_versions(db, 'machines')
+
+        # Move the machine's upcoming bookings elsewhere in the same transaction
+        moves, unplaced = [], []
+        if status == 'broken':
+            moves, unplaced = plan_reassignments(db, [machine_id])
+            apply_reassignments(db, moves, unplaced)
         
         db.commit()
+        machine_state.notify()
+        event_bus.publish('machine', {'id': machine_id, 'status': status})
+        reassignment = publish_reassignments(moves, unplaced)
         
-        return jsonify({'message': 'Machine status updated successfully'}), 200
+        return jsonify({'message': 'Machine status updated successfully', **reassignment}), 200
         
     except Exception as e:
         return jsonify({'message': f'Failed to update machine status: {str(e)}'}), 500
@@ -640,6 +3342,10 @@ def update_machine_status(machine_id):
 def add_machine():
     """Add a new machine"""
     try:
+        session = current_session()
+        if not session or session['role'] != 'admin':
+            return jsonify({'message': 'Admin login required'}), 403
+
         data = request.get_json()
         machine_name = data.get('machine_name')
         
@@ -653,6 +3359,7 @@ def add_machine():
             INSERT INTO washing_machines (machine_name, status)
             VALUES (?, ?)
         ''', (machine_name, 'available'))
+        bump_versions(db, 'machines')
         
         db.commit()
         
@@ -664,13 +3371,270 @@ def add_machine():
     except Exception as e:
         return jsonify({'message': f'Failed to add machine: {str(e)}'}), 500
 
+@app.route('/api/admin/bookings/cancel', methods=['POST'])
+def bulk_cancel_bookings():
+    """Cancel every active booking on a machine that overlaps a time range"""
+    try:
+        session = current_session()
+        if not session or session['role'] != 'admin':
+            return jsonify({'message': 'Admin login required'}), 403
+
+        data = request.get_json()
+        machine_id = data.get('machine_id')
+        start_time = data.get('start_time')
+        end_time = data.get('end_time')
+
+        if not all([machine_id, start_time, end_time]):
+            return jsonify({'message': 'machine_id, start_time and end_time are required'}), 400
+        try:
+            start_dt = parse_booking_time(start_time)
+            end_dt = parse_booking_time(end_time)
+        except ValueError:
+            return jsonify({'message': 'Invalid time range'}), 400
+        if end_dt <= start_dt:
+            return jsonify({'message': 'Invalid time range'}), 400
+
+        db = get_db()
+        db.execute('BEGIN IMMEDIATE')
+
+        bookings = db.execute('''
+            SELECT b.id, b.user_id, b.start_time, b.end_time, b.machine_id,
+                   m.machine_name, u.username, u.email
+            FROM bookings b
+            JOIN washing_machines m ON b.machine_id = m.id
+            JOIN users u ON b.user_id = u.id
+            WHERE b.machine_id = ? AND b.status IN ('pending', 'confirmed')
+            AND b.end_time > ? AND b.start_time < ?
+            ORDER BY b.start_time
+        ''', (machine_id, start_dt.isoformat(), end_dt.isoformat())).fetchall()
+
+        if not bookings:
+            db.rollback()
+            return jsonify({'message': 'No bookings to cancel', 'cancelled': []}), 200
+
+        # The rows were read under BEGIN IMMEDIATE, so their status cannot change before this write
+        db.executemany('''
+            UPDATE bookings SET status = 'cancelled' WHERE id = ?
+        ''', [(booking['id'],) for booking in bookings])
+
+        # Machine status follows from the remaining bookings; the reconciler persists it
+        resources = set()
+        for booking in bookings:
+            resources.update(booking_resources(booking['machine_id'], booking['start_time']))
+        bump_versions(db, *sorted(resources))
+
+        # One notice per user, however many of their bookings were cancelled
+        by_user = {}
+        for booking in bookings:
+            if booking['email']:
+                by_user.setdefault(booking['user_id'], []).append(booking)
+        queue_bulk_cancellation_emails(db, [
+            (user_bookings[0]['email'], user_bookings[0]['username'], user_bookings)
+            for user_bookings in by_user.values()
+        ])
+
+        db.commit()
+        for booking in bookings:
+            booking_index.remove(booking['machine_id'], parse_booking_time(booking['start_time']), booking['id'])
+        availability_grid.bookings_removed([
+            (booking['machine_id'], parse_booking_time(booking['start_time']), parse_booking_time(booking['end_time']))
+            for booking in bookings
+        ])
+        booking_store.bookings_removed([
+            (booking['machine_id'], booking['start_time'], booking['id']) for booking in bookings
+        ])
+        response_cache.invalidate(*sorted(resources))
+        for booking in bookings:
+            reminder_scheduler.booking_removed(booking['id'])
+        machine_state.notify()
+        email_outbox.notify()
+        for booking in bookings:
+            event_bus.publish('booking', {
+                'action': 'cancelled',
+                'id': booking['id'],
+                'machine_id': booking['machine_id'],
+                'user_id': booking['user_id'],
+                'start_time': booking['start_time'],
+                'end_time': booking['end_time']
+            })
+
+        return jsonify({
+            'message': f'{len(bookings)} bookings cancelled',
+            'cancelled': [booking['id'] for booking in bookings],
+            'users_notified': len(by_user)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to cancel bookings: {str(e)}'}), 500
+
+@app.route('/api/admin/machines/status', methods=['PUT'])
+def bulk_update_machine_status():
+    """Update the status of several machines at once"""
+    try:
+        session = current_session()
+        if not session or session['role'] != 'admin':
+            return jsonify({'message': 'Admin login required'}), 403
+
+        data = request.get_json(silent=True)
+        updates = data.get('machines') if isinstance(data, dict) else None
+
+        if not isinstance(updates, list) or not updates or len(updates) > BULK_MAX_ITEMS:
+            return jsonify({'message': f'Between 1 and {BULK_MAX_ITEMS} machines are required'}), 400
+        # Check the whole batch before touching anything, so a bad item cannot leave it half applied
+        invalid = []
+        seen = set()
+        for index, update in enumerate(updates):
+            if not isinstance(update, dict):
+                invalid.append({'index': index, 'message': 'Expected an object with id and status'})
+            elif not isinstance(update.get('id'), int) or isinstance(update.get('id'), bool):
+                invalid.append({'index': index, 'message': 'id must be an integer'})
+            elif update.get('status') not in ['available', 'in_use', 'broken']:
+                invalid.append({'index': index, 'message': 'status must be available, in_use or broken'})
+            elif update['id'] in seen:
+                invalid.append({'index': index, 'message': f"Machine {update['id']} is listed more than once"})
+            else:
+                seen.add(update['id'])
+        if invalid:
+            return jsonify({'message': 'Invalid machine updates', 'invalid': invalid}), 400
+
+        machine_ids = {update['id'] for update in updates}
+        db = get_db()
+        placeholders = ','.join('?' * len(machine_ids))
+        found = {row['id'] for row in db.execute(
+            f'SELECT id FROM washing_machines WHERE id IN ({placeholders})', list(machine_ids)
+        ).fetchall()}
+        missing = machine_ids - found
+        if missing:
+            return jsonify({'message': 'Machine not found', 'machine_ids': sorted(missing, key=str)}), 404
+
+        db.execute('BEGIN IMMEDIATE')
+        db.executemany('''
+            UPDATE washing_machines SET status = ? WHERE id = ?
+        ''', [(update['status'], update['id']) for update in updates])
+        bump_versions(db, 'machines')
+
+        moves, unplaced = [], []
+        broken_ids = [update['id'] for update in updates if update['status'] == 'broken']
+        if broken_ids:
+            moves, unplaced = plan_reassignments(db, broken_ids)
+            apply_reassignments(db, moves, unplaced)
+
+        db.commit()
+        machine_state.notify()
+        for update in updates:
+            event_bus.publish('machine', {'id': update['id'], 'status': update['status']})
+        reassignment = publish_reassignments(moves, unplaced)
+
+        return jsonify({'message': f'{len(updates)} machine statuses updated', **reassignment}), 200
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to update machine status: {str(e)}'}), 500
+
+@app.route('/api/admin/machines/bulk', methods=['POST'])
+def bulk_add_machines():
+    """Add several machines at once"""
+    try:
+        session = current_session()
+        if not session or session['role'] != 'admin':
+            return jsonify({'message': 'Admin login required'}), 403
+
+        data = request.get_json(silent=True)
+        machine_names = data.get('machine_names') if isinstance(data, dict) else None
+
+        if not isinstance(machine_names, list) or not machine_names or len(machine_names) > BULK_MAX_ITEMS:
+            return jsonify({'message': f'Between 1 and {BULK_MAX_ITEMS} machine names are required'}), 400
+        invalid = [{'index': index, 'message': 'Machine name is required'}
+                   for index, name in enumerate(machine_names) if not (isinstance(name, str) and name.strip())]
+        if invalid:
+            return jsonify({'message': 'Invalid machine names', 'invalid': invalid}), 400
+
+        db = get_db()
+        # Hold the write lock so the new ids are exactly those after the current maximum
+        db.execute('BEGIN IMMEDIATE')
+        last_id = db.execute('SELECT COALESCE(MAX(id), 0) FROM washing_machines').fetchone()[0]
+        db.executemany('''
+            INSERT INTO washing_machines (machine_name, status)
+            VALUES (?, ?)
+        ''', [(name, 'available') for name in machine_names])
+        machine_ids = [row['id'] for row in db.execute(
+            'SELECT id FROM washing_machines WHERE id > ? ORDER BY id', (last_id,)
+        ).fetchall()]
+        bump_versions(db, 'machines')
+
+        db.commit()
+
+        return jsonify({
+            'message': f'{len(machine_ids)} machines added successfully',
+            'machine_ids': machine_ids
+        }), 201
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to add machines: {str(e)}'}), 500
+
+def encode_bookings_cursor(start_time, booking_id):
+    return base64.urlsafe_b64encode(json.dumps([start_time, booking_id]).encode()).decode()
+
+def decode_bookings_cursor(cursor):
+    try:
+        start_time, booking_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(start_time), int(booking_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def admin_bookings_filters(args):
+    """WHERE conditions and parameters for the admin booking filters"""
+    conditions = []
+    params = []
+    if args.get("show_past", "false").lower() != "true":
+        conditions.append("b.end_time >= CURRENT_TIMESTAMP")
+    if args.get("machine_id"):
+        conditions.append("b.machine_id = ?")
+        params.append(int(args["machine_id"]))
+    if args.get("user_id"):
+        conditions.append("b.user_id = ?")
+        params.append(int(args["user_id"]))
+    if args.get("status"):
+        statuses = args["status"].split(",")
+        conditions.append(f"b.status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if args.get("from"):
+        conditions.append("b.start_time >= ?")
+        params.append(datetime.datetime.strptime(args["from"], '%Y-%m-%d').date().isoformat())
+    if args.get("to"):
+        day_after = datetime.datetime.strptime(args["to"], '%Y-%m-%d') + datetime.timedelta(days=1)
+        conditions.append("b.start_time < ?")
+        params.append(day_after.date().isoformat())
+    return conditions, params
+
 @app.route("/api/admin/bookings", methods=["GET"])
 def get_all_bookings():
-    """Get all bookings for admin"""
+    """Get bookings for admin, newest first, one keyset page at a time.
+
+    Supports machine_id, user_id, status, from and to filters. Pass
+    format=ndjson to stream every matching row instead of a page.
+    """
     try:
-        db = get_db()
         show_past = request.args.get("show_past", "false").lower() == "true"
 
+        # Without show_past the list only changes on writes or when the UTC date rolls over
+        etag = data_versions.etag('bookings', suffix='past' if show_past else utc_now().date().isoformat())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        try:
+            conditions, params = admin_bookings_filters(request.args)
+            stream = request.args.get("format") == "ndjson"
+            limit = request.args.get("limit", type=int)
+            if not stream:
+                limit = min(max(limit or ADMIN_BOOKINGS_PAGE_SIZE, 1), ADMIN_BOOKINGS_MAX_PAGE_SIZE)
+            if request.args.get("cursor"):
+                # Keyset continuation after the last row of the previous page
+                conditions.append("(b.start_time, b.id) < (?, ?)")
+                params.extend(decode_bookings_cursor(request.args["cursor"]))
+        except ValueError as e:
+            return jsonify({'message': f'Invalid filter: {str(e)}'}), 400
+
         query = """
             SELECT b.id, b.start_time, b.end_time, b.status, b.created_at,
                    u.username, u.student_id, m.machine_name
@@ -678,14 +3642,27 @@ def get_all_bookings():
             JOIN users u ON b.user_id = u.id
             JOIN washing_machines m ON b.machine_id = m.id
         """
-        if not show_past:
-            query += " WHERE b.end_time >= CURRENT_TIMESTAMP"
-        query += " ORDER BY b.start_time DESC"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY b.start_time DESC, b.id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        db = get_db()
+        cursor = db.execute(query, params)
+
+        if stream:
+            def generate():
+                for booking in cursor:
+                    yield json.dumps(dict(booking)) + '\n'
+
+            response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+            response.set_etag(etag)
+            return response
 
-        bookings = db.execute(query).fetchall()
-        
         bookings_list = []
-        for booking in bookings:
+        for booking in cursor:
             bookings_list.append({
                 'id': booking['id'],
                 'username': booking['username'],
@@ -696,8 +3673,13 @@ def get_all_bookings():
                 'status': booking['status'],
                 'created_at': booking['created_at']
             })
+
+        next_cursor = None
+        if len(bookings_list) == limit:
+            last = bookings_list[-1]
+            next_cursor = encode_bookings_cursor(last['start_time'], last['id'])
         
-        return jsonify({'bookings': bookings_list}), 200
+        return with_etag((jsonify({'bookings': bookings_list, 'next_cursor': next_cursor}), 200), etag)
         
     except Exception as e:
         return jsonify({'message': f'Failed to get bookings: {str(e)}'}), 500
@@ -706,8 +3688,6 @@ def get_all_bookings():
 def get_bookings_by_date(date):
     """Get all bookings for a specific date"""
     try:
-        db = get_db()
-        
         # Parse the date and create start and end of day
         from datetime import datetime, timedelta
         try:
@@ -716,34 +3696,46 @@ def get_bookings_by_date(date):
             end_of_day = start_of_day + timedelta(days=1)
         except ValueError:
             return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+        cache_key = f'bookings:date:{selected_date.date().isoformat()}'
+        etag = data_versions.etag(cache_key, 'bookings:retention')
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        body = response_cache.get(cache_key, etag)
+        if body is not None:
+            return cached_json(body, etag)
+
+        db = get_db()
         
-        # Get all bookings for this date
-        bookings = db.execute('''
-            SELECT b.id, b.machine_id, b.start_time, b.end_time, b.status, b.created_at,
-                   u.username, u.student_id, m.machine_name
-            FROM bookings b
-            JOIN users u ON b.user_id = u.id
-            JOIN washing_machines m ON b.machine_id = m.id
-            WHERE b.start_time >= ? AND b.start_time < ?
-            AND b.status IN ('confirmed') -- Only show confirmed bookings
-            ORDER BY b.start_time ASC
-        ''', (start_of_day.isoformat(), end_of_day.isoformat())).fetchall()
+        # Today onwards comes from the in-memory store; past dates still need the table
+        bookings = booking_store.day_bookings(db, start_of_day, end_of_day)
+        if bookings is None:
+            bookings = [BookingRecord.from_row(row) for row in db.execute(booking_store.COLUMNS + '''
+                WHERE b.start_time >= ? AND b.start_time < ?
+                AND b.status IN ('confirmed')
+                ORDER BY b.start_time ASC
+            ''', (start_of_day.isoformat(), end_of_day.isoformat()))]
         
         bookings_list = []
         for booking in bookings:
+            if booking.status != 'confirmed':  # Only show confirmed bookings
+                continue
             bookings_list.append({
-                'id': booking['id'],
-                'machine_id': booking['machine_id'],  # Added machine_id
-                'username': booking['username'],
-                'student_id': booking['student_id'],
-                'machine_name': booking['machine_name'],
-                'start_time': booking['start_time'],
-                'end_time': booking['end_time'],
-                'status': booking['status'],
-                'created_at': booking['created_at']
+                'id': booking.id,
+                'machine_id': booking.machine_id,  # Added machine_id
+                'username': booking.username,
+                'student_id': booking.student_id,
+                'machine_name': booking.machine_name,
+                'start_time': booking.start_time,
+                'end_time': booking.end_time,
+                'status': booking.status,
+                'created_at': booking.created_at
             })
         
-        return jsonify({'bookings': bookings_list}), 200
+        body = jsonify({'bookings': bookings_list}).get_data()
+        response_cache.put(cache_key, etag, body)
+        return cached_json(body, etag)
         
     except Exception as e:
         return jsonify({'message': f'Failed to get bookings: {str(e)}'}), 500
@@ -753,6 +3745,18 @@ def get_bookings_by_date(date):
 def get_machine_bookings(machine_id):
     """Get all bookings for a specific machine"""
     try:
+        cache_key = f'bookings:machine:{machine_id}'
+        now = utc_now()
+        # The list drops each booking once it ends, so the validator changes at the next end too
+        next_end = booking_store.machine_next_end(get_db(), machine_id, now)
+        etag = data_versions.etag('machines', cache_key, suffix=next_end)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        body = response_cache.get(cache_key, etag)
+        if body is not None:
+            return cached_json(body, etag)
+
         db = get_db()
         
         # Check if machine exists
@@ -764,39 +3768,173 @@ def get_machine_bookings(machine_id):
             return jsonify({'message': 'Machine not found'}), 404
         
         # Get all bookings for this machine
-        bookings = db.execute('''
-            SELECT b.id, b.start_time, b.end_time, b.status, b.created_at,
-                   u.username, u.student_id
-            FROM bookings b
-            JOIN users u ON b.user_id = u.id
-            WHERE b.machine_id = ? AND b.status IN ("pending", "confirmed") AND b.end_time >= CURRENT_TIMESTAMP
-            ORDER BY b.start_time ASC
-        ''', (machine_id,)).fetchall()
+        bookings = booking_store.machine_bookings(db, machine_id, now)
         
         bookings_list = []
         for booking in bookings:
             bookings_list.append({
-                'id': booking['id'],
-                'username': booking['username'],
-                'student_id': booking['student_id'],
-                'start_time': booking['start_time'],
-                'end_time': booking['end_time'],
-                'status': booking['status'],
-                'created_at': booking['created_at']
+                'id': booking.id,
+                'username': booking.username,
+                'student_id': booking.student_id,
+                'start_time': booking.start_time,
+                'end_time': booking.end_time,
+                'status': booking.status,
+                'created_at': booking.created_at
             })
         
-        return jsonify({
+        body = jsonify({
             'machine_name': machine['machine_name'],
             'bookings': bookings_list
-        }), 200
+        }).get_data()
+        response_cache.put(cache_key, etag, body)
+        return cached_json(body, etag)
         
     except Exception as e:
         return jsonify({'message': f'Failed to get machine bookings: {str(e)}'}), 500
 
 
+@app.route('/api/availability', methods=['GET'])
+def get_availability():
+    """Busy/free bitmap per machine per day from the precomputed grid"""
+    try:
+        days = min(max(request.args.get('days', AVAILABILITY_DAYS, type=int), 1), AVAILABILITY_DAYS)
+        machines = machine_state.snapshot()
+        origin, bitmaps = availability_grid.day_bitmaps([machine['id'] for machine in machines], days)
+
+        return jsonify({
+            'origin': origin.isoformat() + 'Z',
+            'slot_minutes': AVAILABILITY_SLOT_MINUTES,
+            'days': days,
+            # Bit i (least significant first) is set when slot i of that day is booked
+            'machines': [{
+                'id': machine['id'],
+                'machine_name': machine['machine_name'],
+                'status': machine['status'],
+                'busy': bitmaps[machine['id']]
+            } for machine in machines]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to get availability: {str(e)}'}), 500
+
+
+@app.route('/api/availability/next', methods=['GET'])
+def get_next_free_slot():
+    """Earliest free slot of the given duration on any working machine"""
+    try:
+        duration = request.args.get('duration', 60, type=int)
+        if duration <= 0 or duration > 120:
+            return jsonify({'message': 'Duration must be between 1 and 120 minutes'}), 400
+        after = utc_now()
+        if request.args.get('after'):
+            try:
+                after = max(parse_booking_time(request.args['after']), after)
+            except ValueError:
+                return jsonify({'message': 'Invalid after time'}), 400
+
+        machine_ids = [machine['id'] for machine in machine_state.snapshot() if machine['status'] != 'broken']
+        if request.args.get('machine_id'):
+            machine_ids = [machine_id for machine_id in machine_ids
+                           if machine_id == request.args.get('machine_id', type=int)]
+
+        found = availability_grid.next_free(machine_ids, after, datetime.timedelta(minutes=duration))
+        if not found:
+            return jsonify({'message': 'No free slot in the booking window'}), 404
+        start, machine_id = found
+
+        return jsonify({
+            'machine_id': machine_id,
+            'start_time': start.isoformat() + 'Z',
+            'end_time': (start + datetime.timedelta(minutes=duration)).isoformat() + 'Z'
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to find a free slot: {str(e)}'}), 500
+
+
+class GoogleCertCache:
+    """Google's token signing certificates, cached for the max-age Google sends.
+
+    Accepts both the PEM map served by the v1 certs endpoint and a JWKS
+    document, so GOOGLE_CERTS_URL can point at a local stand-in. Anyone can
+    send a token with a made-up key id, so refreshes it forces are limited
+    to one per GOOGLE_CERTS_MIN_REFRESH seconds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.session = http_requests.Session()
+        self.certs = {}
+        self.expires_at = 0
+        self.fetched_at = None
+
+    def get(self, refresh=False):
+        with self.lock:
+            now = time.monotonic()
+            if (refresh and self.fetched_at is not None and now < self.expires_at
+                    and now - self.fetched_at < GOOGLE_CERTS_MIN_REFRESH):
+                return self.certs
+            if refresh or now >= self.expires_at:
+                response = self.session.get(GOOGLE_CERTS_URL, timeout=10)
+                response.raise_for_status()
+                self.certs = self.parse(response.json())
+                self.fetched_at = time.monotonic()
+                self.expires_at = self.fetched_at + self.max_age(response.headers.get('Cache-Control', ''))
+            return self.certs
+
+    @staticmethod
+    def parse(document):
+        if 'keys' not in document:
+            return document
+        certs = {}
+        for key in document['keys']:
+            if key.get('kty') != 'RSA':
+                continue
+            n = int.from_bytes(base64.urlsafe_b64decode(key['n'] + '=' * (-len(key['n']) % 4)), 'big')
+            e = int.from_bytes(base64.urlsafe_b64decode(key['e'] + '=' * (-len(key['e']) % 4)), 'big')
+            certs[key['kid']] = rsa.PublicKey(n, e).save_pkcs1().decode()
+        return certs
+
+    @staticmethod
+    def max_age(cache_control):
+        for directive in cache_control.split(','):
+            name, _, value = directive.strip().partition('=')
+            if name.lower() == 'max-age' and value.isdigit():
+                return int(value)
+        return GOOGLE_CERTS_DEFAULT_MAX_AGE
+
+google_certs = GoogleCertCache()
+
+# Verified token claims keyed by SHA-256 of the token
+google_token_cache = cachetools.TTLCache(maxsize=GOOGLE_TOKEN_CACHE_SIZE, ttl=GOOGLE_TOKEN_CACHE_TTL)
+google_token_cache_lock = threading.Lock()
+
+def verify_google_token_claims(token):
+    """Verify a Google ID token's signature, audience and issuer; returns its claims"""
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    with google_token_cache_lock:
+        idinfo = google_token_cache.get(token_hash)
+    if idinfo is not None and idinfo['exp'] > time.time():
+        return idinfo
+
+    key_id = google_jwt.decode_header(token).get('kid')
+    certs = google_certs.get()
+    if key_id not in certs:
+        # Google rotated its keys before our copy expired, or the key id is made up
+        certs = google_certs.get(refresh=True)
+        if key_id not in certs:
+            raise ValueError(f'Unknown key id: {key_id}')
+    idinfo = google_jwt.decode(token, certs=certs, audience=GOOGLE_CLIENT_ID)
+    if idinfo['iss'] not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer: {idinfo['iss']}")
+
+    with google_token_cache_lock:
+        google_token_cache[token_hash] = idinfo
+    return idinfo
+
 def verify_google_id_token(token):
     try:
-        idinfo = id_token.verify_oauth2_token(token, grequests.Request(), "624690583385-s3cnmv6iro5kjjror5oq6t4iulerrcde.apps.googleusercontent.com")
+        idinfo = verify_google_token_claims(token)
 
         email = idinfo['email']
         if not email.endswith('@lnmiit.ac.in'):
@@ -849,7 +3987,8 @@ def google_login():
                 'student_id': user['student_id'],
                 'username': user['username'],
                 'email': user_data['email'],
-                'role': user['role']
+                'role': user['role'],
+                'token': issue_session_token(user['id'], user['role'], user['username'], user_data['email'])
             }
         }), 200
 
@@ -895,7 +4034,8 @@ def google_register():
                 'student_id': user_data['student_id'],
                 'username': user_data['name'],
                 'email': user_data['email'],
-                'role': 'user'
+                'role': 'user',
+                'token': issue_session_token(cursor.lastrowid, 'user', user_data['name'], user_data['email'])
             }
         }), 201
 
@@ -903,6 +4043,241 @@ def google_register():
         return jsonify({'message': f'Google registration failed: {str(e)}'}), 500
 
 
+@app.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """Server-Sent Events stream of machine status changes and booking deltas"""
+    subscription = event_bus.subscribe()
+    if subscription is None:
+        # Every stream pins a worker thread; refused clients poll instead
+        return retry_later(503, 'Too many live update streams, poll instead', STREAM_FULL_RETRY_AFTER)
+
+    def format_event(event, data):
+        return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            machines = machine_state.snapshot()
+            last_status = {machine['id']: machine['status'] for machine in machines}
+            yield format_event('machines', {'machines': machines})
+            while True:
+                try:
+                    event, data = subscription.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Catch changes made by other workers or at booking boundaries
+                    changed = False
+                    for machine in machine_state.snapshot():
+                        if last_status.get(machine['id']) != machine['status']:
+                            last_status[machine['id']] = machine['status']
+                            changed = True
+                            yield format_event('machine', {'id': machine['id'], 'status': machine['status']})
+                    if not changed:
+                        yield ': keep-alive\n\n'
+                    continue
+                if event == 'machine':
+                    last_status[data['id']] = data['status']
+                yield format_event(event, data)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # A body that is never iterated (HEAD, a client gone before the first chunk)
+    # never reaches the generator's finally, but the response is always closed
+    response.call_on_close(lambda: event_bus.unsubscribe(subscription))
+    return response
+
+
+def analytics_range(args):
+    """(first_day, last_day) from the from/to query args, both inclusive"""
+    today = utc_now().date()
+    last_day = datetime.datetime.strptime(args['to'], '%Y-%m-%d').date() if args.get('to') else today
+    if args.get('from'):
+        first_day = datetime.datetime.strptime(args['from'], '%Y-%m-%d').date()
+    else:
+        first_day = last_day - datetime.timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    if first_day > last_day:
+        raise ValueError('from is after to')
+    if (last_day - first_day).days >= ANALYTICS_MAX_DAYS:
+        raise ValueError(f'range is longer than {ANALYTICS_MAX_DAYS} days')
+    return first_day, last_day
+
+@app.route('/api/admin/analytics/usage', methods=['GET'])
+def get_usage_analytics():
+    """Machine utilization and a weekday x hour heatmap from the hourly aggregates.
+
+    Covers bookings that have ended and been rolled up, including ones
+    retention has since deleted. Accepts from and to (YYYY-MM-DD, default
+    the last 30 days).
+    """
+    try:
+        session = current_session()
+        if not session or session['role'] != 'admin':
+            return jsonify({'message': 'Admin login required'}), 403
+
+        try:
+            first_day, last_day = analytics_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': f'Invalid range: {str(e)}'}), 400
+
+        etag = data_versions.etag('usage', 'machines', suffix=f'{first_day}:{last_day}')
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        machines = sorted(machine_state.snapshot(), key=lambda machine: machine['id'])
+        summary = usage_analytics.summarize(first_day, last_day, [machine['id'] for machine in machines])
+        machine_minutes = summary['machine_minutes']
+        heatmap = summary['heatmap']
+        peaks = sorted(((heatmap[weekday][hour], weekday, hour) for weekday in range(7) for hour in range(24)),
+                       reverse=True)[:5]
+        total_minutes = sum(machine_minutes)
+
+        return with_etag((jsonify({
+            'from': first_day.isoformat(),
+            'to': last_day.isoformat(),
+            'hours': summary['hours'],
+            'overall_utilization': round(total_minutes / (summary['hours'] * 60 * len(machines)) * 100, 2) if machines else 0.0,
+            'machines': [{
+                'id': machine['id'],
+                'machine_name': machine['machine_name'],
+                'bookings': summary['machine_bookings'][index],
+                'booked_hours': round(machine_minutes[index] / 60, 2),
+                'utilization': round(summary['machine_utilization'][index], 2)
+            } for index, machine in enumerate(machines)],
+            # Rows are weekdays from Monday, columns UTC hours; values are percent of machine time booked
+            'heatmap': [[round(value, 2) for value in row] for row in heatmap],
+            'peak_hours': [{'weekday': weekday, 'hour': hour, 'utilization': round(value, 2)}
+                           for value, weekday, hour in peaks if value > 0]
+        }), 200), etag)
+
+    except Exception as e:
+        return jsonify({'message': f'Failed to get usage analytics: {str(e)}'}), 500
+
+@app.route('/api/admin/analytics/export', methods=['GET'])
+def export_usage_analytics():
+    """Stream the hourly aggregates for a date range as CSV, straight from the cursor"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+
+    try:
+        first_day, last_day = analytics_range(request.args)
+    except ValueError as e:
+        return jsonify({'message': f'Invalid range: {str(e)}'}), 400
+
+    etag = data_versions.etag('usage', 'machines', suffix=f'csv:{first_day}:{last_day}')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    start = usage_hour(datetime.datetime.combine(first_day, datetime.time()))
+    end = usage_hour(datetime.datetime.combine(last_day, datetime.time())) + 24
+    cursor = get_db().execute('''
+        SELECT u.hour, u.machine_id, m.machine_name, u.bookings, u.booked_minutes
+        FROM usage_hourly u
+        LEFT JOIN washing_machines m ON u.machine_id = m.id
+        WHERE u.hour >= ? AND u.hour < ?
+        ORDER BY u.hour, u.machine_id
+    ''', (start, end))
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('hour_start', 'machine_id', 'machine_name', 'bookings', 'booked_minutes'))
+        while True:
+            rows = cursor.fetchmany(ANALYTICS_EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            writer.writerows(((USAGE_EPOCH + datetime.timedelta(hours=hour)).isoformat() + 'Z',
+                              machine_id, machine_name, count, round(minutes, 2))
+                             for hour, machine_id, machine_name, count, minutes in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=usage-{first_day}-{last_day}.csv'
+    response.set_etag(etag)
+    return response
+
+
+@app.route('/api/admin/db-pool', methods=['GET'])
+def get_db_pool_metrics():
+    """Connection pool metrics for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({'pid': os.getpid(), 'pool': db_pool.metrics()}), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request latency and SQL metrics for this worker, in Prometheus text format"""
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/admin/booking-store', methods=['GET'])
+def get_booking_store_metrics():
+    """In-memory booking read model size for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({'pid': os.getpid(), 'booking_store': booking_store.metrics()}), 200
+
+
+@app.route('/api/admin/reminders', methods=['GET'])
+def get_reminder_metrics():
+    """Booking reminder scheduler state for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({'pid': os.getpid(), 'reminders': reminder_scheduler.metrics()}), 200
+
+
+@app.route('/api/admin/booking-queue', methods=['GET'])
+def get_booking_queue_metrics():
+    """Booking admission queue metrics for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({'pid': os.getpid(), 'queue': booking_admission.metrics()}), 200
+
+
+@app.route('/api/admin/password-hasher', methods=['GET'])
+def get_password_hasher_metrics():
+    """Password hashing pool metrics for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({'pid': os.getpid(), 'hasher': password_hasher.metrics()}), 200
+
+
+@app.route('/api/admin/response-cache', methods=['GET'])
+def get_response_cache_metrics():
+    """Booking view response cache metrics for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({
+        'pid': os.getpid(),
+        'shared': bool(RESPONSE_CACHE_SHARED_PATH),
+        'cache': response_cache.metrics()
+    }), 200
+
+
+@app.route('/api/admin/jobs', methods=['GET'])
+def get_job_metrics():
+    """Background job run-time and lag metrics for this worker"""
+    session = current_session()
+    if not session or session['role'] != 'admin':
+        return jsonify({'message': 'Admin login required'}), 403
+    return jsonify({'pid': os.getpid(), 'owner': scheduler.owner(), 'jobs': scheduler.metrics()}), 200
+
+
 @app.route('/')
 def home():
     """Serve the main HTML file"""
@@ -928,14 +4303,31 @@ def api_docs():
         <li>PUT /api/admin/machines/<machine_id>/status - Update machine status</li>
         <li>POST /api/admin/machines - Add new machine</li>
         <li>GET /api/admin/bookings - Get all bookings (admin)</li>
+        <li>POST /api/admin/bookings/cancel - Cancel a machine's bookings in a time range (admin)</li>
+        <li>PUT /api/admin/machines/status - Update several machine statuses (admin)</li>
+        <li>POST /api/admin/machines/bulk - Add several machines (admin)</li>
+        <li>GET /api/availability - Busy/free bitmap per machine per day</li>
+        <li>GET /api/availability/next - Next free slot on any machine</li>
+        <li>GET /api/stream - Live machine status and booking updates (Server-Sent Events)</li>
+        <li>GET /api/admin/db-pool - Database connection pool metrics</li>
+        <li>GET /api/admin/jobs - Background job metrics</li>
+        <li>GET /api/admin/response-cache - Booking view response cache metrics</li>
+        <li>GET /api/admin/password-hasher - Password hashing pool metrics</li>
+        <li>GET /api/admin/booking-queue - Booking admission queue metrics</li>
+        <li>GET /api/admin/reminders - Booking reminder scheduler state</li>
+        <li>GET /api/admin/booking-store - In-memory booking read model size</li>
+        <li>GET /api/admin/analytics/usage - Machine utilization and peak-hour heatmap</li>
+        <li>GET /api/admin/analytics/export - Hourly usage aggregates as streamed CSV</li>
+        <li>GET /metrics - Request latency and SQL metrics (Prometheus)</li>
     </ul>
     '''
 
 if __name__ == '__main__':
-    # Initialize database
-    init_db()
     # For production, use a WSGI server like gunicorn or waitress, not Flask's built-in server.
-    # Example: gunicorn -w 4 app:app
+    # Each /api/stream client holds one thread for as long as it is open, so run threaded
+    # workers: 'gunicorn app:app' picks up gunicorn.conf.py (4 gthread workers x 64 threads),
+    # which serves up to 4 x (64 - STREAM_RESERVED_THREADS) = 224 streams. Further clients
+    # fall back to polling.
     app.run(host='0.0.0.0', port=5000, debug=False)
 
 
@@ -0,0 +1,98 @@
+"""Usage analytics: rollup throughput, summary latency and CSV export.
+
+Seeds a year of ended bookings, times rollup_usage() folding them into
+usage_hourly, then compares a year-long summary over the columnar copy
+with the same figures computed by a GROUP BY over the raw bookings, and
+times streaming the export through the test client.
+
+Usage: python benchmarks/bench_analytics.py [ended_bookings]
+"""
+import os
+import sys
+import tempfile
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed_ended(db, count):
+    now = booking_app.utc_now().replace(minute=0, second=0, microsecond=0)
+    origin = now - datetime.timedelta(days=360)
+    step = (now - origin) / count
+    starts = ((origin + step * i).replace(microsecond=0) for i in range(count))
+    rows = ((1, i % 8 + 1, start.isoformat() + '.000Z',
+             (start + datetime.timedelta(minutes=45)).isoformat() + '.000Z',
+             'cancelled' if i % 10 == 0 else 'confirmed')
+            for i, start in enumerate(starts))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+    return origin.date(), now.date()
+
+
+def best_time(func, rounds=5):
+    best = None
+    for _ in range(rounds):
+        began = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        first_day, last_day = seed_ended(db, count)
+
+        began = time.perf_counter()
+        rolled = booking_app.rollup_usage()
+        rollup_time = time.perf_counter() - began
+        aggregates = db.execute('SELECT COUNT(*) FROM usage_hourly').fetchone()[0]
+
+        machine_ids = [row[0] for row in db.execute('SELECT id FROM washing_machines ORDER BY id')]
+        analytics = booking_app.UsageAnalytics()
+        began = time.perf_counter()
+        analytics.summarize(first_day, last_day, machine_ids)
+        load_time = time.perf_counter() - began
+        summary_time = best_time(lambda: analytics.summarize(first_day, last_day, machine_ids))
+
+        # What the endpoint would cost straight off the bookings table
+        def raw_query():
+            db.execute('''
+                SELECT machine_id, strftime('%w', start_time) AS weekday, strftime('%H', start_time) AS hour,
+                       COUNT(*), SUM((julianday(end_time) - julianday(start_time)) * 1440)
+                FROM bookings
+                WHERE status IN ('confirmed', 'completed') AND start_time >= ? AND start_time < ?
+                GROUP BY machine_id, weekday, hour
+            ''', (first_day.isoformat(), (last_day + datetime.timedelta(days=1)).isoformat())).fetchall()
+        raw_time = best_time(raw_query)
+
+    client = booking_app.app.test_client()
+    admin = client.post('/api/admin/login', json={'admin_id': 'admin', 'password': 'admin123'}).get_json()['admin']
+    began = time.perf_counter()
+    response = client.get(f'/api/admin/analytics/export?from={first_day}&to={last_day}',
+                          headers={'Authorization': f"Bearer {admin['token']}"})
+    exported = response.get_data().count(b'\n') - 1
+    export_time = time.perf_counter() - began
+
+    print(f"{count} ended bookings over {(last_day - first_day).days + 1} days")
+    print(f"rollup_usage:           {rolled} bookings -> {aggregates} hourly rows in {rollup_time * 1000:.0f} ms "
+          f"({rolled / rollup_time:.0f} bookings/s)")
+    print(f"columnar load (once):   {load_time * 1000:8.1f} ms")
+    print(f"year summary, columnar: {summary_time * 1000:8.1f} ms")
+    print(f"year GROUP BY, raw:     {raw_time * 1000:8.1f} ms")
+    print(f"CSV export:             {exported} rows in {export_time * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
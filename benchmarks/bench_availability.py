@@ -0,0 +1,96 @@
+"""Availability lookups: per-request SQL scan vs the precomputed bitmap grid.
+
+Usage: python benchmarks/bench_availability.py [bookings] [requests]
+"""
+import os
+import sys
+import math
+import random
+import tempfile
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+WINDOW_SQL = '''
+    SELECT machine_id, start_time, end_time FROM bookings
+    WHERE status IN ('pending', 'confirmed') AND end_time > ? AND start_time < ?
+'''
+
+
+def seed_bookings(db, count, origin):
+    machine_ids = [row[0] for row in db.execute('SELECT id FROM washing_machines').fetchall()]
+    rng = random.Random(7)
+    rows = []
+    for _ in range(count):
+        start = origin + datetime.timedelta(minutes=15 * rng.randrange(booking_app.AVAILABILITY_DAYS * 96))
+        rows.append((1, rng.choice(machine_ids), start.isoformat() + '.000Z',
+                     (start + datetime.timedelta(minutes=15 * rng.randint(1, 8))).isoformat() + '.000Z', 'confirmed'))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+    return machine_ids
+
+
+def sql_next_free(db, machine_ids, after, duration):
+    """What a handler without the grid does: load the window and walk slots"""
+    slot = datetime.timedelta(minutes=booking_app.AVAILABILITY_SLOT_MINUTES)
+    horizon = after + booking_app.AVAILABILITY_DAYS * datetime.timedelta(days=1)
+    busy = {machine_id: set() for machine_id in machine_ids}
+    for row in db.execute(WINDOW_SQL, (after.isoformat(), horizon.isoformat())).fetchall():
+        start = booking_app.parse_booking_time(row['start_time'])
+        end = booking_app.parse_booking_time(row['end_time'])
+        first = max(int((start - after) / slot), 0)
+        for i in range(first, math.ceil((end - after) / slot)):
+            busy.setdefault(row['machine_id'], set()).add(i)
+    needed = math.ceil(duration / slot)
+    for i in range(int((horizon - after) / slot) - needed):
+        for machine_id in machine_ids:
+            if not any(i + k in busy[machine_id] for k in range(needed)):
+                return after + i * slot, machine_id
+    return None
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    booking_app.init_db()
+    origin = booking_app.utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        machine_ids = seed_bookings(db, count, origin)
+        duration = datetime.timedelta(minutes=60)
+
+        began = time.perf_counter()
+        for _ in range(requests):
+            sql_next_free(db, machine_ids, origin, duration)
+        sql_time = time.perf_counter() - began
+
+        began = time.perf_counter()
+        booking_app.availability_grid.next_free(machine_ids, origin, duration)
+        load_time = time.perf_counter() - began
+
+        began = time.perf_counter()
+        for _ in range(requests):
+            booking_app.availability_grid.next_free(machine_ids, origin, duration)
+        grid_time = time.perf_counter() - began
+
+        began = time.perf_counter()
+        for _ in range(requests):
+            booking_app.availability_grid.day_bitmaps(machine_ids, booking_app.AVAILABILITY_DAYS)
+        bitmap_time = time.perf_counter() - began
+
+    print(f"{count} bookings on {len(machine_ids)} machines, {requests} requests (grid load {load_time * 1000:.0f} ms)")
+    print(f"sql next-free:  {sql_time / requests * 1000:8.3f} ms/request")
+    print(f"grid next-free: {grid_time / requests * 1000:8.3f} ms/request")
+    print(f"grid bitmaps:   {bitmap_time / requests * 1000:8.3f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
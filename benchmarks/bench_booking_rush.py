@@ -0,0 +1,171 @@
+"""Synthetic booking rush: 2,000 clients posting bookings at the same moment.
+
+Every client is a distinct signed-in user who wants one of the slots on a
+freshly opened day, and a share of them double-submit. The burst goes over
+HTTP to a gunicorn started on a temporary database, twice: once with the
+admission queue effectively disabled (BOOKING_ADMISSION_CONCURRENCY set
+past the client count, so every request goes straight for the write lock)
+and once with the defaults. A separate in-process check confirms waiters
+are admitted in arrival order.
+
+Usage: python benchmarks/bench_booking_rush.py [clients] [--workers N] [--threads N] [--double PERCENT] [--queue N]
+"""
+import os
+import sys
+import argparse
+import collections
+import datetime
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+
+import app as booking_app
+from loadtest import start_gunicorn
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def seed_users(db, count, prefix):
+    # Inserted directly: registering 2,000 users would spend minutes in scrypt
+    db.executemany('INSERT INTO users (student_id, username, password, role) VALUES (?, ?, ?, ?)',
+                   [(f'{prefix}{i}', f'Rush {i}', 'x', 'user') for i in range(count)])
+    db.commit()
+    rows = db.execute('SELECT id, username FROM users WHERE student_id LIKE ?', (f'{prefix}%',)).fetchall()
+    return [booking_app.issue_session_token(row['id'], 'user', row['username'], None) for row in rows]
+
+
+def day_slots(day):
+    slots = []
+    for machine_id in range(1, 9):
+        for half_hour in range(48):
+            start = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(minutes=30 * half_hour)
+            slots.append((machine_id, start.isoformat() + '.000Z',
+                          (start + datetime.timedelta(minutes=30)).isoformat() + '.000Z'))
+    return slots
+
+
+def burst(base_url, tokens, slots, double_percent):
+    rng = random.Random(42)
+    requests_ = []
+    for token in tokens:
+        body = dict(zip(('machine_id', 'start_time', 'end_time'), rng.choice(slots)))
+        requests_.append((token, body))
+        if rng.random() * 100 < double_percent:
+            requests_.append((token, body))
+    rng.shuffle(requests_)
+
+    results = []
+    start = threading.Barrier(len(requests_) + 1)
+
+    def client(token, body):
+        start.wait()
+        began = time.perf_counter()
+        try:
+            response = requests.post(base_url + '/api/bookings', json=body, timeout=60,
+                                     headers={'Authorization': f'Bearer {token}'})
+            outcome = (response.status_code, response.headers.get('Retry-After'))
+        except requests.RequestException as e:
+            outcome = (type(e).__name__, None)
+        results.append(outcome + (time.perf_counter() - began,))
+
+    threads = [threading.Thread(target=client, args=item) for item in requests_]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - began
+
+
+def report(label, results, elapsed):
+    statuses = collections.Counter(status for status, _, _ in results)
+    latencies = [seconds for _, _, seconds in results]
+    shed = [seconds for status, _, seconds in results if status in (429, 503)]
+    retry_after = sorted({int(value) for _, value, _ in results if value})
+    print(f"{label}: {len(results)} requests in {elapsed:.2f} s, statuses {dict(sorted(statuses.items(), key=str))}")
+    print(f"  latency p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  "
+          f"max {max(latencies) * 1000:7.1f} ms")
+    if shed:
+        print(f"  shed requests answered in p50 {percentile(shed, 0.5) * 1000:.1f} ms, Retry-After values {retry_after}")
+
+
+def check_fifo(count):
+    admission = booking_app.BookingAdmission(1, count, 10)
+    order = []
+    holder = admission.acquire('holder')
+    threads = []
+    for i in range(count):
+        def waiter(i=i):
+            admitted_at = admission.acquire(i)
+            order.append(i)
+            admission.release(i, admitted_at)
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        threads.append(thread)
+        # Let each waiter enqueue before the next arrives
+        while admission.metrics()['depth'] < i + 1:
+            time.sleep(0.0005)
+    admission.release('holder', holder)
+    for thread in threads:
+        thread.join()
+    print(f"FIFO check: {count} waiters admitted in arrival order: {order == list(range(count))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clients', type=int, nargs='?', default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--double', type=float, default=10, help='percent of clients that submit twice')
+    parser.add_argument('--queue', type=int, default=booking_app.BOOKING_ADMISSION_QUEUE,
+                        help='BOOKING_ADMISSION_QUEUE for the queued run')
+    args = parser.parse_args()
+
+    booking_app.init_db()
+    threading.stack_size(256 * 1024)
+    runs = (('no admission queue', str(args.clients * 2)),
+            ('admission queue   ', str(booking_app.BOOKING_ADMISSION_CONCURRENCY)))
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        for offset, (label, concurrency) in enumerate(runs, start=1):
+            # Each run opens a fresh day to a fresh set of users
+            day = booking_app.utc_now().date() + datetime.timedelta(days=offset)
+            tokens = seed_users(db, args.clients, f'rush{offset}-')
+            os.environ['BOOKING_ADMISSION_CONCURRENCY'] = concurrency
+            os.environ['BOOKING_ADMISSION_QUEUE'] = str(args.queue)
+            process, base_url = start_gunicorn(args)
+            try:
+                results, elapsed = burst(base_url, tokens, day_slots(day), args.double)
+                metrics = requests.get(base_url + '/metrics', timeout=10).text
+            finally:
+                process.terminate()
+                process.wait()
+            report(label, results, elapsed)
+            booked, overlaps = db.execute('''
+                SELECT (SELECT COUNT(*) FROM bookings WHERE status = 'confirmed' AND start_time LIKE ?1),
+                       (SELECT COUNT(*) FROM bookings a JOIN bookings b
+                        ON a.machine_id = b.machine_id AND a.id < b.id
+                        AND a.start_time < b.end_time AND b.start_time < a.end_time
+                        WHERE a.status = 'confirmed' AND b.status = 'confirmed' AND a.start_time LIKE ?1)
+            ''', (day.isoformat() + '%',)).fetchone()
+            print(f"  {booked} bookings stored, {overlaps} overlaps")
+            print('  one worker\'s queue metrics: ' + ', '.join(
+                line for line in metrics.splitlines()
+                if line.startswith(('booking_admission_rejected', 'booking_admission_wait_seconds_count',
+                                    'booking_admission_wait_seconds_sum'))))
+    check_fifo(200)
+
+
+if __name__ == '__main__':
+    main()
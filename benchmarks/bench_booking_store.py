@@ -0,0 +1,142 @@
+"""Booking read model: memory and lookup cost at 10k and 100k active bookings.
+
+Compares the memory held by BookingStore (__slots__ records, per-machine
+array timelines, shared name strings) with the same rows materialized as
+one dict per row, as the handlers used to build them, and times the
+machine, date and user lookups against the SQL each of them replaced.
+
+Usage: python benchmarks/bench_booking_store.py [sizes...]
+"""
+import os
+import sys
+import tempfile
+import time
+import datetime
+import tracemalloc
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+MACHINES = 16
+USERS = 2000
+
+
+def seed(db, origin, first, count):
+    db.executemany('''
+        INSERT OR IGNORE INTO washing_machines (id, machine_name, status) VALUES (?, ?, 'available')
+    ''', [(machine_id, f'Machine {machine_id}') for machine_id in range(1, MACHINES + 1)])
+    db.executemany('''
+        INSERT OR IGNORE INTO users (id, student_id, username, password) VALUES (?, ?, ?, 'x')
+    ''', [(user_id, f'bench{user_id:05d}', f'Student {user_id}') for user_id in range(10, USERS + 10)])
+    rows = []
+    for i in range(first, first + count):
+        start = origin + datetime.timedelta(hours=i // MACHINES)
+        rows.append((i % USERS + 10, i % MACHINES + 1, start.isoformat() + '.000Z',
+                     (start + datetime.timedelta(minutes=50)).isoformat() + '.000Z', 'confirmed'))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+
+
+def measure(build):
+    tracemalloc.start()
+    began = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - began
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def per_call(func, rounds=200):
+    began = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - began) / rounds * 1e6
+
+
+def report(db, count, origin):
+    store = booking_app.BookingStore()
+
+    def load_store():
+        with store.lock:
+            store._ensure_fresh(db)
+        return store
+
+    def load_dicts():
+        return [dict(row) for row in db.execute(booking_app.BookingStore.COLUMNS + '''
+            WHERE b.status IN ('pending', 'confirmed') AND b.end_time > ?
+        ''', (origin.isoformat(),))]
+
+    _, store_bytes, _ = measure(load_store)
+    store = booking_app.BookingStore()
+    began = time.perf_counter()
+    load_store()
+    store_time = time.perf_counter() - began
+    rows, dict_bytes, _ = measure(load_dicts)
+    print(f"{count} active bookings on {MACHINES} machines, {USERS} users")
+    print(f"  dict per row:  {dict_bytes / 2 ** 20:7.1f} MB  ({dict_bytes / len(rows):4.0f} B/booking)")
+    print(f"  BookingStore:  {store_bytes / 2 ** 20:7.1f} MB  ({store_bytes / len(rows):4.0f} B/booking), "
+          f"loaded in {store_time * 1000:.0f} ms")
+
+    now = origin + datetime.timedelta(hours=count // MACHINES // 2)
+    day_start = now.replace(hour=0)
+    day_end = day_start + datetime.timedelta(days=1)
+
+    def machine_sql():
+        return [dict(row) for row in db.execute('''
+            SELECT b.id, b.start_time, b.end_time, b.status, b.created_at, u.username, u.student_id
+            FROM bookings b
+            JOIN users u ON b.user_id = u.id
+            WHERE b.machine_id = ? AND b.status IN ('pending', 'confirmed') AND b.end_time >= ?
+            ORDER BY b.start_time ASC
+        ''', (3, now.isoformat()))]
+
+    def day_sql():
+        return [dict(row) for row in db.execute(booking_app.BookingStore.COLUMNS + '''
+            WHERE b.start_time >= ? AND b.start_time < ? AND b.status IN ('confirmed')
+            ORDER BY b.start_time ASC
+        ''', (day_start.isoformat(), day_end.isoformat()))]
+
+    def user_sql():
+        return [dict(row) for row in db.execute('''
+            SELECT b.id, b.start_time, b.end_time, b.status, b.created_at, m.machine_name
+            FROM bookings b
+            JOIN washing_machines m ON b.machine_id = m.id
+            WHERE b.user_id = ? AND b.status IN ('confirmed', 'pending') AND b.end_time >= ?
+            ORDER BY b.start_time DESC
+        ''', (42, now.isoformat()))]
+
+    lookups = [
+        ('machine view', machine_sql, lambda: store.machine_bookings(db, 3, now)),
+        ('date view', day_sql, lambda: store.day_bookings(db, day_start, day_end)),
+        ('user view', user_sql, lambda: store.user_bookings(db, 42, now)),
+    ]
+    for name, sql, memory in lookups:
+        assert len(sql()) == len(memory()), name
+        print(f"  {name:13s} {len(memory()):5d} rows: SQL {per_call(sql):8.1f} us, store {per_call(memory):8.1f} us")
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000]
+    booking_app.init_db()
+    # Keep the reminder scheduler's startup load out of the measurements
+    while not booking_app.reminder_scheduler.loaded:
+        time.sleep(0.1)
+    origin = booking_app.utc_now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        seeded = 0
+        for size in sorted(sizes):
+            seed(db, origin, seeded, size - seeded)
+            seeded = size
+            report(db, size, origin)
+
+
+if __name__ == '__main__':
+    main()
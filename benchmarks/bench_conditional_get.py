@@ -0,0 +1,106 @@
+"""304 hit rate and CPU saved by ETag revalidation on the read endpoints.
+
+Simulated clients poll every read endpoint, sending back the last ETag
+they saw, while a writer creates a booking now and then. The same
+workload is replayed without If-None-Match for comparison.
+
+Usage: python benchmarks/bench_conditional_get.py [clients] [rounds] [write_every]
+"""
+import os
+import sys
+import tempfile
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed(client, users):
+    user_ids = []
+    tokens = []
+    for i in range(users):
+        credentials = {'student_id': f'bench{i:05d}', 'password': 'secret'}
+        response = client.post('/api/register', json=dict(credentials, username=f'Bench {i}'))
+        user_ids.append(response.get_json()['user_id'])
+        tokens.append(client.post('/api/login', json=credentials).get_json()['user']['token'])
+    return user_ids, tokens
+
+
+def seed_history(user_ids, count):
+    origin = booking_app.utc_now().replace(minute=0, second=0, microsecond=0) - datetime.timedelta(days=50)
+    rows = []
+    for i in range(count):
+        start = origin + datetime.timedelta(hours=i // 8)
+        rows.append((user_ids[i % len(user_ids)], i % 8 + 1, start.isoformat() + '.000Z',
+                     (start + datetime.timedelta(hours=1)).isoformat() + '.000Z', 'confirmed'))
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        db.executemany('''
+            INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        db.commit()
+
+
+def run(client, urls, clients, rounds, write_every, tokens, conditional):
+    etags = {}
+    statuses = {200: 0, 304: 0}
+    origin = booking_app.utc_now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+    writes = 0
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for round_number in range(rounds):
+        if write_every and round_number % write_every == 0 and writes < len(tokens):
+            start = origin + datetime.timedelta(days=11 * (writes // 8), hours=writes % 8)
+            client.post('/api/bookings', headers={'Authorization': f'Bearer {tokens[writes]}'}, json={
+                'machine_id': writes % 8 + 1,
+                'start_time': start.isoformat() + '.000Z',
+                'end_time': (start + datetime.timedelta(hours=1)).isoformat() + '.000Z'
+            })
+            writes += 1
+        for client_number in range(clients):
+            for url in urls:
+                headers = {}
+                if conditional and (client_number, url) in etags:
+                    headers['If-None-Match'] = etags[(client_number, url)]
+                response = client.get(url, headers=headers)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.headers.get('ETag'):
+                    etags[(client_number, url)] = response.headers['ETag']
+    return statuses, time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    write_every = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    booking_app.init_db()
+    client = booking_app.app.test_client()
+    user_ids, tokens = seed(client, 2 * rounds)
+    seed_history(user_ids, 2000)
+    today = booking_app.utc_now().date().isoformat()
+    urls = [
+        '/api/machines',
+        '/api/admin/machines',
+        '/api/admin/bookings',
+        '/api/admin/bookings?show_past=true',
+        f'/api/bookings/date/{today}',
+        '/api/machines/1/bookings'
+    ]
+
+    plain, plain_cpu, plain_wall = run(client, urls, clients, rounds, write_every, tokens[:rounds], False)
+    conditional, cond_cpu, cond_wall = run(client, urls, clients, rounds, write_every, tokens[rounds:], True)
+
+    total = sum(conditional.values())
+    print(f"{clients} clients x {rounds} rounds x {len(urls)} endpoints, a booking every {write_every} rounds")
+    print(f"unconditional: {plain} cpu {plain_cpu:.2f}s wall {plain_wall:.2f}s")
+    print(f"conditional:   {conditional} cpu {cond_cpu:.2f}s wall {cond_wall:.2f}s")
+    print(f"304 hit rate: {conditional.get(304, 0) / total:.1%}, CPU saved: {1 - cond_cpu / plain_cpu:.1%}")
+
+
+if __name__ == '__main__':
+    main()
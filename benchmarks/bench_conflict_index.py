@@ -0,0 +1,82 @@
+"""Conflict check cost: SQL OR-predicate scan vs the in-memory interval index.
+
+Usage: python benchmarks/bench_conflict_index.py [historical_bookings] [probes]
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+CONFLICT_SQL = '''
+    SELECT id FROM bookings
+    WHERE machine_id = ? AND status IN ('pending', 'confirmed')
+    AND (
+        (start_time <= ? AND end_time > ?) OR
+        (start_time < ? AND end_time >= ?) OR
+        (start_time >= ? AND end_time <= ?)
+    )
+'''
+
+
+def seed_bookings(db, count, machines=8):
+    # Upcoming bookings: the index only holds those that have not ended
+    origin = booking_app.utc_now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    rows = []
+    for i in range(count):
+        start = origin + datetime.timedelta(hours=(i // machines) * 2)
+        rows.append((1, i % machines + 1, start.isoformat() + '.000Z',
+                     (start + datetime.timedelta(hours=1)).isoformat() + '.000Z', 'confirmed'))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+    return origin, origin + datetime.timedelta(hours=(count // machines) * 2)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    probes = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        first, last = seed_bookings(db, count)
+        span = int((last - first).total_seconds() // 60)
+        rng = random.Random(7)
+        windows = []
+        for _ in range(probes):
+            start = first + datetime.timedelta(minutes=rng.randrange(span))
+            windows.append((rng.randint(1, 8), start, start + datetime.timedelta(minutes=45)))
+
+        began = time.perf_counter()
+        booking_app.booking_index.load()
+        load_time = time.perf_counter() - began
+
+        began = time.perf_counter()
+        sql_hits = 0
+        for machine_id, start, end in windows:
+            s, e = start.isoformat() + '.000Z', end.isoformat() + '.000Z'
+            sql_hits += bool(db.execute(CONFLICT_SQL, (machine_id, s, s, e, e, s, e)).fetchall())
+        sql_time = time.perf_counter() - began
+
+        began = time.perf_counter()
+        index_hits = 0
+        for machine_id, start, end in windows:
+            index_hits += booking_app.booking_index.has_conflict(db, machine_id, start, end)
+        index_time = time.perf_counter() - began
+
+    print(f"{count} bookings, {probes} probes (index load {load_time * 1000:.0f} ms)")
+    print(f"sql:   {sql_time / probes * 1e6:9.1f} us/check  ({sql_hits} conflicts)")
+    print(f"index: {index_time / probes * 1e6:9.1f} us/check  ({index_hits} conflicts)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Messages rendered per second: f-string + MIMEMultipart vs precompiled templates.
+
+The baseline rebuilds the confirmation body with an f-string and wraps it
+in a fresh MIMEMultipart for as_string(), as the sender used to. The new
+path renders the Jinja2 HTML and plain-text templates through
+email_renderer.render_batch() and assembles each message with mime().
+Also times queue_template_emails() writing a bulk notice batch to the
+outbox.
+
+Usage: python benchmarks/bench_email_render.py [messages]
+"""
+import os
+import sys
+import tempfile
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def legacy_message(to_email, context):
+    body = f"""
+    <html>
+    <body>
+        <h2>Booking Confirmation</h2>
+        <p>Dear {context['username']},</p>
+        <p>Your washing machine booking has been confirmed successfully!</p>
+        <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
+            <h3>Booking Details:</h3>
+            <p><strong>Booking ID:</strong> #{context['booking_id']}</p>
+            <p><strong>Machine:</strong> {context['machine_name']}</p>
+            <p><strong>Start Time:</strong> {context['start_time']}</p>
+            <p><strong>End Time:</strong> {context['end_time']}</p>
+        </div>
+        <p><strong>Important Notes:</strong></p>
+        <ul>
+            <li>Please arrive on time for your slot</li>
+            <li>Ensure you complete your laundry within the allocated time</li>
+            <li>If you need to cancel, please do so at least 30 minutes before your slot</li>
+        </ul>
+        <p>Thank you for using the LNMIIT Girls Hostel Washing Machine Booking System!</p>
+        <p>Best regards,<br>
+        LNMIIT Girls Hostel Management</p>
+    </body>
+    </html>
+    """
+    msg = MIMEMultipart()
+    msg['From'] = booking_app.EMAIL_FROM
+    msg['To'] = to_email
+    msg['Subject'] = booking_app.EMAIL_SUBJECTS['booking_confirmation']
+    msg.attach(MIMEText(body, 'html'))
+    return msg.as_string()
+
+
+def contexts(count):
+    return [(f'student{i}@lnmiit.ac.in', {
+        'username': f'Student {i}',
+        'machine_name': f'Machine {i % 8 + 1}',
+        'start_time': '2025-07-05T18:00:00.000Z',
+        'end_time': '2025-07-05T19:00:00.000Z',
+        'booking_id': i
+    }) for i in range(count)]
+
+
+def best_rate(func, count, rounds=3):
+    best = None
+    for _ in range(rounds):
+        began = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    messages = contexts(count)
+    renderer = booking_app.email_renderer
+
+    def legacy():
+        for to_email, context in messages:
+            legacy_message(to_email, context)
+
+    def templated():
+        rendered = renderer.render_batch('booking_confirmation', [context for _, context in messages])
+        for (to_email, _), (subject, html, text) in zip(messages, rendered):
+            renderer.mime(to_email, subject, html, text)
+
+    def render_only():
+        renderer.render_batch('booking_confirmation', [context for _, context in messages])
+
+    print(f"{count} confirmation messages (best of 3)")
+    print(f"f-string + MIMEMultipart (HTML only): {best_rate(legacy, count):9.0f} msgs/s")
+    print(f"templates + reused headers (HTML+text): {best_rate(templated, count):7.0f} msgs/s")
+    print(f"  of which template rendering only:   {best_rate(render_only, count):9.0f} msgs/s")
+
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        notices = [(to_email, context['username'], [dict(context, id=context['booking_id'])])
+                   for to_email, context in messages]
+        began = time.perf_counter()
+        booking_app.queue_bulk_cancellation_emails(db, notices)
+        db.commit()
+        elapsed = time.perf_counter() - began
+        queued = db.execute('SELECT COUNT(*) FROM email_outbox').fetchone()[0]
+    print(f"queue_bulk_cancellation_emails: {queued} notices rendered and queued in {elapsed * 1000:.0f} ms "
+          f"({queued / elapsed:.0f} msgs/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Google ID token verification cost with the certificate and claims caches.
+
+Also sends tokens with made-up key ids, which may force at most one
+certificate fetch per GOOGLE_CERTS_MIN_REFRESH seconds. Runs fully offline:
+a local HTTP server plays Google's JWKS endpoint and tokens are signed with
+a locally generated RSA key.
+
+Usage: python benchmarks/bench_google_token_cache.py [users] [logins_per_user]
+"""
+import os
+import sys
+import json
+import base64
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rsa
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+KEY_ID = 'local-test-key'
+public_key, private_key = rsa.newkeys(2048)
+cert_fetches = []
+
+
+def b64(number):
+    raw = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        cert_fetches.append(time.time())
+        body = json.dumps({'keys': [{
+            'kty': 'RSA', 'alg': 'RS256', 'use': 'sig', 'kid': KEY_ID,
+            'n': b64(public_key.n), 'e': b64(public_key.e)
+        }]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', 'public, max-age=3600')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), JWKSHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ['GOOGLE_CERTS_URL'] = f'http://127.0.0.1:{server.server_port}/certs'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), KEY_ID)
+
+
+def make_token(student_id, token_signer=signer):
+    now = int(time.time())
+    return google_jwt.encode(token_signer, {
+        'iss': 'https://accounts.google.com',
+        'aud': booking_app.GOOGLE_CLIENT_ID,
+        'sub': student_id,
+        'email': f'{student_id}@lnmiit.ac.in',
+        'name': student_id.upper(),
+        'iat': now,
+        'exp': now + 3600
+    }).decode()
+
+
+def timed(fn, *args):
+    began = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - began
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    booking_app.init_db()
+    client = booking_app.app.test_client()
+    tokens = [make_token(f'22ucs{i:04d}') for i in range(users)]
+
+    cold = timed(booking_app.verify_google_token_claims, tokens[0])
+    fresh = [timed(booking_app.verify_google_token_claims, token) for token in tokens[1:]]
+    cached = [timed(booking_app.verify_google_token_claims, token) for token in tokens for _ in range(logins)]
+
+    for token in tokens:
+        assert client.post('/api/google-register', json={'token': token}).status_code == 201
+    began = time.perf_counter()
+    for token in tokens:
+        for _ in range(logins):
+            assert client.post('/api/google-login', json={'token': token}).status_code == 200
+    login_time = time.perf_counter() - began
+
+    fetches_before = len(cert_fetches)
+    unknown = 0
+    for i in range(100):
+        forged = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), f'made-up-{i}')
+        try:
+            booking_app.verify_google_token_claims(make_token(f'22ucs{i:04d}', forged))
+        except ValueError:
+            unknown += 1
+    forced_fetches = len(cert_fetches) - fetches_before
+
+    print(f"cold verify (cert fetch + RSA): {cold * 1000:.2f} ms")
+    print(f"new token, cached certs:        {sum(fresh) / len(fresh) * 1e6:.0f} us")
+    print(f"repeat token, cached claims:    {sum(cached) / len(cached) * 1e6:.1f} us")
+    print(f"/api/google-login: {users * logins / login_time:.0f} logins/s, certificate fetches: {len(cert_fetches)}")
+    print(f"unknown key ids: {unknown}/100 rejected, {forced_fetches} forced certificate fetch(es)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Latency of GET /api/machines with many concurrent pollers.
+
+Usage: python benchmarks/bench_machine_polling.py [pollers] [polls_per_poller]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed_bookings(count):
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        now = booking_app.utc_now().replace(minute=0, second=0, microsecond=0)
+        rows = []
+        for i in range(count):
+            start = now + datetime.timedelta(hours=i // 8 - 1)
+            rows.append((1, i % 8 + 1, start.isoformat() + '.000Z',
+                         (start + datetime.timedelta(hours=1)).isoformat() + '.000Z', 'confirmed'))
+        db.executemany('''
+            INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        db.commit()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    pollers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    polls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    booking_app.init_db()
+    seed_bookings(400)
+
+    latencies = []
+    lock = threading.Lock()
+    start_gate = threading.Event()
+
+    def poller():
+        client = booking_app.app.test_client()
+        start_gate.wait()
+        local = []
+        for _ in range(polls):
+            began = time.perf_counter()
+            response = client.get('/api/machines')
+            local.append(time.perf_counter() - began)
+            assert response.status_code == 200
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=poller) for _ in range(pollers)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    start_gate.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    print(f"{pollers} pollers x {polls} polls: {len(latencies) / elapsed:.0f} req/s")
+    for pct in (50, 95, 99):
+        print(f"p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Per-request cost of the timing middleware and SQL profiling.
+
+Runs the same requests through the Flask test client with METRICS_ENABLED
+off and on, alternating rounds so both see the same machine state.
+
+Usage: python benchmarks/bench_metrics_overhead.py [requests_per_round] [rounds]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    booking_app.init_db()
+    client = booking_app.app.test_client()
+    user_id = client.post('/api/register', json={
+        'student_id': 'bench', 'username': 'Bench', 'password': 'secret'
+    }).get_json()['user_id']
+    today = booking_app.utc_now().date().isoformat()
+    urls = {
+        'cached (no SQL)': '/api/machines',
+        'one query': f'/api/bookings/user/{user_id}',
+        'etag + query': f'/api/bookings/date/{today}'
+    }
+
+    results = {(name, enabled): [] for name in urls for enabled in (False, True)}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            booking_app.METRICS_ENABLED = enabled
+            for name, url in urls.items():
+                began = time.perf_counter()
+                for _ in range(count):
+                    client.get(url)
+                results[(name, enabled)].append((time.perf_counter() - began) / count)
+
+    print(f"{count} requests x {rounds} rounds per endpoint (best round)")
+    for name in urls:
+        off = min(results[(name, False)]) * 1e6
+        on = min(results[(name, True)]) * 1e6
+        print(f"{name:16s} off {off:7.1f} us  on {on:7.1f} us  overhead {on - off:6.1f} us ({(on - off) / off * 100:4.1f}%)")
+
+    began = time.perf_counter()
+    size = len(booking_app.request_metrics.render())
+    print(f"/metrics render: {(time.perf_counter() - began) * 1000:.2f} ms, {size} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Tune the scrypt cost and check a login storm against the hashing pool.
+
+First times one scrypt hash for each cost in a sweep and reports the
+largest N that stays under the target latency; put that exponent in
+PASSWORD_SCRYPT_LOG_N. Then fires concurrent logins through the Flask test
+client while another thread keeps requesting /api/machines, to show the
+cheap endpoints stay responsive while the pool is saturated.
+
+Usage: python benchmarks/bench_password_hash.py [target_ms] [concurrent_logins]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def sweep(target_ms):
+    print(f"scrypt cost sweep (r={booking_app.PASSWORD_SCRYPT_R}, p={booking_app.PASSWORD_SCRYPT_P}), "
+          f"target {target_ms} ms, {os.cpu_count()} CPUs")
+    chosen = None
+    for log_n in range(12, 18):
+        runs = []
+        for _ in range(3):
+            began = time.perf_counter()
+            booking_app.scrypt_key('correct horse', os.urandom(16), log_n,
+                                   booking_app.PASSWORD_SCRYPT_R, booking_app.PASSWORD_SCRYPT_P)
+            runs.append((time.perf_counter() - began) * 1000)
+        memory = 128 * booking_app.PASSWORD_SCRYPT_R * (1 << log_n) / 2 ** 20
+        print(f"  ln={log_n:2d}  {min(runs):7.1f} ms  {memory:5.0f} MB")
+        if min(runs) <= target_ms:
+            chosen = log_n
+    print(f"largest ln under target: {chosen} (configured: {booking_app.PASSWORD_SCRYPT_LOG_N})")
+
+
+def storm(logins):
+    booking_app.init_db()
+    booking_app.METRICS_ENABLED = False
+    client = booking_app.app.test_client()
+    client.post('/api/register', json={'student_id': 'bench', 'username': 'Bench', 'password': 'secret'})
+
+    statuses = []
+    login_times = []
+    probe_times = []
+    done = threading.Event()
+
+    def login():
+        own = booking_app.app.test_client()
+        began = time.perf_counter()
+        response = own.post('/api/login', json={'student_id': 'bench', 'password': 'secret'})
+        login_times.append(time.perf_counter() - began)
+        statuses.append(response.status_code)
+
+    def probe():
+        own = booking_app.app.test_client()
+        while not done.is_set():
+            began = time.perf_counter()
+            own.get('/api/machines')
+            probe_times.append(time.perf_counter() - began)
+            time.sleep(0.005)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    done.set()
+    prober.join()
+
+    metrics = booking_app.password_hasher.metrics()
+    print(f"{logins} concurrent logins, {metrics['workers']} hashing threads, backlog {metrics['backlog']}: "
+          f"{elapsed:.2f} s, {statuses.count(200)} ok, {statuses.count(503)} 503")
+    print(f"  login p50 {percentile(login_times, 0.5) * 1000:7.1f} ms  p99 {percentile(login_times, 0.99) * 1000:7.1f} ms")
+    print(f"  /api/machines during storm: {len(probe_times)} requests, "
+          f"p50 {percentile(probe_times, 0.5) * 1000:6.2f} ms  p99 {percentile(probe_times, 0.99) * 1000:6.2f} ms")
+
+
+def main():
+    target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    sweep(target_ms)
+    storm(logins)
+
+
+if __name__ == '__main__':
+    main()
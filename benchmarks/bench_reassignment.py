@@ -0,0 +1,72 @@
+"""Time to re-home every upcoming booking of a machine marked broken.
+
+Seeds back-to-back bookings on machine 1 and a partly booked timeline on
+the other machines, then breaks machine 1 through the admin API.
+
+Usage: python benchmarks/bench_reassignment.py [bookings_on_broken_machine]
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed_bookings(db, count):
+    db.execute("INSERT INTO users (student_id, username, password) VALUES ('bench', 'Bench', 'x')")
+    machine_ids = [row[0] for row in db.execute('SELECT id FROM washing_machines ORDER BY id').fetchall()]
+    origin = booking_app.utc_now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    rng = random.Random(7)
+    rows = []
+    for i in range(count):
+        start = origin + datetime.timedelta(hours=i)
+        for machine_id in machine_ids:
+            # Every booking on machine 1 must move; the others are busy about two thirds of the time
+            if machine_id == machine_ids[0] or rng.random() < 0.66:
+                rows.append((1, machine_id, start.isoformat() + '.000Z',
+                             (start + datetime.timedelta(hours=1)).isoformat() + '.000Z', 'confirmed'))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+    return machine_ids[0], len(rows)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        machine_id, total = seed_bookings(booking_app.get_db(), count)
+
+    client = booking_app.app.test_client()
+    admin = client.post('/api/admin/login', json={'admin_id': 'admin', 'password': 'admin123'}).get_json()['admin']
+
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        began = time.perf_counter()
+        moves, unplaced = booking_app.plan_reassignments(db, [machine_id])
+        plan_time = time.perf_counter() - began
+        db.rollback()
+
+    began = time.perf_counter()
+    report = client.put(f'/api/admin/machines/{machine_id}/status', json={'status': 'broken'},
+                        headers={'Authorization': f"Bearer {admin['token']}"}).get_json()
+    request_time = time.perf_counter() - began
+
+    same_slot = sum(1 for move in report['reassigned'] if move['shift_minutes'] == 0)
+    print(f"{count} bookings on the broken machine, {total} in total")
+    print(f"plan:    {plan_time * 1000:8.1f} ms ({len(moves)} moves, {len(unplaced)} unplaced)")
+    print(f"request: {request_time * 1000:8.1f} ms (plan, write, notices and index patches)")
+    print(f"same slot {same_slot}, shifted {len(report['reassigned']) - same_slot}, cancelled {len(report['cancelled'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Reminder heap vs polling the bookings table.
+
+Seeds upcoming confirmed bookings, then compares the one-off cost of
+loading them into a ReminderScheduler (and of patching it as bookings are
+created and cancelled) with what a once-a-minute poll for due reminders
+would cost on every tick.
+
+Usage: python benchmarks/bench_reminders.py [upcoming_bookings]
+"""
+import os
+import sys
+import tempfile
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed_upcoming(db, count):
+    origin = booking_app.utc_now().replace(second=0, microsecond=0) + datetime.timedelta(hours=1)
+    rows = ((1, i % 8 + 1, (origin + datetime.timedelta(minutes=i)).isoformat() + '.000Z',
+             (origin + datetime.timedelta(minutes=i + 30)).isoformat() + '.000Z', 'confirmed')
+            for i in range(count))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+    return origin
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        origin = seed_upcoming(db, count)
+
+        scheduler = booking_app.ReminderScheduler(datetime.timedelta(minutes=booking_app.REMINDER_LEAD_MINUTES), 200)
+        began = time.perf_counter()
+        scheduler.load()
+        load_time = time.perf_counter() - began
+
+        patches = 10000
+        began = time.perf_counter()
+        for i in range(patches):
+            start = (origin + datetime.timedelta(days=200, minutes=i)).isoformat() + '.000Z'
+            scheduler.booking_added(10 * count + i, start)
+            scheduler.booking_removed(10 * count + i)
+        patch_time = time.perf_counter() - began
+
+        # What a poller would run every minute to find reminders due in the next minute
+        ticks = 100
+        began = time.perf_counter()
+        for tick in range(ticks):
+            window_start = origin + datetime.timedelta(minutes=tick)
+            db.execute('''
+                SELECT b.id, b.start_time, b.end_time, u.username, u.email, m.machine_name
+                FROM bookings b
+                JOIN users u ON b.user_id = u.id
+                JOIN washing_machines m ON b.machine_id = m.id
+                WHERE b.status = 'confirmed' AND b.reminder_sent_at IS NULL
+                AND b.start_time >= ? AND b.start_time < ?
+            ''', (window_start.isoformat(), (window_start + datetime.timedelta(minutes=1)).isoformat())).fetchall()
+        poll_time = (time.perf_counter() - began) / ticks
+
+    metrics = scheduler.metrics()
+    print(f"{count} upcoming bookings, {metrics['pending']} reminders pending, next at {metrics['next_fire_at']}")
+    print(f"heap load at startup: {load_time * 1000:8.1f} ms once")
+    print(f"add + cancel patch:   {patch_time / patches * 1e6:8.2f} us per booking")
+    print(f"minute poll query:    {poll_time * 1000:8.3f} ms per tick, {poll_time * 1440 * 1000:.0f} ms per day, "
+          f"even when nothing is due")
+
+
+if __name__ == '__main__':
+    main()
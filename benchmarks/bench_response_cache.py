@@ -0,0 +1,106 @@
+"""Date and machine booking views with and without the response cache.
+
+Seeds a busy day, then times the two views through the Flask test client
+with the cache bypassed (ETag checked, body rebuilt) and with it warm. Also
+checks that a booking write only retires the keys it touches and that a
+second worker sharing RESPONSE_CACHE_SHARED_PATH is served from the store.
+
+Usage: python benchmarks/bench_response_cache.py [bookings] [requests]
+"""
+import os
+import sys
+import tempfile
+import time
+import datetime
+
+workdir = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE', os.path.join(workdir, 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ.setdefault('RESPONSE_CACHE_SHARED_PATH', os.path.join(workdir, 'responses.db'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed_day(db, day, count):
+    users = [(f'bench{i}', f'Bench {i}', 'x') for i in range(50)]
+    db.executemany('INSERT INTO users (student_id, username, password) VALUES (?, ?, ?)', users)
+    user_ids = [row[0] for row in db.execute("SELECT id FROM users WHERE student_id LIKE 'bench%'")]
+    origin = datetime.datetime.combine(day, datetime.time())
+    rows = []
+    for i in range(count):
+        start = origin + datetime.timedelta(seconds=i * 86400 // count)
+        rows.append((user_ids[i % len(user_ids)], i % 8 + 1, start.isoformat() + '.000Z',
+                     (start + datetime.timedelta(minutes=30)).isoformat() + '.000Z', 'confirmed'))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.execute("INSERT INTO data_versions (resource, version) VALUES ('bookings', 1) ON CONFLICT DO NOTHING")
+    db.commit()
+
+
+def time_requests(client, url, count):
+    began = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - began) / count
+
+
+def main():
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    booking_app.init_db()
+    booking_app.METRICS_ENABLED = False
+    day = booking_app.utc_now().date() + datetime.timedelta(days=1)
+    with booking_app.app.app_context():
+        seed_day(booking_app.get_db(), day, bookings)
+
+    client = booking_app.app.test_client()
+    cache = booking_app.response_cache
+    urls = {
+        'date view': f'/api/bookings/date/{day.isoformat()}',
+        'machine view': '/api/machines/1/bookings'
+    }
+
+    print(f"{bookings} bookings on {day}, {count} requests per view")
+    for name, url in urls.items():
+        # A zero-sized cache stores nothing, so every request rebuilds the body
+        booking_app.response_cache = booking_app.ResponseCache(0, 0)
+        uncached = time_requests(client, url, count)
+        booking_app.response_cache = cache
+        size = len(client.get(url).get_data())
+        cached = time_requests(client, url, count)
+        print(f"{name:12s} rebuilt {uncached * 1e6:8.1f} us  cached {cached * 1e6:7.1f} us  "
+              f"speedup {uncached / cached:5.1f}x  body {size / 1024:.1f} KB")
+
+    # A write on machine 2 retires that machine and the day, not machine 1
+    client.get('/api/machines/2/bookings')
+    before = cache.metrics()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        db.execute('UPDATE bookings SET status = ? WHERE id = (SELECT MIN(id) FROM bookings WHERE machine_id = 2)',
+                   ('cancelled',))
+        booking_app.bump_versions(db, *booking_app.booking_resources(2, day.isoformat()))
+        db.commit()
+    booking_app.response_cache.invalidate(*booking_app.booking_resources(2, day.isoformat()))
+    client.get(urls['machine view'])
+    client.get('/api/machines/2/bookings')
+    client.get(urls['date view'])
+    after = cache.metrics()
+    print(f"after a write on machine 2: {after['hits'] - before['hits']} hit (machine 1), "
+          f"{after['misses'] - before['misses']} misses (machine 2, date)")
+
+    # A second worker's cache finds the bodies this one stored
+    other = booking_app.ResponseCache(booking_app.RESPONSE_CACHE_MAX_ENTRIES, booking_app.RESPONSE_CACHE_MAX_BYTES,
+                                      booking_app.SharedResponseStore(booking_app.RESPONSE_CACHE_SHARED_PATH,
+                                                                      booking_app.RESPONSE_CACHE_MAX_ENTRIES))
+    booking_app.response_cache = other
+    client.get(urls['date view'])
+    client.get(urls['date view'])
+    print(f"second worker: {other.metrics()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Write lock hold during retention: one bulk DELETE vs batched cleanup.
+
+Seeds the same set of expired bookings twice, then deletes them with the
+old single statement and with cleanup_old_bookings(). A second thread keeps
+committing small writes meanwhile and records how long each one waited.
+
+Usage: python benchmarks/bench_retention.py [expired_rows]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import time
+import datetime
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def seed_expired(db, count):
+    origin = booking_app.utc_now().replace(microsecond=0) - datetime.timedelta(days=booking_app.RETENTION_DAYS + 1, minutes=count)
+    rows = ((1, i % 8 + 1, (origin + datetime.timedelta(minutes=i)).isoformat() + '.000Z',
+             (origin + datetime.timedelta(minutes=i + 30)).isoformat() + '.000Z', 'completed')
+            for i in range(count))
+    db.executemany('''
+        INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    db.commit()
+
+
+class WriteProbe:
+    """Commits a tiny write every few milliseconds and records how long each waited"""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.waits = []
+        self.timeouts = 0
+
+    def run(self):
+        conn = booking_app.connect_db()
+        while not self.stop.is_set():
+            began = time.perf_counter()
+            try:
+                conn.execute('''
+                    INSERT INTO data_versions (resource, version) VALUES ('bench:probe', 1)
+                    ON CONFLICT (resource) DO UPDATE SET version = version + 1
+                ''')
+                conn.commit()
+            except sqlite3.OperationalError:
+                # Gave up after busy_timeout, as a request would
+                conn.rollback()
+                self.timeouts += 1
+            self.waits.append(time.perf_counter() - began)
+            time.sleep(0.005)
+        conn.close()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+
+def database_size(db):
+    # The file itself only shrinks once the WAL is checkpointed
+    return db.execute('PRAGMA page_count').fetchone()[0] * db.execute('PRAGMA page_size').fetchone()[0]
+
+
+def report(label, elapsed, hold, probe):
+    waits = sorted(probe.waits)
+    print(f"{label}: {elapsed:7.2f} s total, max lock hold {hold * 1000:9.1f} ms, "
+          f"probe writes {len(waits)}, slowest {waits[-1] * 1000:8.1f} ms, "
+          f"p99 {waits[int(len(waits) * 0.99)] * 1000:6.1f} ms, timed out {probe.timeouts}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    booking_app.init_db()
+    cutoff = (booking_app.utc_now() - datetime.timedelta(days=booking_app.RETENTION_DAYS)).isoformat()
+
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        seed_expired(db, count)
+        size = database_size(db)
+        # Start each run with an empty WAL, or the probe pays for checkpointing the seed
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        with WriteProbe() as probe:
+            began = time.perf_counter()
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('DELETE FROM bookings WHERE end_time < ?', (cutoff,))
+            db.commit()
+            elapsed = time.perf_counter() - began
+        report('bulk DELETE', elapsed, elapsed, probe)
+
+        seed_expired(db, count)
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        with WriteProbe() as probe:
+            began = time.perf_counter()
+            stats = booking_app.cleanup_old_bookings()
+            elapsed = time.perf_counter() - began
+        report('batched    ', elapsed, stats['max_lock_hold_ms'] / 1000, probe)
+        vacuumed_size = database_size(db)
+
+    print(f"{count} rows, {stats['batches']} batches, database {size / 1e6:.1f} MB after seeding, "
+          f"{vacuumed_size / 1e6:.1f} MB after cleanup "
+          f"({stats['pages_vacuumed']} pages vacuumed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Per-request cost of verifying a signed session token.
+
+Usage: python benchmarks/bench_session_tokens.py [iterations]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    token = booking_app.issue_session_token(42, 'user', 'Bench User', 'bench@lnmiit.ac.in')
+    headers = {'Authorization': f'Bearer {token}'}
+
+    issue = timeit.timeit(
+        lambda: booking_app.issue_session_token(42, 'user', 'Bench User', 'bench@lnmiit.ac.in'),
+        number=iterations
+    )
+    verify = timeit.timeit(
+        lambda: booking_app.session_serializer.loads(token, max_age=booking_app.SESSION_TOKEN_MAX_AGE),
+        number=iterations
+    )
+    with booking_app.app.test_request_context('/api/bookings', headers=headers):
+        assert booking_app.current_session()['id'] == 42
+        in_request = timeit.timeit(booking_app.current_session, number=iterations)
+
+    print(f"token length: {len(token)} bytes")
+    print(f"issue:                   {issue / iterations * 1e6:.1f} us")
+    print(f"verify:                  {verify / iterations * 1e6:.1f} us")
+    print(f"current_session():       {in_request / iterations * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
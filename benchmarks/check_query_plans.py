@@ -0,0 +1,177 @@
+"""EXPLAIN QUERY PLAN regression check for the booking routes.
+
+Exercises every route through the Flask test client, then drives the
+background jobs, read models, reminder scheduler and email outbox once.
+Every SQLite connection the app opens is traced, so the SQL run on pooled,
+background-thread and shared-cache connections is captured as well. Fails
+(exit status 1) if any statement scans a whole table that grows with use
+instead of using an index.
+
+Usage: python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+import sqlite3
+import datetime
+import threading
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'plans.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+os.environ.setdefault('RESPONSE_CACHE_SHARED_PATH', os.path.join(tempfile.mkdtemp(), 'responses.db'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# (database path, statement) for every statement run on any connection
+traced = []
+traced_lock = threading.Lock()
+sqlite_connect = sqlite3.connect
+
+
+def traced_connect(database, *args, **kwargs):
+    """sqlite3.connect that records each statement the connection runs"""
+    db = sqlite_connect(database, *args, **kwargs)
+
+    def trace(statement):
+        with traced_lock:
+            traced.append((database, statement))
+
+    db.set_trace_callback(trace)
+    return db
+
+
+# Installed before the import so the pool and the threads started with the app are traced too
+sqlite3.connect = traced_connect
+
+import app as booking_app
+
+# Tables that grow with use, and how the queries refer to them
+GROWING_TABLES = ('bookings', 'b', 'email_outbox', 'usage_hourly', 'responses')
+
+# Statements that read a whole table by design
+ALLOWED_FULL_SCANS = (
+    'b.machine_id = m.id ORDER BY b.start_time DESC',  # admin history with show_past=true
+    'FROM usage_hourly ORDER BY hour, machine_id',  # UsageAnalytics loads the whole columnar copy once
+)
+
+
+def exercise_routes(client):
+    user_id = client.post('/api/register', json={
+        'student_id': 'plan001', 'username': 'Plan', 'password': 'secret'
+    }).get_json()['user_id']
+    user = client.post('/api/login', json={'student_id': 'plan001', 'password': 'secret'}).get_json()['user']
+    admin = client.post('/api/admin/login', json={'admin_id': 'admin', 'password': 'admin123'}).get_json()['admin']
+    headers = {'Authorization': f"Bearer {user['token']}"}
+    start = booking_app.utc_now().replace(second=0, microsecond=0) + datetime.timedelta(hours=1)
+    booking_id = client.post('/api/bookings', headers=headers, json={
+        'machine_id': 1,
+        'start_time': start.isoformat() + '.000Z',
+        'end_time': (start + datetime.timedelta(hours=1)).isoformat() + '.000Z'
+    }).get_json()['booking_id']
+    client.get('/api/machines')
+    client.get(f'/api/bookings/user/{user_id}')
+    client.get(f'/api/bookings/date/{start.date().isoformat()}')
+    client.get('/api/machines/1/bookings')
+    client.get('/api/admin/machines')
+    client.get('/api/admin/bookings')
+    client.get('/api/admin/bookings?show_past=true')
+    page = client.get('/api/admin/bookings?show_past=true&limit=1').get_json()
+    client.get(f"/api/admin/bookings?show_past=true&limit=1&cursor={page['next_cursor']}")
+    client.get(f'/api/admin/bookings?show_past=true&machine_id=1&status=confirmed&from={start.date()}&to={start.date()}')
+    client.get(f'/api/admin/bookings?show_past=true&user_id={user_id}')
+    client.get('/api/admin/bookings?show_past=true&format=ndjson').get_data()
+    client.put('/api/admin/machines/2/status', json={'status': 'broken'},
+               headers={'Authorization': f"Bearer {admin['token']}"})
+    client.delete(f'/api/bookings/{booking_id}', headers=headers)
+    admin_headers = {'Authorization': f"Bearer {admin['token']}"}
+    client.post('/api/bookings', headers=headers, json={
+        'machine_id': 1,
+        'start_time': start.isoformat() + '.000Z',
+        'end_time': (start + datetime.timedelta(hours=1)).isoformat() + '.000Z'
+    })
+    client.post('/api/admin/bookings/cancel', headers=admin_headers, json={
+        'machine_id': 1,
+        'start_time': start.isoformat() + 'Z',
+        'end_time': (start + datetime.timedelta(days=1)).isoformat() + 'Z'
+    })
+    client.put('/api/admin/machines/status', headers=admin_headers,
+               json={'machines': [{'id': 2, 'status': 'available'}, {'id': 3, 'status': 'broken'}]})
+    client.post('/api/admin/machines/bulk', headers=admin_headers, json={'machine_names': ['Plan A', 'Plan B']})
+    # Left confirmed for the reminder scheduler
+    later = start + datetime.timedelta(days=2)
+    client.post('/api/bookings', headers=headers, json={
+        'machine_id': 1,
+        'start_time': later.isoformat() + '.000Z',
+        'end_time': (later + datetime.timedelta(hours=1)).isoformat() + '.000Z'
+    })
+    booking_app.rollup_usage()
+    client.get('/api/admin/analytics/usage', headers=admin_headers)
+    client.get('/api/admin/analytics/export', headers=admin_headers).get_data()
+
+
+def exercise_background():
+    """Run the jobs and loaders the worker threads would, on their own connections"""
+    booking_app.cleanup_old_bookings()
+    booking_app.reconcile_machine_status()
+    booking_app.booking_store.load()
+    booking_app.booking_index.load()
+    booking_app.reminder_scheduler.load()
+    # Looked up untraced, this query is the check's own
+    lookup = sqlite_connect(booking_app.DATABASE)
+    due = lookup.execute("SELECT id, start_time FROM bookings WHERE status = 'confirmed'").fetchall()
+    lookup.close()
+    db = booking_app.connect_db()
+    try:
+        booking_app.reminder_scheduler.send(db, due)
+        batch = booking_app.email_outbox.claim(db)
+        booking_app.email_outbox.send_batch(db, None, batch)
+    finally:
+        db.close()
+
+
+def full_scans(db, statement):
+    if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+        return []
+    plan = db.execute('EXPLAIN QUERY PLAN ' + statement).fetchall()
+    # A keyset page walks the index in order and stops at its LIMIT
+    bounded = ' LIMIT ' in ' '.join(statement.split()).upper()
+    scans = []
+    for row in plan:
+        detail = row[3]
+        words = detail.split()
+        # Otherwise an index scan still walks every entry, so only SEARCH counts as indexed
+        if words[0] == 'SCAN' and words[1] in GROWING_TABLES and not (bounded and 'USING' in words):
+            scans.append(detail)
+    return scans
+
+
+def main():
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        exercise_routes(booking_app.app.test_client())
+        exercise_background()
+    sqlite3.connect = sqlite_connect
+
+    with traced_lock:
+        statements = list(dict.fromkeys(traced))
+    failures = []
+    explain = {}
+    for database, statement in statements:
+        normalized = ' '.join(statement.split())
+        if any(marker in normalized for marker in ALLOWED_FULL_SCANS):
+            continue
+        if database not in explain:
+            explain[database] = sqlite_connect(database)
+        for detail in full_scans(explain[database], statement):
+            failures.append((detail, normalized))
+
+    for detail, statement in failures:
+        print(f"FULL SCAN ({detail}): {statement}")
+    for database in explain:
+        count = sum(1 for path, _ in statements if path == database)
+        print(f"{os.path.basename(database)}: {count} statements")
+    print(f"{len(statements)} statements checked, {len(failures)} full scans")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
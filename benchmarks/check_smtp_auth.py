@@ -0,0 +1,79 @@
+"""SMTP session check: the outbox greets with EHLO and logs in before sending.
+
+Runs a stub SMTP server that advertises AUTH, points the outbox at it and
+sends one message through EmailOutbox.open_session(). Fails (exit status
+1) unless the server saw EHLO and then AUTH ahead of MAIL FROM.
+
+Usage: python benchmarks/check_smtp_auth.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import socketserver
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'smtp.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as booking_app
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: records the verb of every command"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            self.server.commands.append(verb)
+            if verb == 'EHLO':
+                self.reply('250-stub')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif verb == 'AUTH':
+                self.reply('235 2.7.0 Authentication successful')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+def main():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StubSMTPHandler)
+    server.commands = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    booking_app.EMAIL_HOST, booking_app.EMAIL_PORT = server.server_address
+    booking_app.EMAIL_USE_TLS = False
+    booking_app.EMAIL_USER = 'outbox@example.com'
+    booking_app.EMAIL_PASSWORD = 'secret'
+
+    session = booking_app.email_outbox.open_session()
+    session.sendmail(booking_app.EMAIL_USER, 'student@example.com',
+                     booking_app.email_renderer.mime('student@example.com', 'Check', '<p>Check</p>', 'Check'))
+    booking_app.email_outbox.close_session(session)
+    server.shutdown()
+
+    commands = server.commands
+    print(f"commands seen: {' '.join(commands)}")
+    ok = ('EHLO' in commands and 'AUTH' in commands and 'MAIL' in commands
+          and commands.index('EHLO') < commands.index('AUTH') < commands.index('MAIL'))
+    print('AUTH sent after EHLO' if ok else 'FAIL: the outbox did not authenticate')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""Reproducible load test for the booking API.
+
+Seeds a fresh SQLite database with synthetic users, machines and months of
+booking history (deterministic for a given --seed), then replays a traffic
+mix for a fixed duration:
+
+  pollers  GET /api/machines (revalidating with If-None-Match) and the
+           user's own bookings, like an open dashboard
+  rush     students racing for tomorrow evening's slots on POST
+           /api/bookings; a won slot is cancelled again so the race goes on
+  admins   paging through the booking history with keyset cursors
+
+The same traffic runs in-process through the Flask test client, against a
+gunicorn started on the seeded database, or against any live server with
+--url (start it with the same DATABASE and SECRET_KEY). The JSON report has
+RPS and p50/p95/p99 latency per endpoint; compare two reports with the
+compare command.
+
+Usage:
+  python benchmarks/loadtest.py run [--target inprocess|gunicorn] [--url URL] [--output report.json]
+  python benchmarks/loadtest.py compare before.json after.json
+"""
+import os
+import sys
+import argparse
+import datetime
+import json
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SLOT_HOURS = 2  # Seeded history uses a fixed two-hour grid per machine
+
+
+def seed_database(booking_app, args):
+    """Fill the database configured in DATABASE; returns (users, machine ids, booking count)"""
+    rng = random.Random(args.seed)
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        existing = db.execute('SELECT COUNT(*) FROM washing_machines').fetchone()[0]
+        db.executemany('''
+            INSERT INTO washing_machines (machine_name, status) VALUES (?, 'available')
+        ''', [(f'Machine {i + 1}',) for i in range(existing, args.machines)])
+        machine_ids = [row['id'] for row in db.execute(
+            'SELECT id FROM washing_machines ORDER BY id LIMIT ?', (args.machines,)
+        ).fetchall()]
+
+        password = booking_app.hash_password('loadtest')
+        db.executemany('''
+            INSERT INTO users (student_id, username, email, password, role) VALUES (?, ?, NULL, ?, 'user')
+        ''', [(f'load{i:06d}', f'Load User {i}', password) for i in range(args.users)])
+        users = db.execute('''
+            SELECT id, student_id, username FROM users WHERE student_id LIKE 'load%' ORDER BY id
+        ''').fetchall()
+
+        # Only the first half holds bookings, so rush clients (second half) are not stopped by the 10-day rule
+        holders = users[:max(len(users) // 2, 1)]
+        today = booking_app.utc_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day = today - datetime.timedelta(days=30 * args.months)
+        rows = []
+        day = first_day
+        while day < today + datetime.timedelta(days=14):
+            future = day >= today
+            for machine_id in machine_ids:
+                for slot in range(24 // SLOT_HOURS):
+                    if rng.random() >= (0.15 if future else 0.5):
+                        continue
+                    start = day + datetime.timedelta(hours=slot * SLOT_HOURS)
+                    if future:
+                        status = 'confirmed'
+                    else:
+                        status = 'cancelled' if rng.random() < 0.1 else 'completed'
+                    rows.append((rng.choice(holders)['id'], machine_id,
+                                 start.isoformat() + '.000Z',
+                                 (start + datetime.timedelta(hours=1)).isoformat() + '.000Z',
+                                 status))
+            day += datetime.timedelta(days=1)
+        db.executemany('''
+            INSERT INTO bookings (user_id, machine_id, start_time, end_time, status)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        booking_app.bump_versions(db, 'machines', 'bookings')
+        db.commit()
+    return users, machine_ids, len(rows)
+
+
+class Recorder:
+    """Latencies and status codes per endpoint label, shared by all client threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def merge(self, local):
+        with self.lock:
+            for label, (latencies, statuses) in local.items():
+                entry = self.samples.setdefault(label, ([], {}))
+                entry[0].extend(latencies)
+                for status, count in statuses.items():
+                    entry[1][status] = entry[1].get(status, 0) + count
+
+
+class Client:
+    """One simulated browser: test client in-process, a requests session otherwise"""
+
+    def __init__(self, booking_app, base_url, token=None):
+        self.local = {}
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+        if base_url:
+            import requests
+            self.session = requests.Session()
+            self.base_url = base_url
+        else:
+            self.session = booking_app.app.test_client()
+            self.base_url = ''
+
+    def call(self, label, method, path, json_body=None, headers=None):
+        headers = dict(self.headers, **(headers or {}))
+        began = time.perf_counter()
+        if self.base_url:
+            response = self.session.request(method, self.base_url + path, json=json_body, headers=headers)
+        else:
+            response = self.session.open(path, method=method, json=json_body, headers=headers)
+        elapsed = time.perf_counter() - began
+        if self.base_url:
+            body = response.json() if 'json' in response.headers.get('Content-Type', '') else None
+        else:
+            body = response.get_json(silent=True)
+        latencies, statuses = self.local.setdefault(label, ([], {}))
+        latencies.append(elapsed)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return response.status_code, response.headers, body
+
+
+def poller(client, deadline, user_id, think):
+    etag = None
+    while time.time() < deadline:
+        status, headers, _ = client.call('GET /api/machines', 'GET', '/api/machines',
+                                         headers={'If-None-Match': etag} if etag else None)
+        etag = headers.get('ETag') or etag
+        client.call('GET /api/bookings/user/<id>', 'GET', f'/api/bookings/user/{user_id}')
+        time.sleep(think)
+
+
+def rusher(client, deadline, slots, rng, think):
+    while time.time() < deadline:
+        status, _, body = client.call('POST /api/bookings', 'POST', '/api/bookings', json_body=rng.choice(slots))
+        if status == 201:
+            client.call('DELETE /api/bookings/<id>', 'DELETE', f"/api/bookings/{body['booking_id']}")
+        time.sleep(think)
+
+
+def admin_viewer(client, deadline, think):
+    while time.time() < deadline:
+        cursor = None
+        for _ in range(5):
+            path = '/api/admin/bookings?show_past=true&limit=200' + (f'&cursor={cursor}' if cursor else '')
+            status, _, body = client.call('GET /api/admin/bookings', 'GET', path)
+            cursor = body.get('next_cursor') if body else None
+            if not cursor or time.time() >= deadline:
+                break
+        time.sleep(think)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=REPO_ROOT, env=dict(os.environ)
+    )
+    import requests
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/api', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def replay(booking_app, args, base_url, users, machine_ids):
+    """Drive every simulated client until the duration is up; returns (recorder, elapsed)"""
+    def token_for(user):
+        if args.url:
+            # A remote server has its own SECRET_KEY, so sign in like a browser
+            response = Client(booking_app, base_url).session.post(
+                base_url + '/api/login', json={'student_id': user['student_id'], 'password': 'loadtest'})
+            return response.json()['user']['token']
+        return booking_app.issue_session_token(user['id'], 'user', user['username'], None)
+
+    rng = random.Random(args.seed)
+    admin_token = Client(booking_app, base_url).call(
+        'POST /api/admin/login', 'POST', '/api/admin/login',
+        json_body={'admin_id': 'admin', 'password': 'admin123'}
+    )[2]['admin']['token']
+    tomorrow = booking_app.utc_now().replace(hour=18, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+    slots = [{
+        'machine_id': machine_id,
+        'start_time': (tomorrow + datetime.timedelta(hours=hour)).isoformat() + '.000Z',
+        'end_time': (tomorrow + datetime.timedelta(hours=hour + 1)).isoformat() + '.000Z'
+    } for machine_id in machine_ids for hour in range(4)]
+
+    think = args.think_ms / 1000
+    jobs = []
+    for i in range(args.pollers):
+        user = rng.choice(users)
+        jobs.append((Client(booking_app, base_url, token_for(user)), poller, (user['id'], think)))
+    for i in range(args.rush):
+        user = rng.choice(users[len(users) // 2:])
+        jobs.append((Client(booking_app, base_url, token_for(user)), rusher,
+                     (slots, random.Random(args.seed + i), think)))
+    for i in range(args.admins):
+        jobs.append((Client(booking_app, base_url, admin_token), admin_viewer, (think,)))
+
+    recorder = Recorder()
+    deadline = time.time() + args.duration
+
+    def drive(client, target, target_args):
+        try:
+            target(client, deadline, *target_args)
+        finally:
+            recorder.merge(client.local)
+
+    threads = [threading.Thread(target=drive, args=job) for job in jobs]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - began
+
+
+def run(args):
+    if args.url and 'DATABASE' not in os.environ:
+        print('--url needs DATABASE set to the database the server uses')
+        return 2
+    os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'loadtest.db'))
+    os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+    import app as booking_app
+
+    seed_started = time.perf_counter()
+    users, machine_ids, bookings = seed_database(booking_app, args)
+    seed_time = time.perf_counter() - seed_started
+
+    process = None
+    base_url = args.url.rstrip('/') if args.url else None
+    if args.target == 'gunicorn' and not base_url:
+        process, base_url = start_gunicorn(args)
+    try:
+        recorder, elapsed = replay(booking_app, args, base_url, users, machine_ids)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    endpoints = {}
+    total = 0
+    for label, (latencies, statuses) in sorted(recorder.samples.items()):
+        ordered = sorted(latencies)
+        total += len(ordered)
+        endpoints[label] = {
+            'requests': len(ordered),
+            'rps': round(len(ordered) / elapsed, 1),
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3),
+            'statuses': {str(status): count for status, count in sorted(statuses.items())}
+        }
+    report = {
+        'commit': git_commit(),
+        'target': base_url if args.url else args.target,
+        'config': {
+            'seed': args.seed, 'users': args.users, 'machines': args.machines, 'months': args.months,
+            'duration': args.duration, 'pollers': args.pollers, 'rush': args.rush, 'admins': args.admins,
+            'think_ms': args.think_ms, 'workers': args.workers, 'threads': args.threads
+        },
+        'seeded_bookings': bookings,
+        'seed_seconds': round(seed_time, 2),
+        'elapsed_seconds': round(elapsed, 2),
+        'total_rps': round(total / elapsed, 1),
+        'endpoints': endpoints
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before['config'] != after['config']:
+        print('warning: the reports were produced with different configurations')
+    print(f"{'endpoint':32s} " + ' '.join(f"{column:^20s}" for column in ('rps', 'p50 ms', 'p95 ms', 'p99 ms')))
+    for label in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        old = before['endpoints'].get(label)
+        new = after['endpoints'].get(label)
+        if not old or not new:
+            print(f"{label:32s} only in {'after' if new else 'before'}")
+            continue
+        cells = [f"{old[key]:>8g} -> {new[key]:<8g}" for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"{label:32s} " + ' '.join(cells))
+    print(f"{'total':32s} {before['total_rps']:>8g} -> {after['total_rps']:<8g}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='seed a database and replay traffic')
+    run_parser.add_argument('--target', choices=('inprocess', 'gunicorn'), default='inprocess')
+    run_parser.add_argument('--url', help='live server to load instead (seeds the DATABASE it must use)')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--users', type=int, default=2000)
+    run_parser.add_argument('--machines', type=int, default=8)
+    run_parser.add_argument('--months', type=int, default=6, help='months of booking history')
+    run_parser.add_argument('--duration', type=float, default=20, help='seconds of traffic')
+    run_parser.add_argument('--pollers', type=int, default=16)
+    run_parser.add_argument('--rush', type=int, default=16, help='clients racing for booking slots')
+    run_parser.add_argument('--admins', type=int, default=2)
+    run_parser.add_argument('--think-ms', type=float, default=0, help='pause between iterations per client')
+    run_parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    run_parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    run_parser.add_argument('--output', help='write the JSON report here as well')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Multi-process stress test: many simultaneous requests for one slot.
+
+Every request comes from a different student, so only the slot conflict can
+stop them. Exactly one booking must be admitted. Requests go through the
+Flask test client in each process, or to a live server with --url
+(e.g. gunicorn -w 4 --threads 8 app:app, started with the same DATABASE).
+
+Usage: python benchmarks/stress_booking_admission.py [requests] [processes] [threads] [--url http://127.0.0.1:8000]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import time
+import datetime
+import threading
+import multiprocessing
+
+os.environ.setdefault('DATABASE', os.path.join(tempfile.mkdtemp(), 'stress.db'))
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def worker(tokens, slot, threads, base_url, barrier, results):
+    import app as booking_app
+
+    statuses = {}
+    lock = threading.Lock()
+    shares = [tokens[i::threads] for i in range(threads)]
+
+    def fire(share):
+        if base_url:
+            import requests
+            session = requests.Session()
+            post = lambda token: session.post(f'{base_url}/api/bookings', json=slot,
+                                              headers={'Authorization': f'Bearer {token}'}).status_code
+        else:
+            client = booking_app.app.test_client()
+            post = lambda token: client.post('/api/bookings', json=slot,
+                                             headers={'Authorization': f'Bearer {token}'}).status_code
+        local = {}
+        start_gate.wait()
+        for token in share:
+            code = post(token)
+            local[code] = local.get(code, 0) + 1
+        with lock:
+            for code, count in local.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    start_gate = threading.Event()
+    pool = [threading.Thread(target=fire, args=(share,)) for share in shares]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start_gate.set()
+    for thread in pool:
+        thread.join()
+    results.put(statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('requests', nargs='?', type=int, default=1000)
+    parser.add_argument('processes', nargs='?', type=int, default=4)
+    parser.add_argument('threads', nargs='?', type=int, default=16)
+    parser.add_argument('--url', help='base URL of a live server instead of the test client')
+    args = parser.parse_args()
+    total, processes, threads = args.requests, args.processes, args.threads
+    base_url = args.url.rstrip('/') if args.url else None
+
+    import app as booking_app
+    booking_app.init_db()
+    with booking_app.app.app_context():
+        db = booking_app.get_db()
+        db.executemany('''
+            INSERT INTO users (student_id, username, password, role) VALUES (?, ?, ?, 'user')
+        ''', [(f'stress{i:05d}', f'Stress {i}', 'x') for i in range(total)])
+        db.commit()
+        users = db.execute("SELECT id, username FROM users WHERE student_id LIKE 'stress%'").fetchall()
+    tokens = [booking_app.issue_session_token(user['id'], 'user', user['username'], None) for user in users]
+
+    start = booking_app.utc_now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+    slot = {
+        'machine_id': 1,
+        'start_time': start.isoformat() + '.000Z',
+        'end_time': (start + datetime.timedelta(hours=1)).isoformat() + '.000Z'
+    }
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    children = [context.Process(target=worker, args=(tokens[i::processes], slot, threads, base_url, barrier, results))
+                for i in range(processes)]
+    for child in children:
+        child.start()
+    barrier.wait()
+    began = time.perf_counter()
+    statuses = {}
+    for _ in children:
+        for code, count in results.get().items():
+            statuses[code] = statuses.get(code, 0) + count
+    elapsed = time.perf_counter() - began
+    for child in children:
+        child.join()
+
+    with booking_app.app.app_context():
+        admitted = booking_app.get_db().execute('''
+            SELECT COUNT(*) FROM bookings WHERE machine_id = ? AND start_time = ? AND status = 'confirmed'
+        ''', (slot['machine_id'], slot['start_time'])).fetchone()[0]
+
+    print(f"{total} requests, {processes} processes x {threads} threads: {total / elapsed:.0f} req/s")
+    print(f"responses: {dict(sorted(statuses.items()))}, bookings admitted: {admitted}")
+    if admitted != 1 or statuses.get(201) != 1:
+        print("FAIL: expected exactly one admitted booking")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+"""Gunicorn settings, picked up by 'gunicorn app:app' when run from this directory.
+
+Every open /api/stream client holds one worker thread, so workers are
+threaded and the thread count sets how many clients can stream at once.
+"""
+import os
+
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+worker_class = 'gthread'
+threads = int(os.getenv('WORKER_THREADS', '64'))
+
+
+def post_fork(server, worker):
+    # The app sizes STREAM_MAX_CLIENTS from this, so a --threads override on the command line counts too
+    os.environ['WORKER_THREADS'] = str(worker.cfg.threads)
@@ -227,11 +227,8 @@ function handleLogout() {
     localStorage.removeItem('currentUser');
     localStorage.removeItem('isAdmin');
     
-    // Clear auto-refresh interval
-    if (window.machineStatusInterval) {
-        clearInterval(window.machineStatusInterval);
-        window.machineStatusInterval = null;
-    }
+    // Stop live updates
+    stopLiveUpdates();
     
     showWelcomeSection();
     showMessage('Logged out successfully!', 'info');
@@ -244,8 +241,8 @@ async function checkAuthStatus() {
         
         if (savedUser) {
             const parsedUser = JSON.parse(savedUser);
-            // Validate that the user object has required properties
-            if (parsedUser && parsedUser.id && parsedUser.username) {
+            // Validate that the user object has required properties (older sessions lack a token)
+            if (parsedUser && parsedUser.id && parsedUser.username && parsedUser.token) {
                 currentUser = parsedUser;
                 isAdmin = savedIsAdmin === 'true';
                 
@@ -277,11 +274,8 @@ function showWelcomeSection() {
     userDashboard.style.display = 'none';
     adminDashboard.style.display = 'none';
     
-    // Clear auto-refresh interval
-    if (window.machineStatusInterval) {
-        clearInterval(window.machineStatusInterval);
-        window.machineStatusInterval = null;
-    }
+    // Stop live updates
+    stopLiveUpdates();
 }
 
 async function showUserDashboard() {
@@ -294,14 +288,8 @@ async function showUserDashboard() {
     await loadMachines(); // Wait for machines to load
     populateMachineSelect(); // Then populate the select with real-time status
     
-    // Set up auto-refresh for machine status every 30 seconds
-    if (window.machineStatusInterval) {
-        clearInterval(window.machineStatusInterval);
-    }
-    window.machineStatusInterval = setInterval(async () => {
-        await loadMachines();
-        populateMachineSelect();
-    }, 30000); // Refresh every 30 seconds
+    // Machine status and booking changes are pushed by the server
+    startLiveUpdates();
 }
 
 function showAdminDashboard() {
@@ -309,14 +297,115 @@ function showAdminDashboard() {
     userDashboard.style.display = 'none';
     adminDashboard.style.display = 'block';
     
-    // Clear auto-refresh interval (admin doesn\'t need real-time updates)
+    loadAdminMachines();
+    loadAllBookings();
+    startLiveUpdates();
+}
+
+// Live updates
+function refreshAllData() {
+    if (!currentUser) return;
+    loadMachines().then(populateMachineSelect);
+    if (isAdmin) {
+        loadAdminMachines();
+        const toggleBtn = document.getElementById("togglePastBookingsBtn");
+        if (toggleBtn) {
+            loadAllBookings(toggleBtn.textContent === "Hide Past Bookings");
+        } else {
+            loadAllBookings(false);
+        }
+    } else {
+        loadUserBookings();
+    }
+}
+
+function startLiveUpdates() {
+    stopLiveUpdates();
+
+    // Fall back to polling where Server-Sent Events are not available
+    if (!window.EventSource) {
+        window.machineStatusInterval = setInterval(refreshAllData, 30000);
+        return;
+    }
+
+    const source = new EventSource(`${API_BASE}/stream`);
+    let reconnecting = false;
+
+    source.addEventListener('machines', (event) => {
+        machines = JSON.parse(event.data).machines;
+        displayMachines();
+        populateMachineSelect();
+    });
+
+    source.addEventListener('machine', (event) => {
+        const update = JSON.parse(event.data);
+        const machine = machines.find(m => m.id === update.id);
+        if (machine) {
+            machine.status = update.status;
+            displayMachines();
+            populateMachineSelect();
+        }
+        if (isAdmin) {
+            loadAdminMachines();
+        }
+    });
+
+    source.addEventListener('booking', (event) => {
+        const booking = JSON.parse(event.data);
+        if (isAdmin) {
+            const toggleBtn = document.getElementById("togglePastBookingsBtn");
+            loadAllBookings(toggleBtn ? toggleBtn.textContent === "Hide Past Bookings" : false);
+        } else if (currentUser && String(booking.user_id) === String(currentUser.id)) {
+            loadUserBookings();
+        }
+
+        // Refresh the slot view if it shows the day of this booking
+        const slotDate = document.getElementById('slotDate');
+        const slotsDisplay = document.getElementById('slotsDisplay');
+        if (slotDate && slotsDisplay && slotsDisplay.innerHTML && slotDate.value === booking.start_time.slice(0, 10)) {
+            handleCheckSlots();
+        }
+    });
+
+    // The server dropped queued events for this client
+    source.addEventListener('resync', refreshAllData);
+
+    source.addEventListener('open', () => {
+        // Catch up on anything missed while disconnected
+        if (reconnecting) {
+            reconnecting = false;
+            refreshAllData();
+        }
+    });
+
+    source.addEventListener('error', () => {
+        reconnecting = true;
+        // The server refused the stream (e.g. too many open); poll for a while, then try again
+        if (source.readyState === EventSource.CLOSED) {
+            source.close();
+            window.liveUpdatesSource = null;
+            window.machineStatusInterval = setInterval(refreshAllData, 30000);
+            window.liveUpdatesRetry = setTimeout(startLiveUpdates, 300000);
+            refreshAllData();
+        }
+    });
+
+    window.liveUpdatesSource = source;
+}
+
+function stopLiveUpdates() {
+    if (window.liveUpdatesSource) {
+        window.liveUpdatesSource.close();
+        window.liveUpdatesSource = null;
+    }
     if (window.machineStatusInterval) {
         clearInterval(window.machineStatusInterval);
         window.machineStatusInterval = null;
     }
-    
-    loadAdminMachines();
-    loadAllBookings();
+    if (window.liveUpdatesRetry) {
+        clearTimeout(window.liveUpdatesRetry);
+        window.liveUpdatesRetry = null;
+    }
 }
 
 // Machine functions
@@ -436,7 +525,7 @@ async function handleBooking(e) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'Authorization': `Bearer ${currentUser.id}`
+                'Authorization': `Bearer ${currentUser.token}`
             },
             body: JSON.stringify(bookingData)
         });
@@ -535,7 +624,7 @@ async function cancelBooking(bookingId) {
         const response = await fetch(`${API_BASE}/bookings/${bookingId}`, {
             method: 'DELETE',
             headers: {
-                'Authorization': `Bearer ${currentUser.id}`
+                'Authorization': `Bearer ${currentUser.token}`
             }
         });
 
@@ -827,7 +916,7 @@ async function updateMachineStatus(event, machineId, status) {
             method: "PUT",
             headers: {
                 "Content-Type": "application/json",
-                "Authorization": `Bearer ${currentUser.id}`
+                "Authorization": `Bearer ${currentUser.token}`
             },
             body: JSON.stringify({ status })
         });
@@ -860,7 +949,7 @@ async function handleAddMachine(e) {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
-                "Authorization": `Bearer ${currentUser.id}`
+                "Authorization": `Bearer ${currentUser.token}`
             },
             body: JSON.stringify(machineData)
         });
@@ -881,16 +970,21 @@ async function handleAddMachine(e) {
     }
 }
 
+async function fetchBookingsPage(showPast, cursor) {
+    const url = `${API_BASE}/admin/bookings?show_past=${showPast}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+    const response = await fetch(url);
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.message);
+    }
+    return result;
+}
+
 async function loadAllBookings(showPast = false) {
     try {
-        const response = await fetch(`${API_BASE}/admin/bookings?show_past=${showPast}`);
-        const result = await response.json();
-        
-        if (response.ok) {
-            displayAllBookings(result.bookings);
-        } else {
-            console.error("Failed to load all bookings:", result.message);
-        }
+        // One keyset page at a time; older pages are fetched on demand with "Load more"
+        const result = await fetchBookingsPage(showPast, null);
+        displayAllBookings(result.bookings, result.next_cursor, showPast);
     } catch (error) {
         console.error("Error loading all bookings:", error);
         // Show demo data if API is not available
@@ -908,7 +1002,21 @@ async function loadAllBookings(showPast = false) {
     }
 }
 
-function displayAllBookings(allBookings) {
+async function loadMoreBookings(showPast, cursor, button) {
+    button.disabled = true;
+    button.textContent = "Loading...";
+    try {
+        const result = await fetchBookingsPage(showPast, cursor);
+        button.remove();
+        appendBookingCards(result.bookings, result.next_cursor, showPast);
+    } catch (error) {
+        console.error("Error loading more bookings:", error);
+        button.disabled = false;
+        button.textContent = "Load more";
+    }
+}
+
+function displayAllBookings(allBookings, nextCursor = null, showPast = false) {
     const allBookingsContainer = document.getElementById("allBookings");
     if (!allBookingsContainer) return;
 
@@ -918,8 +1026,14 @@ function displayAllBookings(allBookings) {
     }
 
     allBookingsContainer.innerHTML = "";
-    
-    allBookings.forEach(booking => {
+    appendBookingCards(allBookings, nextCursor, showPast);
+}
+
+function appendBookingCards(bookings, nextCursor, showPast) {
+    const allBookingsContainer = document.getElementById("allBookings");
+    if (!allBookingsContainer) return;
+
+    bookings.forEach(booking => {
         const bookingCard = document.createElement("div");
         bookingCard.className = "booking-card";
         bookingCard.innerHTML = `
@@ -942,6 +1056,14 @@ function displayAllBookings(allBookings) {
         `;
         allBookingsContainer.appendChild(bookingCard);
     });
+
+    if (nextCursor) {
+        const loadMoreBtn = document.createElement("button");
+        loadMoreBtn.className = "btn-secondary";
+        loadMoreBtn.textContent = "Load more";
+        loadMoreBtn.addEventListener("click", () => loadMoreBookings(showPast, nextCursor, loadMoreBtn));
+        allBookingsContainer.appendChild(loadMoreBtn);
+    }
 }
 
 // Utility functions
@@ -965,24 +1087,6 @@ function showMessage(message, type = "info") {
     }, 5000);
 }
 
-// Refresh data periodically
-setInterval(() => {
-    if (currentUser) {
-        loadMachines();
-        if (isAdmin) {
-            loadAdminMachines();
-            const toggleBtn = document.getElementById("togglePastBookingsBtn");
-            if (toggleBtn) {
-                loadAllBookings(toggleBtn.textContent === "Hide Past Bookings");
-            } else {
-                loadAllBookings(false);
-            }
-        } else {
-            loadUserBookings();
-        }
-    }
-}, 30000); // Refresh every 30 seconds
-
 
 async function showMachineBookings(machineId, machineName) {
     try {